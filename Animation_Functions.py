@@ -1,19 +1,32 @@
+import functools
 import os
 
 import bpy
 import numpy as np
+from BlenderUtility.Background_Writer import BackgroundWriter
 from BlenderUtility.Camera_Functions import get_calibration_mat
 from BlenderUtility.Camera_Functions import get_computer_vision_camera_matrix
+from BlenderUtility.Camera_Functions import compute_calibration_mats
+from BlenderUtility.Camera_Functions import convert_opengl_to_computer_vision_camera_mats
+from BlenderUtility.Camera_Object_Trajectory_Arrays import CameraObjectTrajectoryArrays
+from BlenderUtility.Rigid_Ground_Truth_Mesh import RigidGroundTruthMesh
 from BlenderUtility.Curve_Functions import get_curve_length
+from BlenderUtility.Ground_Truth_Sharding_Functions import get_shard_trajectory_file_path
+from BlenderUtility.Ground_Truth_Sharding_Functions import write_trajectory_shard
 from BlenderUtility.Object_Functions import join_copy_of_objects
+from BlenderUtility.Object_Functions import get_evaluated_mesh_coordinates_and_triangles
+from BlenderUtility.Object_Functions import get_mesh_vertex_coordinates_as_array
+from BlenderUtility.Output_Manifest import OutputManifest
+from BlenderUtility.Output_Manifest import compute_input_hash
 from BlenderUtility.Import_Export_Functions import export_ply
-from Utility.File_Handler.NVM_File_Handler import NVMFileHandler
-from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
-from Utility.File_Handler.Trajectory_File_Handler import TrajectoryFileHandler
+from BlenderUtility.Import_Export_Functions import export_ply_direct
+# write_camera_centers_as_ply and write_cameras_as_nvm have been moved (but are still available here)
+from BlenderUtility.Trajectory_Output_Functions import write_camera_centers_as_ply
+from BlenderUtility.Trajectory_Output_Functions import write_cameras_as_nvm
+from BlenderUtility.Trajectory_Output_Functions import write_camera_object_trajectory_files
 from Utility.Logging_Extension import logger
 from Utility.Types.Camera import Camera
 from Utility.Types.Camera_Object_Trajectory import CameraObjectTrajectory
-from Utility.Types.Point import Point
 from Utility.Types.Stereo_Camera import StereoCamera
 from Utility.OS_Extension import mkdir_safely
 
@@ -100,11 +113,102 @@ def configure_scene_animation(frame_end_number, fps=12):
     logger.info('configure_scene_animation: Done')
 
 
+def _assert_unit_scales(scales, object_name, frame_numbers):
+    # Only if the objects have a scale of 1,
+    # the 3x3 part of the corresponding matrix_world contains a pure rotation
+    # Otherwise it also contains scale or shear information
+    invalid_frame_indices = np.flatnonzero(np.any(scales != 1, axis=1))
+    if len(invalid_frame_indices) > 0:
+        logger.vinfo('object_name', object_name)
+        logger.vinfo('frame_number', frame_numbers[invalid_frame_indices[0]])
+        logger.vinfo('scale', scales[invalid_frame_indices[0]])
+        assert False
+
+
+def collect_camera_object_trajectory_arrays(virtual_camera_name,
+                                            render_stereo_camera,
+                                            stereo_camera_baseline,
+                                            car_body_name,
+                                            car_body_matrix_world_after_loading,
+                                            frame_numbers=None):
+    """
+    Single pass alternative to collect_camera_object_trajectory_information(). Each frame is evaluated once and
+    only the matrix_world values (and the camera parameters) are recorded. The calibration, the conversion to the
+    computer vision convention and the relative object poses are computed vectorized after the frame loop.
+    :param frame_numbers: frames to collect (optional). By default all frames, i.e. 1, ..., scene.frame_end
+    :return: CameraObjectTrajectoryArrays
+    """
+    logger.info('collect_camera_object_trajectory_arrays: ...')
+    scene = bpy.context.scene
+
+    blender_camera = bpy.data.objects[virtual_camera_name]
+    if not scene.camera:
+        scene.camera = blender_camera
+    car_body = bpy.data.objects[car_body_name]
+
+    if frame_numbers is None:
+        frame_numbers = np.arange(1, scene.frame_end + 1)
+    frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+    num_frames = len(frame_numbers)
+
+    opengl_cam_mats = np.empty((num_frames, 4, 4), dtype=np.float64)
+    object_matrix_world_mats = np.empty((num_frames, 4, 4), dtype=np.float64)
+    camera_scales = np.empty((num_frames, 3), dtype=np.float64)
+    object_scales = np.empty((num_frames, 3), dtype=np.float64)
+    # lens, sensor_width, shift_x, shift_y (these values may be animated)
+    camera_parameters = np.empty((num_frames, 4), dtype=np.float64)
+
+    camera_data = blender_camera.data
+    for frame_index, frame_number in enumerate(frame_numbers):
+        # frame_set() evaluates the scene, i.e. matrix_world is up to date
+        scene.frame_set(int(frame_number))
+        opengl_cam_mats[frame_index] = blender_camera.matrix_world
+        object_matrix_world_mats[frame_index] = car_body.matrix_world
+        camera_scales[frame_index] = blender_camera.scale
+        object_scales[frame_index] = car_body.scale
+        camera_parameters[frame_index] = (
+            camera_data.lens, camera_data.sensor_width, camera_data.shift_x, camera_data.shift_y)
+    scene.frame_set(1)
+
+    _assert_unit_scales(camera_scales, virtual_camera_name, frame_numbers)
+    _assert_unit_scales(object_scales, car_body_name, frame_numbers)
+
+    calibration_mats = compute_calibration_mats(
+        camera_parameters[:, 0], camera_parameters[:, 1], camera_parameters[:, 2], camera_parameters[:, 3])
+    cam_to_world_mats = convert_opengl_to_computer_vision_camera_mats(opengl_cam_mats)
+    inverted_matrix_world_after_loading = np.array(car_body_matrix_world_after_loading.inverted())
+    object_matrix_world_relative_to_initial_pose = np.matmul(
+        object_matrix_world_mats, inverted_matrix_world_after_loading)
+
+    logger.info('collect_camera_object_trajectory_arrays: Done')
+    return CameraObjectTrajectoryArrays(
+        frame_numbers,
+        cam_to_world_mats,
+        calibration_mats,
+        object_matrix_world_relative_to_initial_pose,
+        render_stereo_camera=render_stereo_camera,
+        stereo_camera_baseline=stereo_camera_baseline)
+
+
 def collect_camera_object_trajectory_information(virtual_camera_name,
                                                  render_stereo_camera,
                                                  stereo_camera_baseline,
                                                  car_body_name,
-                                                 car_body_matrix_world_after_loading):
+                                                 car_body_matrix_world_after_loading,
+                                                 use_array_collection=False):
+    """
+    :param use_array_collection: if True, the trajectory is collected with
+        collect_camera_object_trajectory_arrays() (i.e. each frame is evaluated once)
+    """
+    if use_array_collection:
+        camera_object_trajectory_arrays = collect_camera_object_trajectory_arrays(
+            virtual_camera_name,
+            render_stereo_camera,
+            stereo_camera_baseline,
+            car_body_name,
+            car_body_matrix_world_after_loading)
+        return camera_object_trajectory_arrays.to_camera_object_trajectory()
+
     logger.info('collect_camera_object_trajectory_information: ...')
     scene = bpy.context.scene
 
@@ -179,6 +283,27 @@ def collect_camera_object_trajectory_information(virtual_camera_name,
     return camera_object_trajectory
 
 
+def _get_ground_truth_part_names(car_body_name,
+                                 add_static_wheels_to_gt_mesh,
+                                 car_rig_stem,
+                                 car_model_tire_suffix_fl,
+                                 car_model_tire_suffix_fr,
+                                 car_model_tire_suffix_bl,
+                                 car_model_tire_suffix_br):
+    if add_static_wheels_to_gt_mesh:
+        return [car_body_name,
+                car_rig_stem + car_model_tire_suffix_fl,
+                car_rig_stem + car_model_tire_suffix_fr,
+                car_rig_stem + car_model_tire_suffix_bl,
+                car_rig_stem + car_model_tire_suffix_br]
+    return [car_body_name]
+
+
+def _compute_ground_truth_geometry_hash(part_names):
+    return compute_input_hash(*[
+        get_mesh_vertex_coordinates_as_array(bpy.data.objects[part_name].data) for part_name in part_names])
+
+
 def store_animation_ground_truth_mesh(car_body_name,
                                       path_ground_truth_mesh_folder,
                                       add_static_wheels_to_gt_mesh,
@@ -186,19 +311,55 @@ def store_animation_ground_truth_mesh(car_body_name,
                                       car_model_tire_suffix_fl,
                                       car_model_tire_suffix_fr,
                                       car_model_tire_suffix_bl,
-                                      car_model_tire_suffix_br):
+                                      car_model_tire_suffix_br,
+                                      frame_numbers=None,
+                                      use_direct_ply_export=False,
+                                      manifest=None,
+                                      background_writer=None):
+    """
+    :param frame_numbers: frames to export (optional). By default all frames, i.e. 1, ..., scene.frame_end
+    :param use_direct_ply_export: if True, export_ply_direct() is used instead of export_ply(), i.e. the
+        meshes are not joined and bpy.ops is not called
+    :param manifest: OutputManifest (optional). Frames, whose ply files exist and whose inputs (matrix_world
+        values, geometry and settings) did not change, are skipped.
+    :param background_writer: BackgroundWriter (optional, requires use_direct_ply_export). The ply files are
+        written in the background, while the next frames are evaluated. Call background_writer.flush() to wait
+        for the pending writes (and the corresponding manifest entries).
+    """
+    assert background_writer is None or use_direct_ply_export
 
     scene = bpy.context.scene
-    for _frm_idx in range(scene.frame_end):
-
-        # We start the animation at frame
-        corrected_frame_index = _frm_idx + 1
+    if frame_numbers is None:
+        frame_numbers = range(1, scene.frame_end + 1)
+    part_names = _get_ground_truth_part_names(
+        car_body_name,
+        add_static_wheels_to_gt_mesh,
+        car_rig_stem,
+        car_model_tire_suffix_fl,
+        car_model_tire_suffix_fr,
+        car_model_tire_suffix_bl,
+        car_model_tire_suffix_br)
+    if manifest is not None:
+        settings = (part_names, use_direct_ply_export, _compute_ground_truth_geometry_hash(part_names))
+    num_skipped_frames = 0
+    for frame_number in frame_numbers:
+
+        corrected_frame_index = int(frame_number)
         # Blender indexes frames from 1, ..., n
         # Setting the current frame index is required to access
         # the correct values with blender_camera.matrix_world
         bpy.context.scene.frame_set(corrected_frame_index)
 
         current_frame_name = 'frame' + str(corrected_frame_index).zfill(5) + '.jpg'
+        path_to_ply = os.path.join(path_ground_truth_mesh_folder, current_frame_name + '.ply')
+
+        if manifest is not None:
+            part_matrix_world_mats = np.array(
+                [np.array(bpy.data.objects[part_name].matrix_world) for part_name in part_names])
+            input_hash = compute_input_hash(part_matrix_world_mats, settings)
+            if manifest.is_up_to_date(current_frame_name, input_hash):
+                num_skipped_frames += 1
+                continue
 
         # The matrix world entries are correct,
         # however the original car model may have a different origin
@@ -206,69 +367,76 @@ def store_animation_ground_truth_mesh(car_body_name,
         # Therefore, it is better to extract the the position of the car
         # during the animation on the fly
 
-        if add_static_wheels_to_gt_mesh:
+        # Only successful writes are recorded in the manifest
+        add_manifest_entry = None
+        if manifest is not None:
+            add_manifest_entry = functools.partial(
+                manifest.add_entry, current_frame_name, input_hash, [path_to_ply])
+
+        if use_direct_ply_export:
+            # With a background writer, the manifest entry is added in the writer thread after the write
+            export_ply_direct(
+                part_names,
+                path_to_ply=path_to_ply,
+                background_writer=background_writer,
+                on_written=add_manifest_entry)
+        elif add_static_wheels_to_gt_mesh:
             car_body_with_wheels = join_copy_of_objects(
-                [car_body_name,
-                 car_rig_stem + car_model_tire_suffix_fl,
-                 car_rig_stem + car_model_tire_suffix_fr,
-                 car_rig_stem + car_model_tire_suffix_bl,
-                 car_rig_stem + car_model_tire_suffix_br],
+                part_names,
                 joined_name=car_body_name + '_joined')
 
             export_ply(
                 object_name=car_body_with_wheels.name,
-                path_to_ply=os.path.join(
-                    path_ground_truth_mesh_folder,
-                    current_frame_name + '.ply'))
+                path_to_ply=path_to_ply)
             bpy.data.objects.remove(car_body_with_wheels, True)
         else:
             export_ply(
                 object_name=car_body_name,
-                path_to_ply=os.path.join(
-                    path_ground_truth_mesh_folder,
-                    current_frame_name + '.ply'))
-
-    bpy.context.scene.frame_set(1)
-
-
-def write_camera_centers_as_ply(camera_object_trajectory, camera_trajectory_ply_file_path):
-    camera_centers = []
-    for frame_name in camera_object_trajectory.get_frame_names_sorted():
-        cam = camera_object_trajectory.get_camera(frame_name)
-
-        if cam.is_monocular_cam():
-            camera_centers.append(cam.get_camera_center())
-        else:
-            camera_centers.append(cam.get_left_camera().get_camera_center())
-            camera_centers.append(cam.get_right_camera().get_camera_center())
-
-    camera_center_points = []
-    for center in camera_centers:
-        camera_center_points.append(Point(
-            coord=center,
-            color=(0, 255, 0)))
-
-    PLYFileHandler.write_ply_file(
-        ofp=camera_trajectory_ply_file_path,
-        vertices=camera_center_points,
-        plain_text_output=True)     # Binary output does only work
+                path_to_ply=path_to_ply)
 
+        if add_manifest_entry is not None and not use_direct_ply_export:
+            add_manifest_entry()
 
-def write_cameras_as_nvm(camera_object_trajectory, camera_trajectory_nvm_file_path):
+    if manifest is not None:
+        logger.info('Skipped ' + str(num_skipped_frames) + ' up to date frames')
+    bpy.context.scene.frame_set(1)
 
-    cameras = []
-    for frame_name in camera_object_trajectory.get_frame_names_sorted():
-        cam = camera_object_trajectory.get_camera(frame_name)
-        if cam.is_monocular_cam():
-            cameras.append(cam)
-        else:
-            cameras.append(cam.get_left_camera())
-            cameras.append(cam.get_right_camera())
 
-    NVMFileHandler.write_nvm_file(
-        output_nvm_file_name=camera_trajectory_nvm_file_path,
-        cameras=cameras,
-        points=[])
+def store_animation_ground_truth_rigid_mesh(part_names, rigid_ground_truth_mesh_ofp, frame_numbers=None):
+    """
+    Alternative to store_animation_ground_truth_mesh() for rigid objects. The (evaluated) mesh of each part is
+    exported once in object coordinates and only the matrix_world of each part is stored per frame.
+    Use RigidGroundTruthMesh.read() and get_mesh() to obtain the mesh at a specific frame (also outside of blender).
+    :param part_names: names of the rigid mesh objects
+    :param rigid_ground_truth_mesh_ofp: path of the .npz file
+    :param frame_numbers: frames to export (optional). By default all frames, i.e. 1, ..., scene.frame_end
+    :return: RigidGroundTruthMesh
+    """
+    logger.info('store_animation_ground_truth_rigid_mesh: ...')
+    scene = bpy.context.scene
+    if frame_numbers is None:
+        frame_numbers = np.arange(1, scene.frame_end + 1)
+    parts = [bpy.data.objects[part_name] for part_name in part_names]
+
+    part_coords = []
+    part_triangles = []
+    for part in parts:
+        coords, triangles = get_evaluated_mesh_coordinates_and_triangles(part)
+        part_coords.append(coords)
+        part_triangles.append(triangles)
+
+    part_matrix_world_mats = np.empty((len(frame_numbers), len(parts), 4, 4), dtype=np.float64)
+    for frame_index, frame_number in enumerate(frame_numbers):
+        scene.frame_set(int(frame_number))
+        for part_index, part in enumerate(parts):
+            part_matrix_world_mats[frame_index, part_index] = part.matrix_world
+    scene.frame_set(1)
+
+    rigid_ground_truth_mesh = RigidGroundTruthMesh(
+        part_names, part_coords, part_triangles, frame_numbers, part_matrix_world_mats)
+    rigid_ground_truth_mesh.write(rigid_ground_truth_mesh_ofp)
+    logger.info('store_animation_ground_truth_rigid_mesh: Done')
+    return rigid_ground_truth_mesh
 
 
 def write_animation_ground_truth_to_disc(
@@ -289,26 +457,160 @@ def write_animation_ground_truth_to_disc(
         car_model_tire_suffix_fl=None,
         car_model_tire_suffix_fr=None,
         car_model_tire_suffix_bl=None,
-        car_model_tire_suffix_br=None
+        car_model_tire_suffix_br=None,
+        use_array_collection=False,
+        store_rigid_ground_truth_mesh=False,
+        output_rigid_ground_truth_mesh_file_name='rigid_ground_truth_mesh.npz',
+        use_direct_ply_export=False,
+        use_manifest=False,
+        output_manifest_file_name='ground_truth_manifest.jsonl',
+        write_binary_trajectory=False,
+        output_animation_transformation_npz_file_name='animation_transformations.npz',
+        num_background_writer_threads=0
 ):
+    """
+    :param num_background_writer_threads: if larger than 0 (and use_direct_ply_export is True), the ground truth
+        meshes are written by a BackgroundWriter with this number of threads. The trajectory files are written
+        once (after the frame loop), i.e. they are not written in the background.
+    :param write_binary_trajectory: if True, the trajectory is additionally written as .npz file
+        (see CameraObjectTrajectoryArrays.read()). This implies use_array_collection.
+    :param use_direct_ply_export: see store_animation_ground_truth_mesh()
+    :param use_manifest: if True, the exported ground truth meshes are recorded in a manifest, so that a rerun
+        (e.g. after a crash) skips the frames, which are already up to date. Not supported in combination with
+        store_rigid_ground_truth_mesh (which writes a single file).
+    :param store_rigid_ground_truth_mesh: if True, the car body (and the wheels) are treated as rigid parts,
+        i.e. instead of a ply file per frame a single RigidGroundTruthMesh file is written
+    """
 
     logger.info('write_animation_ground_truth_to_disc: ...')
+    if use_manifest and write_animation_ground_truth_mesh and store_rigid_ground_truth_mesh:
+        logger.info('use_manifest is not supported for the rigid ground truth mesh')
+        assert False
     path_to_ground_truth_folder = os.path.join(
         path_to_output_render_folder, output_file_folder)
     mkdir_safely(path_to_ground_truth_folder)
 
-    camera_object_trajectory = collect_camera_object_trajectory_information(
+    if write_binary_trajectory:
+        camera_object_trajectory_arrays = collect_camera_object_trajectory_arrays(
+            virtual_camera_name,
+            render_stereo_camera,
+            stereo_camera_baseline,
+            car_body_name,
+            car_body_matrix_world_after_loading)
+        camera_object_trajectory_arrays.write(
+            os.path.join(path_to_ground_truth_folder, output_animation_transformation_npz_file_name))
+        camera_object_trajectory = camera_object_trajectory_arrays.to_camera_object_trajectory()
+    else:
+        camera_object_trajectory_arrays = None
+        camera_object_trajectory = collect_camera_object_trajectory_information(
+            virtual_camera_name,
+            render_stereo_camera,
+            stereo_camera_baseline,
+            car_body_name,
+            car_body_matrix_world_after_loading,
+            use_array_collection=use_array_collection)
+
+    if write_animation_ground_truth_mesh and store_rigid_ground_truth_mesh:
+        part_names = _get_ground_truth_part_names(
+            car_body_name,
+            add_static_wheels_to_gt_mesh,
+            car_rig_stem,
+            car_model_tire_suffix_fl,
+            car_model_tire_suffix_fr,
+            car_model_tire_suffix_bl,
+            car_model_tire_suffix_br)
+        store_animation_ground_truth_rigid_mesh(
+            part_names,
+            os.path.join(path_to_ground_truth_folder, output_rigid_ground_truth_mesh_file_name))
+    elif write_animation_ground_truth_mesh:
+        path_ground_truth_mesh_folder = os.path.join(
+            path_to_ground_truth_folder, output_ground_truth_mesh_folder)
+        if not os.path.isdir(path_ground_truth_mesh_folder):
+            os.mkdir(path_ground_truth_mesh_folder)
+        manifest = None
+        if use_manifest:
+            manifest = OutputManifest(os.path.join(path_to_ground_truth_folder, output_manifest_file_name))
+        background_writer = None
+        if use_direct_ply_export and num_background_writer_threads > 0:
+            background_writer = BackgroundWriter(num_threads=num_background_writer_threads)
+        try:
+            store_animation_ground_truth_mesh(
+                car_body_name,
+                path_ground_truth_mesh_folder,
+                add_static_wheels_to_gt_mesh,
+                car_rig_stem,
+                car_model_tire_suffix_fl,
+                car_model_tire_suffix_fr,
+                car_model_tire_suffix_bl,
+                car_model_tire_suffix_br,
+                use_direct_ply_export=use_direct_ply_export,
+                manifest=manifest,
+                background_writer=background_writer
+            )
+        except BaseException:
+            if background_writer is not None:
+                # Stops the worker threads without hiding the original exception by a pending write error
+                background_writer.abort()
+            raise
+        if background_writer is not None:
+            background_writer.close()
+
+    write_camera_object_trajectory_files(
+        camera_object_trajectory,
+        path_to_ground_truth_folder,
+        virtual_camera_name,
+        car_body_name,
+        output_animation_transformation_txt_file_name=output_animation_transformation_txt_file_name,
+        output_camera_trajectory_ply_file_name=output_camera_trajectory_ply_file_name,
+        output_camera_trajectory_nvm_file_name=output_camera_trajectory_nvm_file_name,
+        camera_object_trajectory_arrays=camera_object_trajectory_arrays)
+
+    logger.info('write_animation_ground_truth_to_disc: Done')
+
+
+def write_animation_ground_truth_shard(
+        virtual_camera_name,
+        car_body_name,
+        car_body_matrix_world_after_loading,
+        path_to_ground_truth_folder,
+        shard_index,
+        frame_start,
+        frame_end,
+        write_animation_ground_truth_mesh=True,
+        output_ground_truth_mesh_folder='object_ground_truth_in_world_ground_truth_coordinates',
+        render_stereo_camera=False,
+        stereo_camera_baseline=None,
+        add_static_wheels_to_gt_mesh=False,
+        car_rig_stem=None,
+        car_model_tire_suffix_fl=None,
+        car_model_tire_suffix_fr=None,
+        car_model_tire_suffix_bl=None,
+        car_model_tire_suffix_br=None,
+        use_direct_ply_export=False):
+    """
+    Processes the frames frame_start, ..., frame_end of a sharded ground truth extraction
+    (see Ground_Truth_Sharding_Functions.write_animation_ground_truth_to_disc_sharded). The values of
+    path_to_ground_truth_folder, shard_index, frame_start and frame_end are provided by parse_shard_script_args().
+    """
+    logger.info('write_animation_ground_truth_shard: ...')
+    logger.vinfo('shard_index', shard_index)
+    frame_numbers = np.arange(frame_start, frame_end + 1)
+
+    camera_object_trajectory_arrays = collect_camera_object_trajectory_arrays(
         virtual_camera_name,
         render_stereo_camera,
         stereo_camera_baseline,
         car_body_name,
-        car_body_matrix_world_after_loading)
+        car_body_matrix_world_after_loading,
+        frame_numbers=frame_numbers)
+    write_trajectory_shard(
+        camera_object_trajectory_arrays,
+        get_shard_trajectory_file_path(path_to_ground_truth_folder, shard_index))
 
     if write_animation_ground_truth_mesh:
         path_ground_truth_mesh_folder = os.path.join(
             path_to_ground_truth_folder, output_ground_truth_mesh_folder)
-        if not os.path.isdir(path_ground_truth_mesh_folder):
-            os.mkdir(path_ground_truth_mesh_folder)
+        mkdir_safely(path_ground_truth_mesh_folder)
         store_animation_ground_truth_mesh(
             car_body_name,
             path_ground_truth_mesh_folder,
@@ -317,40 +619,8 @@ def write_animation_ground_truth_to_disc(
             car_model_tire_suffix_fl,
             car_model_tire_suffix_fr,
             car_model_tire_suffix_bl,
-            car_model_tire_suffix_br
-        )
-
-    animation_transformation_file_path = os.path.join(
-        path_to_ground_truth_folder, output_animation_transformation_txt_file_name)
-    camera_trajectory_ply_file_path = os.path.join(
-        path_to_ground_truth_folder, output_camera_trajectory_ply_file_name)
-    camera_trajectory_nvm_file_path = os.path.join(
-        path_to_ground_truth_folder, output_camera_trajectory_nvm_file_name)
-
-    # In Blender the stereo camera uses by default the position
-    # of the monocular camera as left camera
-    # To visualize both cameras in the 3D view
-    #   * Enable "Views" for the current Renderlayer
-    #   * Then an entry "Stereoscopy" appears in the toolbar of the "3D View"
-    #   * Then click on "Cameras" under "Stereoscopy"
-    # See also:
-    # https://docs.blender.org/manual/de/dev/render/workflows/multiview/usage.html#viewport-stereo-3d
-    TrajectoryFileHandler.write_camera_and_object_trajectory_file(
-        path_to_trajectory_file=animation_transformation_file_path,
-        camera_object_trajectory=camera_object_trajectory,
-        camera_to_world_transformation_name=virtual_camera_name,
-        object_to_world_transformation_name=car_body_name)
-
-    write_camera_centers_as_ply(
-        camera_object_trajectory,
-        camera_trajectory_ply_file_path)
-
-    write_cameras_as_nvm(
-        camera_object_trajectory,
-        camera_trajectory_nvm_file_path)
-
-    logger.info('write_animation_ground_truth_to_disc: Done')
-
-
-
+            car_model_tire_suffix_br,
+            frame_numbers=frame_numbers,
+            use_direct_ply_export=use_direct_ply_export)
 
+    logger.info('write_animation_ground_truth_shard: Done')
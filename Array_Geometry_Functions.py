@@ -0,0 +1,97 @@
+import numpy as np
+
+# Vectorized geometry operations on (N,3) coordinate arrays
+
+
+def compute_centroid(coords):
+    coords = np.asarray(coords).reshape(-1, 3)
+    return coords.mean(axis=0)
+
+
+def recenter_coords(coords, centroid=None):
+    """
+    :return: coordinates relative to the centroid (computed from coords, if not provided)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if centroid is None:
+        centroid = compute_centroid(coords)
+    return coords - centroid
+
+
+def compute_rotation_matrix_from_euler_angles(rotation_angles_degrees):
+    """
+    Equivalent to Blender's rotation_euler with rotation_mode 'XYZ', i.e. R = R_z * R_y * R_x
+    :param rotation_angles_degrees: (x, y, z) angles in degrees
+    :return: (3,3) rotation matrix
+    """
+    x, y, z = np.radians(np.asarray(rotation_angles_degrees, dtype=np.float64))
+    rotation_x = np.array([[1, 0, 0],
+                           [0, np.cos(x), -np.sin(x)],
+                           [0, np.sin(x), np.cos(x)]])
+    rotation_y = np.array([[np.cos(y), 0, np.sin(y)],
+                           [0, 1, 0],
+                           [-np.sin(y), 0, np.cos(y)]])
+    rotation_z = np.array([[np.cos(z), -np.sin(z), 0],
+                           [np.sin(z), np.cos(z), 0],
+                           [0, 0, 1]])
+    return rotation_z.dot(rotation_y).dot(rotation_x)
+
+
+def rotate_coords(coords, rotation_mat, center=None):
+    """
+    :param coords: (N,3) array
+    :param rotation_mat: (3,3) array
+    :param center: rotation center (default is the origin)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    rotation_mat = np.asarray(rotation_mat)
+    if center is None:
+        return coords.dot(rotation_mat.T)
+    return (coords - center).dot(rotation_mat.T) + center
+
+
+def scale_coords(coords, scale_factor, center=None):
+    """
+    :param scale_factor: scalar or (3,) array
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if center is None:
+        return coords * scale_factor
+    return (coords - center) * scale_factor + center
+
+
+def apply_matrix_to_coords(matrix, coords):
+    """
+    Vectorized version of "matrix * vec" for all coordinates
+    :param matrix: (4,4) array (e.g. np.array(obj.matrix_world))
+    :param coords: (N,3) array
+    :return: (N,3) array
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    transformed = coords.dot(matrix[:3, :3].T) + matrix[:3, 3]
+    # Only projective matrices require the homogeneous division
+    if not np.allclose(matrix[3], [0, 0, 0, 1]):
+        homogeneous_coords = coords.dot(matrix[3, :3]) + matrix[3, 3]
+        transformed /= homogeneous_coords[:, np.newaxis]
+    return transformed
+
+
+def transform_coords(coords,
+                     recenter_around_centroid=False,
+                     rotation_angles_degrees=None,
+                     scale_factor=None,
+                     matrix=None):
+    """
+    Applies (in this order) recentering, rotation, scaling and an arbitrary (4,4) matrix
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if recenter_around_centroid:
+        coords = recenter_coords(coords)
+    if rotation_angles_degrees is not None:
+        coords = rotate_coords(coords, compute_rotation_matrix_from_euler_angles(rotation_angles_degrees))
+    if scale_factor is not None:
+        coords = scale_coords(coords, scale_factor)
+    if matrix is not None:
+        coords = apply_matrix_to_coords(matrix, coords)
+    return coords
@@ -1,17 +1,20 @@
 import bpy
+import numpy as np
+from BlenderUtility.Array_Geometry_Functions import apply_matrix_to_coords
+from BlenderUtility.Object_Functions import get_mesh_vertex_coordinates_as_array
 
 def add_faces_of_object_to_bmesh(some_bmesh, source_object, some_matrix_world=None):
 
     # https://docs.blender.org/api/2.78a/bmesh.types.html#bmesh.types.BMesh
 
     source_object_faces_object = [[v for v in p.vertices] for p in source_object.data.polygons]
-    source_object_vertices_object_coord = [v.co for v in source_object.data.vertices]
+    source_object_vertices_object_coord = get_mesh_vertex_coordinates_as_array(source_object.data)
 
     if some_matrix_world is None:
         some_matrix_world = source_object.matrix_world
 
-    vertices_world_coord = [(some_matrix_world * v_coord.to_4d()).to_3d() for v_coord in
-                            source_object_vertices_object_coord]
+    vertices_world_coord = apply_matrix_to_coords(
+        np.array(some_matrix_world), source_object_vertices_object_coord).tolist()
 
     # append pydata to ground_volume_mesh_data
     mesh_data_temp = bpy.data.meshes.new('unused_name')
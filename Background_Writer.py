@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from Utility.Logging_Extension import logger
+
+# This module does not depend on blender. The submitted functions must not access blender data (bpy), i.e. the data
+# to be written must be extracted (e.g. as numpy arrays) before submitting the write.
+
+
+class BackgroundWriter:
+    """
+    Executes write functions in a thread pool, so that the (blender) main thread can continue with the next frame.
+    At most max_pending_writes writes are queued: submit() blocks if this limit is reached (backpressure), which
+    bounds the memory used by the extracted data. The first error of a write is raised by the next call of
+    submit() or flush().
+    flush() waits until the submitted functions and the bookkeeping of the writer are finished. Done callbacks,
+    which are added to the returned futures, may still run afterwards. Therefore, work depending on a completed
+    write (e.g. adding a manifest entry) should be part of the submitted function.
+    """
+
+    def __init__(self, num_threads=2, max_pending_writes=8):
+        self._executor = ThreadPoolExecutor(max_workers=num_threads)
+        self._pending_write_slots = threading.BoundedSemaphore(max_pending_writes)
+        self._lock = threading.Lock()
+        # Notified by _on_write_done(), i.e. after the semaphore has been released
+        self._write_done_condition = threading.Condition(self._lock)
+        self._num_pending_writes = 0
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _raise_error(self):
+        with self._lock:
+            error = self._error
+            self._error = None
+        if error is not None:
+            raise error
+
+    def _write(self, function, args, kwargs):
+        try:
+            return function(*args, **kwargs)
+        except Exception as error:
+            # The error is stored before the future is done, i.e. flush() can not miss it
+            with self._lock:
+                if self._error is None:
+                    self._error = error
+            raise
+
+    def _on_write_done(self, future):
+        self._pending_write_slots.release()
+        with self._lock:
+            self._num_pending_writes -= 1
+            self._write_done_condition.notify_all()
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Blocks, if max_pending_writes writes are pending
+        :return: concurrent.futures.Future
+        """
+        self._raise_error()
+        self._pending_write_slots.acquire()
+        with self._lock:
+            self._num_pending_writes += 1
+        try:
+            future = self._executor.submit(self._write, function, args, kwargs)
+        except Exception:
+            self._on_write_done(None)
+            raise
+        future.add_done_callback(self._on_write_done)
+        return future
+
+    def get_num_pending_writes(self):
+        with self._lock:
+            return self._num_pending_writes
+
+    def flush(self):
+        """
+        Barrier: waits until all submitted writes are finished and raises the first error (if any)
+        """
+        with self._lock:
+            if self._num_pending_writes > 0:
+                logger.info('Waiting for ' + str(self._num_pending_writes) + ' pending writes')
+            # Waiting for the futures is not sufficient, since their done callbacks are called after the waiters
+            # have been notified
+            while self._num_pending_writes > 0:
+                self._write_done_condition.wait()
+        self._raise_error()
+
+    def abort(self):
+        """
+        Shuts the writer down after an error of the caller. Waits for the pending writes, but does not raise
+        write errors (i.e. the original exception of the caller is not hidden).
+        """
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            error = self._error
+            self._error = None
+        if error is not None:
+            logger.info('Ignoring background write error after abort: ' + repr(error))
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
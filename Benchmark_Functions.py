@@ -0,0 +1,430 @@
+import os
+import resource
+import tempfile
+import threading
+import timeit
+
+import bpy
+import numpy as np
+from BlenderUtility.Curve_Functions import clear_curve_length_cache
+from BlenderUtility.Curve_Functions import get_curve_length
+from BlenderUtility.Import_Export_Functions import export_ply
+from BlenderUtility.Import_Export_Functions import export_ply_direct
+from BlenderUtility.Point_Cloud_Tool import PointCloudTool
+from BlenderUtility.PLY_Binary_Functions import read_binary_ply_coords_and_colors
+from BlenderUtility.Spatial_Index import SpatialIndex
+from BlenderUtility.Spatial_Index import cKDTree
+from BlenderUtility.Trajectory_Output_Functions import write_point_array_as_ply
+from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
+from Utility.Logging_Extension import logger
+from Utility.Types.Point import Point
+
+# The functions in this file must be executed within blender, e.g. with
+# Blender_Script_Executor.execute_blender_script()
+
+
+def _create_random_point_cloud_arrays(num_points, seed=0):
+    random_state = np.random.RandomState(seed)
+    coords = random_state.uniform(-100, 100, size=(num_points, 3)).astype(np.float32)
+    colors = random_state.randint(0, 256, size=(num_points, 3)).astype(np.uint8)
+    return coords, colors
+
+
+def _create_random_points(num_points, seed=0):
+    coords, colors = _create_random_point_cloud_arrays(num_points, seed)
+    return [Point(coord=coord, color=color) for coord, color in zip(coords, colors)]
+
+
+def _remove_objects_and_orphan_meshes(objs):
+    meshes = [obj.data for obj in objs if obj.type == 'MESH']
+    for obj in objs:
+        bpy.data.objects.remove(obj, True)
+    for mesh in meshes:
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+
+def _measure_blend_file_save(blend_ofp):
+    start_time = timeit.default_timer()
+    bpy.ops.wm.save_as_mainfile(filepath=blend_ofp, copy=True)
+    save_time = timeit.default_timer() - start_time
+    file_size = os.path.getsize(blend_ofp)
+    os.remove(blend_ofp)
+    return save_time, file_size
+
+
+def _get_current_rss():
+    """ Returns the resident set size in bytes (Linux only) """
+    with open('/proc/self/statm') as statm_file:
+        return int(statm_file.read().split()[1]) * resource.getpagesize()
+
+
+def _measure_time_and_peak_rss_increase(function, sampling_interval=0.005):
+    """
+    Samples the resident set size in a separate thread while the function is executed
+    :return: result of the function, execution time, peak rss increase in bytes
+    """
+    rss_before = _get_current_rss()
+    peak_rss = [rss_before]
+    finished = threading.Event()
+
+    def sample_rss():
+        while not finished.is_set():
+            peak_rss[0] = max(peak_rss[0], _get_current_rss())
+            finished.wait(sampling_interval)
+
+    sampling_thread = threading.Thread(target=sample_rss)
+    sampling_thread.start()
+    start_time = timeit.default_timer()
+    result = function()
+    execution_time = timeit.default_timer() - start_time
+    peak_rss[0] = max(peak_rss[0], _get_current_rss())
+    finished.set()
+    sampling_thread.join()
+    return result, execution_time, peak_rss[0] - rss_before
+
+
+def _remove_object_and_mesh(obj):
+    mesh = obj.data
+    bpy.data.objects.remove(obj, True)
+    if mesh is not None and mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+
+def benchmark_add_point_cloud_as_mesh(num_points_list=(1000000, 10000000, 50000000)):
+    """
+    Compares the tuple based path (mesh.from_pydata) with the bulk path (foreach_set)
+    :param num_points_list:
+    :return: list of dicts with the timings in seconds
+    """
+    logger.info('benchmark_add_point_cloud_as_mesh: ...')
+    results = []
+    for num_points in num_points_list:
+        coords, colors = _create_random_point_cloud_arrays(num_points)
+
+        start_time = timeit.default_timer()
+        point_world_coordinates = [tuple(coord) for coord in coords]
+        tuple_mesh = bpy.data.meshes.new('benchmark_tuple_path')
+        tuple_mesh.from_pydata(point_world_coordinates, [], [])
+        tuple_time = timeit.default_timer() - start_time
+        del point_world_coordinates
+        bpy.data.meshes.remove(tuple_mesh)
+
+        start_time = timeit.default_timer()
+        bulk_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+            coords, 'benchmark_bulk_path', colors=colors)
+        bulk_time = timeit.default_timer() - start_time
+        _remove_object_and_mesh(bulk_obj)
+
+        result = {'num_points': num_points, 'tuple_path': tuple_time, 'bulk_path': bulk_time}
+        logger.info(str(result))
+        results.append(result)
+
+    logger.info('benchmark_add_point_cloud_as_mesh: Done')
+    return results
+
+
+def benchmark_point_cloud_mesh_updates(num_points=1000000, num_frames=20):
+    """
+    Compares the throughput (in points per second) of per vertex updates with the streaming bulk updates
+    :param num_points:
+    :param num_frames:
+    :return: dict with the throughput of both approaches
+    """
+    logger.info('benchmark_point_cloud_mesh_updates: ...')
+    coords, colors = _create_random_point_cloud_arrays(num_points)
+    point_cloud_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+        coords, 'benchmark_streaming', colors=colors)
+
+    # Only a few arrays are cycled, so the creation of random data is not measured
+    coords_list = [coords + offset for offset in range(3)]
+
+    start_time = timeit.default_timer()
+    point_cloud_vertices = point_cloud_obj.data.vertices
+    for frame_index in range(num_frames):
+        for index, coord in enumerate(coords_list[frame_index % len(coords_list)]):
+            point_cloud_vertices[index].co = coord
+    per_vertex_time = timeit.default_timer() - start_time
+
+    start_time = timeit.default_timer()
+    PointCloudTool.stream_point_cloud_mesh_updates(
+        point_cloud_obj.name,
+        (coords_list[frame_index % len(coords_list)] for frame_index in range(num_frames)),
+        (colors for _ in range(num_frames)))
+    bulk_time = timeit.default_timer() - start_time
+
+    _remove_object_and_mesh(point_cloud_obj)
+
+    num_processed_points = num_points * num_frames
+    result = {'num_points': num_points,
+              'num_frames': num_frames,
+              'per_vertex_points_per_second': num_processed_points / per_vertex_time,
+              'bulk_points_per_second': num_processed_points / bulk_time}
+    logger.info(str(result))
+    logger.info('benchmark_point_cloud_mesh_updates: Done')
+    return result
+
+
+def benchmark_point_cloud_using_parent_mesh_sharing(num_points=10000):
+    """
+    Compares one mesh per point (default) with a single shared mesh
+    :param num_points:
+    :return: list of dicts with build time, number of meshes, number of stored vertices, save time and file size
+    """
+    logger.info('benchmark_point_cloud_using_parent_mesh_sharing: ...')
+    points = _create_random_points(num_points)
+    blend_ofp = os.path.join(tempfile.gettempdir(), 'benchmark_point_cloud_using_parent.blend')
+
+    results = []
+    for share_mesh_data in [False, True]:
+        mesh_names_before = set(bpy.data.meshes.keys())
+
+        start_time = timeit.default_timer()
+        point_cloud = PointCloudTool.add_point_cloud_using_parent(
+            points, 'benchmark_parent', share_mesh_data=share_mesh_data)
+        build_time = timeit.default_timer() - start_time
+
+        new_meshes = [mesh for mesh in bpy.data.meshes if mesh.name not in mesh_names_before]
+        save_time, file_size = _measure_blend_file_save(blend_ofp)
+
+        result = {'share_mesh_data': share_mesh_data,
+                  'build_time': build_time,
+                  'num_meshes': len(new_meshes),
+                  'num_stored_vertices': sum(len(mesh.vertices) for mesh in new_meshes),
+                  'save_time': save_time,
+                  'file_size': file_size}
+        logger.info(str(result))
+        results.append(result)
+
+        _remove_objects_and_orphan_meshes(list(point_cloud.children) + [point_cloud])
+
+    logger.info('benchmark_point_cloud_using_parent_mesh_sharing: Done')
+    return results
+
+
+def benchmark_ply_readers(ply_ifp):
+    """
+    Compares parse time and peak rss increase of PLYFileHandler and the memory mapped binary ply reader
+    :param ply_ifp: path to a binary ply file
+    :return: dict with the measurements
+    """
+    logger.info('benchmark_ply_readers: ...')
+    memory_mapped_result, memory_mapped_time, memory_mapped_rss = _measure_time_and_peak_rss_increase(
+        lambda: read_binary_ply_coords_and_colors(ply_ifp))
+    num_points = len(memory_mapped_result[0])
+    del memory_mapped_result
+
+    ply_file_handler_result, ply_file_handler_time, ply_file_handler_rss = _measure_time_and_peak_rss_increase(
+        lambda: PLYFileHandler.parse_ply_file(ply_ifp))
+    del ply_file_handler_result
+
+    result = {'num_points': num_points,
+              'ply_file_handler_time': ply_file_handler_time,
+              'ply_file_handler_peak_rss_increase': ply_file_handler_rss,
+              'memory_mapped_time': memory_mapped_time,
+              'memory_mapped_peak_rss_increase': memory_mapped_rss}
+    logger.info(str(result))
+    logger.info('benchmark_ply_readers: Done')
+    return result
+
+
+def _create_animated_benchmark_camera(camera_name, num_frames):
+    camera_data = bpy.data.cameras.new(camera_name)
+    camera_obj = bpy.data.objects.new(camera_name, camera_data)
+    bpy.context.scene.objects.link(camera_obj)
+    camera_obj.location = (0, -300, 0)
+    camera_obj.keyframe_insert('location', frame=1)
+    camera_obj.location = (300, -300, 100)
+    camera_obj.keyframe_insert('location', frame=num_frames)
+    return camera_obj
+
+
+def _measure_average_frame_change_time(num_frames):
+    scene = bpy.context.scene
+    start_time = timeit.default_timer()
+    for frame_index in range(1, num_frames + 1):
+        scene.frame_set(frame_index)
+    return (timeit.default_timer() - start_time) / num_frames
+
+
+def benchmark_billboarding_frame_change(num_points_list=(10000, 100000), num_frames=10):
+    """
+    Compares the frame change time of per point track to constraints (add_point_cloud_using_parent)
+    with a single copy rotation constraint on the instanced object (add_point_cloud_using_particle_system)
+    :param num_points_list:
+    :param num_frames:
+    :return: list of dicts with the average frame change time in seconds
+    """
+    logger.info('benchmark_billboarding_frame_change: ...')
+    camera_obj = _create_animated_benchmark_camera('benchmark_billboarding_camera', num_frames)
+
+    results = []
+    for num_points in num_points_list:
+        points = _create_random_points(num_points)
+        objects_before = set(bpy.data.objects.keys())
+
+        point_cloud = PointCloudTool.add_point_cloud_using_parent(
+            points,
+            'benchmark_track_to',
+            vertex_type='PLANE',
+            share_mesh_data=True,
+            camera_name_for_billboarding=camera_obj.name)
+        track_to_time = _measure_average_frame_change_time(num_frames)
+        _remove_objects_and_orphan_meshes(list(point_cloud.children) + [point_cloud])
+
+        PointCloudTool.add_point_cloud_using_particle_system(
+            'benchmark_particle_system',
+            points,
+            add_points_as_particle_system=True,
+            mesh_type='PLANE',
+            camera_name_for_billboarding=camera_obj.name)
+        copy_rotation_time = _measure_average_frame_change_time(num_frames)
+        _remove_objects_and_orphan_meshes(
+            [bpy.data.objects[name] for name in bpy.data.objects.keys() if name not in objects_before])
+
+        result = {'num_points': num_points,
+                  'track_to_frame_change_time': track_to_time,
+                  'copy_rotation_frame_change_time': copy_rotation_time}
+        logger.info(str(result))
+        results.append(result)
+
+    _remove_objects_and_orphan_meshes([camera_obj])
+    logger.info('benchmark_billboarding_frame_change: Done')
+    return results
+
+
+def _query_knn_brute_force(coords, query_coords, k):
+    indices = np.empty((len(query_coords), k), dtype=np.int64)
+    for position, query_coord in enumerate(query_coords):
+        squared_distances = np.sum((coords - query_coord) ** 2, axis=1)
+        indices[position] = np.argsort(squared_distances)[:k]
+    return indices
+
+
+def benchmark_spatial_index(num_points_list=(10000, 100000, 1000000), num_queries=1000, k=8, radius=1.0):
+    """
+    Compares brute force queries with the numpy and (if available) the scipy backend of SpatialIndex.
+    This benchmark does not require blender.
+    :param num_points_list:
+    :param num_queries:
+    :param k: number of neighbors of the knn queries
+    :param radius: radius of the radius queries
+    :return: list of dicts with the build and query times in seconds
+    """
+    logger.info('benchmark_spatial_index: ...')
+    results = []
+    for num_points in num_points_list:
+        coords, _ = _create_random_point_cloud_arrays(num_points)
+        query_coords, _ = _create_random_point_cloud_arrays(num_queries, seed=1)
+        result = {'num_points': num_points, 'num_queries': num_queries}
+
+        start_time = timeit.default_timer()
+        _query_knn_brute_force(coords, query_coords, k)
+        result['brute_force_knn_time'] = timeit.default_timer() - start_time
+
+        backends = [('numpy', False)]
+        if cKDTree is not None:
+            backends.append(('scipy', True))
+        for backend_name, use_scipy in backends:
+            start_time = timeit.default_timer()
+            spatial_index = SpatialIndex(coords, use_scipy=use_scipy)
+            result[backend_name + '_build_time'] = timeit.default_timer() - start_time
+
+            start_time = timeit.default_timer()
+            spatial_index.query_knn(query_coords, k)
+            result[backend_name + '_knn_time'] = timeit.default_timer() - start_time
+
+            start_time = timeit.default_timer()
+            spatial_index.query_radius(query_coords, radius)
+            result[backend_name + '_radius_time'] = timeit.default_timer() - start_time
+
+            start_time = timeit.default_timer()
+            spatial_index.query_aabb([-50, -50, -50], [50, 50, 50])
+            result[backend_name + '_aabb_time'] = timeit.default_timer() - start_time
+
+        logger.info(str(result))
+        results.append(result)
+    logger.info('benchmark_spatial_index: Done')
+    return results
+
+
+def benchmark_ply_mesh_export(object_name, num_repetitions=10):
+    """
+    Compares export_ply() (bpy.ops) with export_ply_direct() for the given mesh object
+    :return: dict with the average export times in seconds
+    """
+    logger.info('benchmark_ply_mesh_export: ...')
+    output_dp = tempfile.mkdtemp()
+    ply_ofp = os.path.join(output_dp, 'benchmark.ply')
+
+    def measure_average_export_time(export_function):
+        start_time = timeit.default_timer()
+        for _ in range(num_repetitions):
+            export_function()
+            os.remove(ply_ofp)
+        return (timeit.default_timer() - start_time) / num_repetitions
+
+    result = {'object_name': object_name,
+              'export_ply_time': measure_average_export_time(
+                  lambda: export_ply(object_name, ply_ofp)),
+              'export_ply_direct_time': measure_average_export_time(
+                  lambda: export_ply_direct(object_name, ply_ofp))}
+    os.rmdir(output_dp)
+    logger.info(str(result))
+    logger.info('benchmark_ply_mesh_export: Done')
+    return result
+
+
+def benchmark_point_array_ply_output(num_points_list=(1000, 10000, 100000)):
+    """
+    Compares the binary and the text ply output of write_point_array_as_ply() (used for camera centers).
+    The round trip of both outputs is tested in tests/test_trajectory_output.py.
+    This benchmark does not require blender.
+    :return: list of dicts with the file sizes and the write times
+    """
+    logger.info('benchmark_point_array_ply_output: ...')
+    output_dp = tempfile.mkdtemp()
+    ply_ofp = os.path.join(output_dp, 'benchmark.ply')
+    results = []
+    for num_points in num_points_list:
+        coords, colors = _create_random_point_cloud_arrays(num_points)
+        result = {'num_points': num_points}
+        for output_type, plain_text_output in [('binary', False), ('text', True)]:
+            start_time = timeit.default_timer()
+            write_point_array_as_ply(coords, colors, ply_ofp, plain_text_output=plain_text_output)
+            result[output_type + '_write_time'] = timeit.default_timer() - start_time
+            result[output_type + '_file_size'] = os.path.getsize(ply_ofp)
+            os.remove(ply_ofp)
+        logger.info(str(result))
+        results.append(result)
+    os.rmdir(output_dp)
+    logger.info('benchmark_point_array_ply_output: Done')
+    return results
+
+
+def benchmark_curve_length(curve_names=None):
+    """
+    Measures get_curve_length() for the given curves (default: all curves of the scene) without cache,
+    with an empty cache and with a filled cache (i.e. the case of repeated calls of configure_curve_animation)
+    :return: dict with the total times in seconds
+    """
+    logger.info('benchmark_curve_length: ...')
+    if curve_names is None:
+        curve_names = [obj.name for obj in bpy.context.scene.objects if obj.type == 'CURVE']
+    curve_objs = [bpy.data.objects[curve_name] for curve_name in curve_names]
+
+    def measure_total_time(use_cache):
+        start_time = timeit.default_timer()
+        for curve_obj in curve_objs:
+            get_curve_length(curve_obj, use_cache=use_cache)
+        return timeit.default_timer() - start_time
+
+    clear_curve_length_cache()
+    result = {'num_curves': len(curve_objs),
+              'uncached_time': measure_total_time(use_cache=False),
+              'empty_cache_time': measure_total_time(use_cache=True),
+              'filled_cache_time': measure_total_time(use_cache=True)}
+    clear_curve_length_cache()
+    logger.info(str(result))
+    logger.info('benchmark_curve_length: Done')
+    return result
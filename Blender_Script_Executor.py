@@ -1,6 +1,7 @@
 # executes the module loader in blender
 import os
 import subprocess
+import sys
 from shutil import copyfile
 from Utility.OS_Extension import get_first_valid_path
 from Utility.Config import Config
@@ -31,7 +32,17 @@ from Utility.Logging_Extension import logger
 def execute_blender_script(blender_script_ifp,
                            background_mode=True,
                            path_to_blend_file=None,
-                           debug_output=False):
+                           debug_output=False,
+                           script_args=None,
+                           blocking=True,
+                           python_exit_code=None):
+    """
+    :param script_args: list of strings passed to the script (available in sys.argv after '--')
+    :param blocking: if False, the function returns immediately (without waiting for blender) and returns the
+        subprocess.Popen object
+    :param python_exit_code: if not None, blender exits with this code if the script raises an exception
+        (by default blender returns 0 even if the script fails)
+    """
     # ****
     # IF THE SCRIPT IS RUNNING IN FOREGROUND MODE NO PRINT INFORMATION
     # IS FLUSHED TO COMMAND LINE DURING EXECUTION
@@ -77,16 +88,33 @@ def execute_blender_script(blender_script_ifp,
     path_to_module_loader = os.path.join(
         path_to_blender_scripts_parent_folder, 'Blender_Library_Configuration.py')
 
+    if python_exit_code is not None:
+        options += ['--python-exit-code', str(python_exit_code)]
+
     options += ['--python', path_to_module_loader]
 
     options += ['--python', blender_script_ifp]
 
-    # options += ['--']  # this tells blender to treat the following arguments as custom arguments
-    # options += ['--module_path_1', str('some_path')]
+    if script_args is not None:
+        options += ['--']  # this tells blender to treat the following arguments as custom arguments
+        options += [str(script_arg) for script_arg in script_args]
 
     logger.info('Call scripts in blender ... (' + path_to_blender + ')')
+    if not blocking:
+        process = subprocess.Popen([path_to_blender] + options)
+        logger.info('execute_blender_script: Started (pid ' + str(process.pid) + ')')
+        return process
     subprocess.call([path_to_blender] + options)
 
     logger.info('execute_blender_script: Done')
 
 
+def get_script_args(argv=None):
+    """
+    Returns the arguments passed with execute_blender_script(..., script_args=...), i.e. the arguments after '--'
+    """
+    if argv is None:
+        argv = sys.argv
+    if '--' not in argv:
+        return []
+    return argv[argv.index('--') + 1:]
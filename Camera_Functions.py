@@ -48,3 +48,42 @@ def get_computer_vision_camera_matrix(blender_camera):
         opengl_cam_mat)
 
     return computer_vision_cam_mat
+
+
+def compute_calibration_mats(lens_values, sensor_width_values, shift_x_values, shift_y_values):
+    """
+    Vectorized version of get_calibration_mat() for camera parameters recorded at several frames
+    :param lens_values: (F,) focal lengths in mm
+    :param sensor_width_values: (F,) sensor widths in mm
+    :param shift_x_values: (F,)
+    :param shift_y_values: (F,)
+    :return: (F,3,3) array
+    """
+    scene = bpy.context.scene
+    render_resolution_width = scene.render.resolution_x
+    render_resolution_height = scene.render.resolution_y
+    max_extent = max(render_resolution_width, render_resolution_height)
+
+    focal_lengths_in_pixel = float(max_extent) * np.asarray(lens_values, dtype=np.float64) / \
+        np.asarray(sensor_width_values, dtype=np.float64)
+    p_x_values = render_resolution_width / 2.0 - np.asarray(shift_x_values, dtype=np.float64) * max_extent
+    p_y_values = render_resolution_height / 2.0 - np.asarray(shift_y_values, dtype=np.float64) * max_extent
+
+    # The intrinsics are usually not animated, i.e. the calibration matrix is computed once per distinct value
+    intrinsics = np.stack([focal_lengths_in_pixel, p_x_values, p_y_values], axis=1)
+    unique_intrinsics, inverse_indices = np.unique(intrinsics, axis=0, return_inverse=True)
+    unique_calibration_mats = np.array([
+        Camera.compute_calibration_mat(focal_length_in_pixel, cx=p_x, cy=p_y)
+        for focal_length_in_pixel, p_x, p_y in unique_intrinsics], dtype=np.float64)
+    return unique_calibration_mats[np.asarray(inverse_indices).reshape(-1)]
+
+
+def convert_opengl_to_computer_vision_camera_mats(opengl_cam_mats):
+    """
+    Vectorized version of convert_opengl_to_computer_vision_camera()
+    :param opengl_cam_mats: (F,4,4) camera to world matrices (e.g. matrix_world of a blender camera)
+    :return: (F,4,4) array
+    """
+    # The conversion rotates the camera around its x axis, i.e. it is a multiplication from the right
+    conversion_mat = convert_opengl_to_computer_vision_camera(np.identity(4))
+    return np.matmul(np.asarray(opengl_cam_mats, dtype=np.float64), conversion_mat)
@@ -0,0 +1,165 @@
+import numpy as np
+from Utility.Types.Camera import Camera
+from Utility.Types.Camera_Object_Trajectory import CameraObjectTrajectory
+from Utility.Types.Stereo_Camera import StereoCamera
+
+# This module does not depend on blender, i.e. the trajectory can also be processed outside of blender.
+
+
+def get_frame_stem(frame_number):
+    return 'frame' + str(int(frame_number)).zfill(5)
+
+
+def get_frame_name(frame_number):
+    return get_frame_stem(frame_number) + '.jpg'
+
+
+class CameraObjectTrajectoryArrays:
+    """
+    Array based alternative to CameraObjectTrajectory. The camera and object poses of all frames are stored
+    in (F,4,4) arrays. Camera (and StereoCamera) objects are only created on request.
+    """
+
+    def __init__(self,
+                 frame_numbers,
+                 cam_to_world_mats,
+                 calibration_mats,
+                 object_matrix_world_relative_to_initial_pose,
+                 render_stereo_camera=False,
+                 stereo_camera_baseline=None):
+        """
+        :param frame_numbers: (F,) array
+        :param cam_to_world_mats: (F,4,4) array (computer vision convention)
+        :param calibration_mats: (F,3,3) array
+        :param object_matrix_world_relative_to_initial_pose: (F,4,4) array
+        :param render_stereo_camera:
+        :param stereo_camera_baseline:
+        """
+        self.frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+        self.cam_to_world_mats = np.asarray(cam_to_world_mats, dtype=np.float64)
+        self.calibration_mats = np.asarray(calibration_mats, dtype=np.float64)
+        self.object_matrix_world_relative_to_initial_pose = np.asarray(
+            object_matrix_world_relative_to_initial_pose, dtype=np.float64)
+        num_frames = len(self.frame_numbers)
+        assert self.cam_to_world_mats.shape == (num_frames, 4, 4)
+        assert self.calibration_mats.shape == (num_frames, 3, 3)
+        assert self.object_matrix_world_relative_to_initial_pose.shape == (num_frames, 4, 4)
+        self.render_stereo_camera = render_stereo_camera
+        self.stereo_camera_baseline = stereo_camera_baseline
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+    def get_frame_names(self):
+        return [get_frame_name(frame_number) for frame_number in self.frame_numbers]
+
+    def get_camera_centers(self, expand_stereo_cameras=True):
+        """
+        :param expand_stereo_cameras: if True and the trajectory contains stereo cameras, the left and the right
+            camera center of each frame are returned (in this order)
+        :return: (F,3) or (2F,3) array
+        """
+        camera_centers = self.cam_to_world_mats[:, :3, 3]
+        if not (self.render_stereo_camera and expand_stereo_cameras):
+            return camera_centers
+        # The monocular camera is the left camera, the right camera is shifted along the (camera) x axis
+        right_camera_centers = camera_centers + self.stereo_camera_baseline * self.cam_to_world_mats[:, :3, 0]
+        stereo_camera_centers = np.empty((2 * len(camera_centers), 3), dtype=np.float64)
+        stereo_camera_centers[0::2] = camera_centers
+        stereo_camera_centers[1::2] = right_camera_centers
+        return stereo_camera_centers
+
+    def get_camera(self, frame_index):
+        """
+        Creates the Camera (or StereoCamera) of the frame (with the same attributes as the cameras created by
+        collect_camera_object_trajectory_information)
+        :param frame_index: index in [0, len(self))
+        :return: Camera or StereoCamera
+        """
+        frame_number = self.frame_numbers[frame_index]
+        cam = Camera()
+        cam.set_4x4_cam_to_world_mat(self.cam_to_world_mats[frame_index])
+        cam.set_calibration(self.calibration_mats[frame_index], 0)
+        if self.render_stereo_camera:
+            stereo_cam = StereoCamera(left_camera=cam, baseline=self.stereo_camera_baseline)
+            stereo_cam.left_camera.file_name = get_frame_stem(frame_number) + '_left.jpg'
+            stereo_cam.right_camera.file_name = get_frame_stem(frame_number) + '_right.jpg'
+            return stereo_cam
+        cam.file_name = get_frame_name(frame_number)
+        return cam
+
+    def get_object_matrix_world(self, frame_index):
+        return self.object_matrix_world_relative_to_initial_pose[frame_index]
+
+    def to_camera_object_trajectory(self):
+        """
+        Creates the Camera objects of all frames, e.g. to write the trajectory with TrajectoryFileHandler
+        :return: CameraObjectTrajectory
+        """
+        camera_object_trajectory = CameraObjectTrajectory()
+        for frame_index, frame_name in enumerate(self.get_frame_names()):
+            camera_object_trajectory.set_camera(frame_name, self.get_camera(frame_index))
+            camera_object_trajectory.set_object_matrix_world(frame_name, self.get_object_matrix_world(frame_index))
+        return camera_object_trajectory
+
+    def write(self, ofp):
+        """
+        Writes the trajectory as (uncompressed) .npz file, which can be loaded without parsing
+        """
+        np.savez(
+            ofp,
+            frame_numbers=self.frame_numbers,
+            frame_names=np.array(self.get_frame_names()),
+            cam_to_world_mats=self.cam_to_world_mats,
+            calibration_mats=self.calibration_mats,
+            object_matrix_world_relative_to_initial_pose=self.object_matrix_world_relative_to_initial_pose,
+            render_stereo_camera=self.render_stereo_camera,
+            stereo_camera_baseline=np.nan if self.stereo_camera_baseline is None else self.stereo_camera_baseline)
+
+    @classmethod
+    def read(cls, ifp):
+        """
+        :param ifp: file written with write()
+        :return: CameraObjectTrajectoryArrays
+        """
+        with np.load(ifp) as data:
+            stereo_camera_baseline = float(data['stereo_camera_baseline'])
+            return cls(
+                data['frame_numbers'],
+                data['cam_to_world_mats'],
+                data['calibration_mats'],
+                data['object_matrix_world_relative_to_initial_pose'],
+                render_stereo_camera=bool(data['render_stereo_camera']),
+                stereo_camera_baseline=None if np.isnan(stereo_camera_baseline) else stereo_camera_baseline)
+
+    def get_subset(self, frame_indices):
+        """
+        :param frame_indices: slice, index array or boolean mask
+        :return: CameraObjectTrajectoryArrays with the selected frames
+        """
+        return CameraObjectTrajectoryArrays(
+            self.frame_numbers[frame_indices],
+            self.cam_to_world_mats[frame_indices],
+            self.calibration_mats[frame_indices],
+            self.object_matrix_world_relative_to_initial_pose[frame_indices],
+            render_stereo_camera=self.render_stereo_camera,
+            stereo_camera_baseline=self.stereo_camera_baseline)
+
+    @classmethod
+    def concatenate(cls, camera_object_trajectory_arrays_list):
+        """
+        Concatenates several trajectories ordered by frame number
+        :return: CameraObjectTrajectoryArrays
+        """
+        first = camera_object_trajectory_arrays_list[0]
+        frame_numbers = np.concatenate([arrays.frame_numbers for arrays in camera_object_trajectory_arrays_list])
+        assert len(np.unique(frame_numbers)) == len(frame_numbers)    # Overlapping trajectories
+        order = np.argsort(frame_numbers, kind='stable')
+        return cls(
+            frame_numbers[order],
+            np.concatenate([arrays.cam_to_world_mats for arrays in camera_object_trajectory_arrays_list])[order],
+            np.concatenate([arrays.calibration_mats for arrays in camera_object_trajectory_arrays_list])[order],
+            np.concatenate([arrays.object_matrix_world_relative_to_initial_pose
+                            for arrays in camera_object_trajectory_arrays_list])[order],
+            render_stereo_camera=first.render_stereo_camera,
+            stereo_camera_baseline=first.stereo_camera_baseline)
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class PaletteMode:
+    BINS = 'BINS'
+    OCTREE = 'OCTREE'
+
+
+def _compute_palette_from_keys(colors, keys):
+    """
+    :param colors: (N,3) array
+    :param keys: (N,) integer array, points with the same key share a palette entry
+    :return: palette (K,3) uint8 array with the mean color of each entry, labels (N,) index into the palette
+    """
+    unique_keys, labels = np.unique(keys, return_inverse=True)
+    labels = labels.reshape(-1)
+    counts = np.bincount(labels, minlength=len(unique_keys)).astype(np.float64)
+    palette = np.empty((len(unique_keys), 3), dtype=np.float64)
+    for channel in range(3):
+        palette[:, channel] = np.bincount(
+            labels, weights=colors[:, channel], minlength=len(unique_keys)) / counts
+    palette = np.clip(np.round(palette), 0, 255).astype(np.uint8)
+    return palette, labels
+
+
+def quantize_colors_using_bins(colors, num_bins_per_channel=8):
+    """
+    Uniform quantization, i.e. each channel is divided into num_bins_per_channel bins.
+    The resulting palette contains at most num_bins_per_channel ** 3 (occupied) entries.
+    :param colors: (N,3) uint8 array
+    :param num_bins_per_channel:
+    :return: palette (K,3) uint8 array, labels (N,) array
+    """
+    assert 1 <= num_bins_per_channel <= 256
+    colors = np.asarray(colors).reshape(-1, 3)
+    bins = (colors.astype(np.int64) * num_bins_per_channel) // 256
+    keys = (bins[:, 0] * num_bins_per_channel + bins[:, 1]) * num_bins_per_channel + bins[:, 2]
+    return _compute_palette_from_keys(colors, keys)
+
+
+def quantize_colors_using_octree(colors, max_palette_size=256):
+    """
+    Each octree level d uses the d most significant bits of each channel.
+    The deepest level whose number of occupied nodes does not exceed max_palette_size defines the palette.
+    :param colors: (N,3) uint8 array
+    :param max_palette_size:
+    :return: palette (K,3) uint8 array, labels (N,) array
+    """
+    assert max_palette_size >= 1
+    colors = np.asarray(colors).reshape(-1, 3)
+    int_colors = colors.astype(np.int64)
+
+    # Level 0 (i.e. the root) contains all colors
+    keys = np.zeros(len(colors), dtype=np.int64)
+    for depth in range(1, 9):
+        shifted = int_colors >> (8 - depth)
+        depth_keys = (shifted[:, 0] << (2 * depth)) | (shifted[:, 1] << depth) | shifted[:, 2]
+        if len(np.unique(depth_keys)) > max_palette_size:
+            break
+        keys = depth_keys
+    return _compute_palette_from_keys(colors, keys)
+
+
+def quantize_colors(colors, palette_mode, num_bins_per_channel=8, max_palette_size=256):
+    if palette_mode == PaletteMode.BINS:
+        return quantize_colors_using_bins(colors, num_bins_per_channel)
+    elif palette_mode == PaletteMode.OCTREE:
+        return quantize_colors_using_octree(colors, max_palette_size)
+    else:
+        assert False
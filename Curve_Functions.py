@@ -1,31 +1,86 @@
+import hashlib
 import logging
 
 import bpy
+import numpy as np
 from mathutils import Vector
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger()
 
 
-def get_curve_length(curve_obj):
+# Maps a geometry fingerprint of a curve to its length in curve coordinates
+_curve_length_cache = {}
+
+
+def _get_spline_point_array(spline_points, attribute_name, num_components):
+    values = np.empty(len(spline_points) * num_components, dtype=np.float32)
+    spline_points.foreach_get(attribute_name, values)
+    return values
+
+
+def _compute_curve_geometry_fingerprint(curve_data):
+    """
+    Hashes the control points and the settings, which influence the tessellation of the curve.
+    This is much cheaper than converting the curve to a mesh.
+    """
+    fingerprint = hashlib.sha1()
+    # Bevel and extrusion change the edges of the mesh created by to_mesh()
+    bevel_object_name = curve_data.bevel_object.name if curve_data.bevel_object is not None else None
+    taper_object_name = curve_data.taper_object.name if curve_data.taper_object is not None else None
+    fingerprint.update(repr((curve_data.dimensions, curve_data.resolution_u, curve_data.twist_mode,
+                             curve_data.bevel_depth, curve_data.bevel_resolution, curve_data.extrude,
+                             curve_data.offset, bevel_object_name, taper_object_name)).encode('utf-8'))
+    for spline in curve_data.splines:
+        fingerprint.update(repr((spline.type, spline.resolution_u, spline.order_u, spline.use_cyclic_u,
+                                 spline.use_endpoint_u, spline.use_bezier_u)).encode('ascii'))
+        if spline.type == 'BEZIER':
+            for attribute_name in ['co', 'handle_left', 'handle_right']:
+                fingerprint.update(_get_spline_point_array(spline.bezier_points, attribute_name, 3).tobytes())
+        else:
+            fingerprint.update(_get_spline_point_array(spline.points, 'co', 4).tobytes())
+    return fingerprint.hexdigest()
+
+
+def _compute_curve_length_in_curve_coord(curve_obj):
+    # this does not alter the curve_obj
+    curve_mesh = curve_obj.to_mesh(bpy.context.scene, False, 'PREVIEW')
+
+    # https://docs.blender.org/api/blender_python_api_current/bpy.types.MeshEdges.html
+    # https://docs.blender.org/api/blender_python_api_current/bpy.types.MeshVertex.html
+    coords = np.empty(len(curve_mesh.vertices) * 3, dtype=np.float64)
+    curve_mesh.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3)
+    edge_vertex_indices = np.empty(len(curve_mesh.edges) * 2, dtype=np.int32)
+    curve_mesh.edges.foreach_get('vertices', edge_vertex_indices)
+    edge_vertex_indices = edge_vertex_indices.reshape(-1, 2)
+
+    # The temporary mesh is not freed automatically
+    bpy.data.meshes.remove(curve_mesh)
+
+    edge_vectors = coords[edge_vertex_indices[:, 0]] - coords[edge_vertex_indices[:, 1]]
+    return float(np.sum(np.linalg.norm(edge_vectors, axis=1)))
+
+
+def get_curve_length(curve_obj, use_cache=True):
     """
     Return the length (in Blender distance units) of the path.
+    :param curve_obj:
+    :param use_cache: if True, the length is cached (and reused for curves with the same geometry)
     """
 
     # # Convert the path to a mesh and use the edges to compute the path length
     # https://docs.blender.org/api/blender_python_api_current/bpy.types.Curve.html
     # curve to mesh
 
-    # this does not alter the curve_obj
-    curve_mesh = curve_obj.to_mesh(bpy.context.scene, False, 'PREVIEW')
-
-    curve_length_in_curve_coord = 0
-    # https://docs.blender.org/api/blender_python_api_current/bpy.types.MeshEdges.html
-    # https://docs.blender.org/api/blender_python_api_current/bpy.types.MeshVertex.html
-    for edge in curve_mesh.edges:
-        vert_0 = curve_mesh.vertices[edge.vertices[0]].co
-        vert_1 = curve_mesh.vertices[edge.vertices[1]].co
-        curve_length_in_curve_coord += (vert_0 - vert_1).length
+    if use_cache:
+        fingerprint = _compute_curve_geometry_fingerprint(curve_obj.data)
+        curve_length_in_curve_coord = _curve_length_cache.get(fingerprint)
+        if curve_length_in_curve_coord is None:
+            curve_length_in_curve_coord = _compute_curve_length_in_curve_coord(curve_obj)
+            _curve_length_cache[fingerprint] = curve_length_in_curve_coord
+    else:
+        curve_length_in_curve_coord = _compute_curve_length_in_curve_coord(curve_obj)
 
     scale_vec = curve_obj.matrix_world.to_scale()
     assert scale_vec[0] == scale_vec[1] == scale_vec[2]
@@ -40,6 +95,10 @@ def get_curve_length(curve_obj):
     return curve_length_in_world_coord
 
 
+def clear_curve_length_cache():
+    _curve_length_cache.clear()
+
+
 def get_curve_start_coordinate(curve_name):
     curve = bpy.data.objects[curve_name]
     assert len(curve.data.splines) == 1
@@ -137,12 +196,77 @@ def attach_camera_or_object_to_path(camera_or_object_name,
     logger.info('attach_camera_or_object_to_path: Done')
 
 
-def create_curve_from_coordinates(path_name, vertices):
+# Curves with more points may result in slow animations
+_max_num_curve_points_without_warning = 10000
+
+
+def _compute_point_to_segment_distances(points, segment_start, segment_end):
+    segment_vec = segment_end - segment_start
+    segment_length_squared = np.dot(segment_vec, segment_vec)
+    if segment_length_squared == 0:
+        return np.linalg.norm(points - segment_start, axis=1)
+    t = np.clip(np.dot(points - segment_start, segment_vec) / segment_length_squared, 0.0, 1.0)
+    closest_points = segment_start + t[:, np.newaxis] * segment_vec
+    return np.linalg.norm(points - closest_points, axis=1)
+
+
+def compute_douglas_peucker_simplification(vertices, tolerance):
+    """
+    Simplifies a polyline with the Douglas-Peucker algorithm. The first and the last vertex are always kept.
+    :param vertices: (N,3) array
+    :param tolerance: maximal distance (in Blender units) between a removed vertex and the simplified polyline
+    :return: indices of the kept vertices, maximal distance of the removed vertices to the simplified polyline
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    num_vertices = len(vertices)
+    if num_vertices < 3:
+        return np.arange(num_vertices), 0.0
+
+    keep_mask = np.zeros(num_vertices, dtype=bool)
+    keep_mask[0] = keep_mask[-1] = True
+    max_deviation = 0.0
+    # Iterative instead of recursive, since dense paths may exceed the recursion limit
+    segment_stack = [(0, num_vertices - 1)]
+    while segment_stack:
+        start_index, end_index = segment_stack.pop()
+        if end_index - start_index < 2:
+            continue
+        distances = _compute_point_to_segment_distances(
+            vertices[start_index + 1:end_index], vertices[start_index], vertices[end_index])
+        max_distance_index = int(np.argmax(distances))
+        max_distance = float(distances[max_distance_index])
+        if max_distance > tolerance:
+            split_index = start_index + 1 + max_distance_index
+            keep_mask[split_index] = True
+            segment_stack.append((start_index, split_index))
+            segment_stack.append((split_index, end_index))
+        else:
+            max_deviation = max(max_deviation, max_distance)
+    return np.flatnonzero(keep_mask), max_deviation
+
+
+def create_curve_from_coordinates(path_name, vertices, simplification_tolerance=None):
+    """
+    :param path_name:
+    :param vertices: (N,3) array or list of coordinates
+    :param simplification_tolerance: if not None, the vertices are simplified with the Douglas-Peucker algorithm
+        using this tolerance (in Blender units) before creating the curve
+    :return: the curve object
+    """
 
     # https://www.blender.org/api/blender_python_api_current/bpy.types.Curve.html
 
     logger.info('Create curve from coordinates: ...')
-    if len(vertices):
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+
+    if simplification_tolerance is not None:
+        num_input_vertices = len(vertices)
+        kept_indices, max_deviation = compute_douglas_peucker_simplification(vertices, simplification_tolerance)
+        vertices = vertices[kept_indices]
+        logger.info('Simplified curve vertices from ' + str(num_input_vertices) + ' to ' + str(len(vertices)) +
+                    ' (max deviation: ' + str(max_deviation) + ', tolerance: ' + str(simplification_tolerance) + ')')
+
+    if len(vertices) > _max_num_curve_points_without_warning:
         logger.info('Len of vertices is ' + str(len(vertices)) + '. The resulting animation could be slow!')
 
     # https://www.blender.org/api/blender_python_api_2_77_release/bpy.types.Curve.html#bpy.types.Curve
@@ -162,9 +286,10 @@ def create_curve_from_coordinates(path_name, vertices):
 
     # https://www.blender.org/api/blender_python_api_2_78a_release/bpy.types.CurveSplines.html
 
-    for index in range(len(vertices)):
-        x, y, z = vertices[index]
-        nurbs_spline.points[index].co = (x, y, z, 1)
+    # Set all points at once, the spline points have homogeneous coordinates (x, y, z, w)
+    homogeneous_vertices = np.ones((len(vertices), 4), dtype=np.float32)
+    homogeneous_vertices[:, :3] = vertices
+    nurbs_spline.points.foreach_set('co', homogeneous_vertices.ravel())
 
     # =================== deprecated ===================
     # to expensive when many objects are in the scene
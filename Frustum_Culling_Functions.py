@@ -0,0 +1,150 @@
+import bpy
+import numpy as np
+from BlenderUtility.Camera_Functions import get_calibration_mat
+from BlenderUtility.Camera_Functions import get_computer_vision_camera_matrix
+from Utility.Logging_Extension import logger
+
+# Determines the points of a point cloud, which are visible from a camera, i.e. which are projected into the image.
+# Uses the computer vision convention (x right, y down, z pointing in viewing direction).
+
+
+def compute_points_in_frustum_mask(coords,
+                                   calibration_mat,
+                                   cam_to_world_mat,
+                                   image_width,
+                                   image_height,
+                                   margin_in_pixel=0.0,
+                                   clip_start=0.0,
+                                   clip_end=None):
+    """
+    :param coords: (N,3) array of world coordinates
+    :param calibration_mat: (3,3) array, e.g. the result of get_calibration_mat()
+    :param cam_to_world_mat: (4,4) array, e.g. the result of get_computer_vision_camera_matrix()
+    :param image_width:
+    :param image_height:
+    :param margin_in_pixel: safety margin around the image (e.g. to account for the extent of the points)
+    :param clip_start: points closer to the camera are culled
+    :param clip_end: points farther from the camera are culled (optional)
+    :return: (N,) boolean array
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    cam_to_world_mat = np.asarray(cam_to_world_mat, dtype=np.float64)
+    rotation_mat = cam_to_world_mat[:3, :3]
+    center = cam_to_world_mat[:3, 3]
+
+    # Since rotation_mat is orthonormal, (coords - center) * R equals (R^T * (coords - center)^T)^T
+    cam_coords = (coords - center).dot(rotation_mat)
+    depths = cam_coords[:, 2]
+    mask = depths > max(clip_start, 0.0)
+    if clip_end is not None:
+        mask &= depths < clip_end
+
+    image_coords = cam_coords[mask].dot(np.asarray(calibration_mat, dtype=np.float64).T)
+    x = image_coords[:, 0] / image_coords[:, 2]
+    y = image_coords[:, 1] / image_coords[:, 2]
+    mask[mask] = (x >= -margin_in_pixel) & (x < image_width + margin_in_pixel) & \
+                 (y >= -margin_in_pixel) & (y < image_height + margin_in_pixel)
+    return mask
+
+
+def get_camera_frustum_parameters(blender_camera):
+    """
+    :return: calibration matrix, camera to world matrix, image width, image height, clip start, clip end
+    """
+    scene = bpy.context.scene
+    return get_calibration_mat(blender_camera), \
+        get_computer_vision_camera_matrix(blender_camera), \
+        scene.render.resolution_x, \
+        scene.render.resolution_y, \
+        blender_camera.data.clip_start, \
+        blender_camera.data.clip_end
+
+
+def compute_visible_points_mask(coords, blender_camera, margin_in_pixel=0.0, use_clipping=True):
+    calibration_mat, cam_to_world_mat, image_width, image_height, clip_start, clip_end = \
+        get_camera_frustum_parameters(blender_camera)
+    if not use_clipping:
+        clip_start, clip_end = 0.0, None
+    return compute_points_in_frustum_mask(
+        coords,
+        calibration_mat,
+        cam_to_world_mat,
+        image_width,
+        image_height,
+        margin_in_pixel=margin_in_pixel,
+        clip_start=clip_start,
+        clip_end=clip_end)
+
+
+def compute_visible_points_mask_for_frames(coords,
+                                           blender_cameras,
+                                           frames=None,
+                                           margin_in_pixel=0.0,
+                                           use_clipping=True):
+    """
+    Computes the union of the points visible from any of the cameras in any of the frames.
+    :param coords: (N,3) array of world coordinates
+    :param blender_cameras: list of camera objects
+    :param frames: list of frame numbers (optional). If None, the current frame is used.
+    :param margin_in_pixel:
+    :param use_clipping: if True, the clip_start and clip_end values of the cameras are respected
+    :return: (N,) boolean array
+    """
+    scene = bpy.context.scene
+    current_frame = scene.frame_current
+    if frames is None:
+        frames = [current_frame]
+    coords = np.asarray(coords).reshape(-1, 3)
+    mask = np.zeros(len(coords), dtype=bool)
+    for frame in frames:
+        if frame != scene.frame_current:
+            scene.frame_set(frame)
+        for blender_camera in blender_cameras:
+            # Only the points which are not already visible must be projected
+            remaining_indices = np.flatnonzero(~mask)
+            remaining_mask = compute_visible_points_mask(
+                coords[remaining_indices], blender_camera, margin_in_pixel, use_clipping)
+            mask[remaining_indices[remaining_mask]] = True
+    if scene.frame_current != current_frame:
+        scene.frame_set(current_frame)
+    return mask
+
+
+class PointCloudFrustumCulling:
+    """ Bundles the culling parameters, which can be passed to the creation methods of PointCloudTool """
+
+    def __init__(self, camera_names, frames=None, margin_in_pixel=0.0, use_clipping=True):
+        """
+        :param camera_names: name of a camera object or list of camera object names
+        :param frames: list of frame numbers (optional). If None, the current frame is used.
+        :param margin_in_pixel: safety margin around the image
+        :param use_clipping:
+        """
+        if isinstance(camera_names, str):
+            camera_names = [camera_names]
+        self.camera_names = camera_names
+        self.frames = frames
+        self.margin_in_pixel = margin_in_pixel
+        self.use_clipping = use_clipping
+
+    def compute_mask(self, coords):
+        blender_cameras = [bpy.data.objects[camera_name] for camera_name in self.camera_names]
+        return compute_visible_points_mask_for_frames(
+            coords,
+            blender_cameras,
+            frames=self.frames,
+            margin_in_pixel=self.margin_in_pixel,
+            use_clipping=self.use_clipping)
+
+    def apply(self, coords, colors):
+        """
+        :param coords: (N,3) array of world coordinates
+        :param colors: (N,3) array or None
+        :return: coordinates and colors of the visible points
+        """
+        coords = np.asarray(coords).reshape(-1, 3)
+        mask = self.compute_mask(coords)
+        logger.info('Visible points: ' + str(np.count_nonzero(mask)) + ' of ' + str(len(coords)))
+        if colors is not None:
+            colors = np.asarray(colors).reshape(-1, 3)[mask]
+        return coords[mask], colors
@@ -0,0 +1,26 @@
+# Blender script processing one shard of Ground_Truth_Sharding_Functions.write_animation_ground_truth_to_disc_sharded()
+# Executed by Blender_Script_Executor.execute_blender_script() (after Blender_Library_Configuration.py, which adds
+# the parent folder of BlenderUtility to the python path), e.g.
+#   blender scene.blend --background --python-exit-code 1 --python Blender_Library_Configuration.py
+#       --python Ground_Truth_Shard_Script.py -- --path_to_ground_truth_folder ... --shard_index 0 ...
+# See get_shard_script_args() and get_shard_ground_truth_script_args() for the arguments.
+
+from mathutils import Matrix
+
+from BlenderUtility.Animation_Functions import write_animation_ground_truth_shard
+from BlenderUtility.Ground_Truth_Sharding_Functions import parse_shard_ground_truth_script_args
+from BlenderUtility.Ground_Truth_Sharding_Functions import parse_shard_script_args
+
+
+def process_ground_truth_shard():
+    shard_args = parse_shard_script_args()
+    ground_truth_args = parse_shard_ground_truth_script_args()
+    # The animation functions use mathutils operations (e.g. inverted())
+    ground_truth_args['car_body_matrix_world_after_loading'] = Matrix(
+        ground_truth_args['car_body_matrix_world_after_loading'].tolist())
+    ground_truth_args.update(shard_args)
+    write_animation_ground_truth_shard(**ground_truth_args)
+
+
+if __name__ == '__main__':
+    process_ground_truth_shard()
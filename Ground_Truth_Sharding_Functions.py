@@ -0,0 +1,257 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from BlenderUtility.Blender_Script_Executor import execute_blender_script
+from BlenderUtility.Blender_Script_Executor import get_script_args
+from BlenderUtility.Camera_Object_Trajectory_Arrays import CameraObjectTrajectoryArrays
+from BlenderUtility.Trajectory_Output_Functions import write_camera_object_trajectory_files
+from Utility.Logging_Extension import logger
+from Utility.OS_Extension import mkdir_safely
+
+# Splits the frame range of the ground truth extraction into shards, which are processed by separate (background)
+# blender processes. write_animation_ground_truth_to_disc_sharded() must be executed OUTSIDE of blender, while
+# parse_shard_script_args() and write_trajectory_shard() are used within the blender processes of the shards.
+#
+# Ground_Truth_Shard_Script.py is the blender script executed for each shard (default of
+# write_animation_ground_truth_to_disc_sharded()). A custom script must call
+#   Animation_Functions.write_animation_ground_truth_shard(..., **parse_shard_script_args())
+#
+# Note: each shard sets the frames of its range directly (without evaluating the previous frames). This requires
+# that the pose at each frame depends only on the animation data (e.g. keyframes or follow path constraints).
+
+_SHARD_FOLDER_NAME = 'shards'
+
+
+def compute_frame_range_shards(frame_start, frame_end, num_shards):
+    """
+    :param frame_start: first frame (inclusive)
+    :param frame_end: last frame (inclusive)
+    :param num_shards:
+    :return: list of (shard_frame_start, shard_frame_end) tuples (inclusive) with almost equal sizes
+    """
+    num_frames = frame_end - frame_start + 1
+    num_shards = max(min(num_shards, num_frames), 1)
+    boundaries = frame_start + (np.arange(num_shards + 1) * num_frames) // num_shards
+    return [(int(boundaries[index]), int(boundaries[index + 1] - 1)) for index in range(num_shards)]
+
+
+def get_shard_trajectory_file_path(path_to_ground_truth_folder, shard_index):
+    return os.path.join(
+        path_to_ground_truth_folder, _SHARD_FOLDER_NAME, 'trajectory_shard_' + str(shard_index).zfill(4) + '.npz')
+
+
+def get_shard_script_args(path_to_ground_truth_folder, shard_index, frame_start, frame_end):
+    return ['--path_to_ground_truth_folder', path_to_ground_truth_folder,
+            '--shard_index', str(shard_index),
+            '--frame_start', str(frame_start),
+            '--frame_end', str(frame_end)]
+
+
+def parse_shard_script_args(script_args=None):
+    """
+    Must be called within the blender script of a shard
+    :param script_args: the result of Blender_Script_Executor.get_script_args() (default)
+    :return: dict with the entries path_to_ground_truth_folder, shard_index, frame_start and frame_end
+    """
+    if script_args is None:
+        script_args = get_script_args()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path_to_ground_truth_folder', required=True)
+    parser.add_argument('--shard_index', type=int, required=True)
+    parser.add_argument('--frame_start', type=int, required=True)
+    parser.add_argument('--frame_end', type=int, required=True)
+    # The remaining arguments are parsed by parse_shard_ground_truth_script_args()
+    shard_args, _ = parser.parse_known_args(script_args)
+    return vars(shard_args)
+
+
+def get_shard_ground_truth_script_args(virtual_camera_name,
+                                       car_body_name,
+                                       car_body_matrix_world_after_loading,
+                                       render_stereo_camera=False,
+                                       stereo_camera_baseline=None,
+                                       write_animation_ground_truth_mesh=True,
+                                       use_direct_ply_export=False):
+    """
+    Arguments of Ground_Truth_Shard_Script.py, which are identical for all shards
+    :param car_body_matrix_world_after_loading: 4x4 matrix (e.g. mathutils.Matrix or numpy array)
+    """
+    script_args = ['--virtual_camera_name', virtual_camera_name,
+                   '--car_body_name', car_body_name,
+                   '--car_body_matrix_world_after_loading']
+    script_args += [repr(float(value)) for value in np.array(car_body_matrix_world_after_loading).reshape(16)]
+    if render_stereo_camera:
+        script_args += ['--render_stereo_camera', '--stereo_camera_baseline', repr(float(stereo_camera_baseline))]
+    if not write_animation_ground_truth_mesh:
+        script_args += ['--skip_animation_ground_truth_mesh']
+    if use_direct_ply_export:
+        script_args += ['--use_direct_ply_export']
+    return script_args
+
+
+def parse_shard_ground_truth_script_args(script_args=None):
+    """
+    Counterpart of get_shard_ground_truth_script_args() (used by Ground_Truth_Shard_Script.py)
+    :return: dict with the keyword arguments of Animation_Functions.write_animation_ground_truth_shard() (except
+        the ones returned by parse_shard_script_args()). car_body_matrix_world_after_loading is a (4,4) array.
+    """
+    if script_args is None:
+        script_args = get_script_args()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--virtual_camera_name', required=True)
+    parser.add_argument('--car_body_name', required=True)
+    parser.add_argument('--car_body_matrix_world_after_loading', type=float, nargs=16, required=True)
+    parser.add_argument('--render_stereo_camera', action='store_true')
+    parser.add_argument('--stereo_camera_baseline', type=float, default=None)
+    parser.add_argument('--skip_animation_ground_truth_mesh', action='store_true')
+    parser.add_argument('--use_direct_ply_export', action='store_true')
+    args, _ = parser.parse_known_args(script_args)
+    return {'virtual_camera_name': args.virtual_camera_name,
+            'car_body_name': args.car_body_name,
+            'car_body_matrix_world_after_loading': np.array(args.car_body_matrix_world_after_loading).reshape(4, 4),
+            'render_stereo_camera': args.render_stereo_camera,
+            'stereo_camera_baseline': args.stereo_camera_baseline,
+            'write_animation_ground_truth_mesh': not args.skip_animation_ground_truth_mesh,
+            'use_direct_ply_export': args.use_direct_ply_export}
+
+
+def write_trajectory_shard(camera_object_trajectory_arrays, shard_trajectory_ofp):
+    mkdir_safely(os.path.dirname(shard_trajectory_ofp))
+    camera_object_trajectory_arrays.write(shard_trajectory_ofp)
+
+
+def merge_trajectory_shards(shard_trajectory_ifps):
+    """
+    Concatenates the shards ordered by frame number (i.e. independent of the order of shard_trajectory_ifps)
+    :return: CameraObjectTrajectoryArrays
+    """
+    return CameraObjectTrajectoryArrays.concatenate(
+        [CameraObjectTrajectoryArrays.read(shard_trajectory_ifp) for shard_trajectory_ifp in shard_trajectory_ifps])
+
+
+def get_shard_script_ifp():
+    """ :return: path of Ground_Truth_Shard_Script.py """
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'Ground_Truth_Shard_Script.py')
+
+
+def run_blender_script_shards(blender_script_ifp, path_to_blend_file, shard_script_args_list, num_workers=None):
+    """
+    Executes the blender script once per shard with at most num_workers concurrent blender processes.
+    A shard fails, if its script raises an exception (blender is called with --python-exit-code).
+    :param shard_script_args_list: list of script argument lists (one per shard)
+    :param num_workers: number of concurrent blender processes (default is the number of cores)
+    """
+    logger.info('run_blender_script_shards: ...')
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    pending_shard_indices = list(range(len(shard_script_args_list)))
+    running_processes = {}
+    failed_shard_indices = []
+    while pending_shard_indices or running_processes:
+        while pending_shard_indices and len(running_processes) < num_workers:
+            shard_index = pending_shard_indices.pop(0)
+            running_processes[shard_index] = execute_blender_script(
+                blender_script_ifp,
+                background_mode=True,
+                path_to_blend_file=path_to_blend_file,
+                script_args=shard_script_args_list[shard_index],
+                blocking=False,
+                python_exit_code=1)
+        for shard_index, process in list(running_processes.items()):
+            return_code = process.poll()
+            if return_code is not None:
+                del running_processes[shard_index]
+                logger.info('Shard ' + str(shard_index) + ' finished with return code ' + str(return_code))
+                if return_code != 0:
+                    failed_shard_indices.append(shard_index)
+        time.sleep(0.1)
+
+    if failed_shard_indices:
+        logger.vinfo('failed_shard_indices', sorted(failed_shard_indices))
+        assert False
+    logger.info('run_blender_script_shards: Done')
+
+
+def write_animation_ground_truth_to_disc_sharded(
+        blender_script_ifp,
+        path_to_blend_file,
+        frame_end,
+        virtual_camera_name,
+        car_body_name,
+        path_to_output_render_folder,
+        num_shards,
+        num_workers=None,
+        output_file_folder='ground_truth_files',
+        output_animation_transformation_txt_file_name='animation_transformations.txt',
+        output_camera_trajectory_ply_file_name='camera_trajectory.ply',
+        output_camera_trajectory_nvm_file_name='output_camera_trajectory_nvm_file_name',
+        output_animation_transformation_npz_file_name='animation_transformations.npz',
+        car_body_matrix_world_after_loading=None,
+        render_stereo_camera=False,
+        stereo_camera_baseline=None,
+        write_animation_ground_truth_mesh=True,
+        use_direct_ply_export=False):
+    """
+    Sharded version of Animation_Functions.write_animation_ground_truth_to_disc().
+    The ground truth meshes are written by the shards directly (the frame names are unique). The trajectories
+    of the shards are merged (ordered by frame number) and written as trajectory, ply and nvm file.
+    :param blender_script_ifp: script calling Animation_Functions.write_animation_ground_truth_shard().
+        If None, Ground_Truth_Shard_Script.py is used, which requires car_body_matrix_world_after_loading.
+        The settings (car_body_matrix_world_after_loading, ..., use_direct_ply_export) are passed to the shards
+        with get_shard_ground_truth_script_args().
+    :param path_to_blend_file: scene opened by each shard
+    :param frame_end: the frames 1, ..., frame_end are processed
+    :param num_shards:
+    :param num_workers: number of concurrent blender processes (default is the number of cores)
+    """
+    logger.info('write_animation_ground_truth_to_disc_sharded: ...')
+    path_to_ground_truth_folder = os.path.join(path_to_output_render_folder, output_file_folder)
+    mkdir_safely(path_to_ground_truth_folder)
+
+    if blender_script_ifp is None:
+        if car_body_matrix_world_after_loading is None:
+            logger.info('Ground_Truth_Shard_Script.py requires car_body_matrix_world_after_loading')
+            assert False
+        blender_script_ifp = get_shard_script_ifp()
+    ground_truth_script_args = []
+    if car_body_matrix_world_after_loading is not None:
+        ground_truth_script_args = get_shard_ground_truth_script_args(
+            virtual_camera_name,
+            car_body_name,
+            car_body_matrix_world_after_loading,
+            render_stereo_camera=render_stereo_camera,
+            stereo_camera_baseline=stereo_camera_baseline,
+            write_animation_ground_truth_mesh=write_animation_ground_truth_mesh,
+            use_direct_ply_export=use_direct_ply_export)
+
+    frame_range_shards = compute_frame_range_shards(1, frame_end, num_shards)
+    shard_script_args_list = [
+        get_shard_script_args(path_to_ground_truth_folder, shard_index, shard_frame_start, shard_frame_end) +
+        ground_truth_script_args
+        for shard_index, (shard_frame_start, shard_frame_end) in enumerate(frame_range_shards)]
+    run_blender_script_shards(blender_script_ifp, path_to_blend_file, shard_script_args_list, num_workers)
+
+    shard_trajectory_ifps = [get_shard_trajectory_file_path(path_to_ground_truth_folder, shard_index)
+                             for shard_index in range(len(frame_range_shards))]
+    camera_object_trajectory_arrays = merge_trajectory_shards(shard_trajectory_ifps)
+    if len(camera_object_trajectory_arrays) != frame_end:
+        logger.vinfo('len(camera_object_trajectory_arrays)', len(camera_object_trajectory_arrays))
+        assert False    # Missing frames
+    if output_animation_transformation_npz_file_name is not None:
+        camera_object_trajectory_arrays.write(
+            os.path.join(path_to_ground_truth_folder, output_animation_transformation_npz_file_name))
+    write_camera_object_trajectory_files(
+        camera_object_trajectory_arrays.to_camera_object_trajectory(),
+        path_to_ground_truth_folder,
+        virtual_camera_name,
+        car_body_name,
+        output_animation_transformation_txt_file_name=output_animation_transformation_txt_file_name,
+        output_camera_trajectory_ply_file_name=output_camera_trajectory_ply_file_name,
+        output_camera_trajectory_nvm_file_name=output_camera_trajectory_nvm_file_name,
+        camera_object_trajectory_arrays=camera_object_trajectory_arrays)
+
+    for shard_trajectory_ifp in shard_trajectory_ifps:
+        os.remove(shard_trajectory_ifp)
+    logger.info('write_animation_ground_truth_to_disc_sharded: Done')
@@ -2,8 +2,12 @@ import os
 from collections import OrderedDict
 
 import bpy
+import numpy as np
 from BlenderUtility.Ops_Functions import make_object_active
 from BlenderUtility.Point_Cloud_Tool import PointCloudTool, VertexType
+from BlenderUtility.Object_Functions import get_evaluated_mesh_world_arrays
+from BlenderUtility.PLY_Binary_Functions import read_binary_ply_coords_and_colors
+from BlenderUtility.PLY_Binary_Functions import write_binary_ply
 from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
 from Utility.Logging_Extension import logger
 
@@ -172,6 +176,24 @@ def import_ply_as_point_cloud(object_fps, get_index_str_of_ply, prefix=None, poi
     return index_str_to_obj
 
 
+def import_binary_ply_as_point_cloud_mesh(ifp, obj_name=None, downsampling=None):
+
+    """
+    Memory maps the vertices of a binary ply file and passes the coordinates and colors directly to the bulk mesh
+    creation (i.e. without creating a Point object per vertex).
+    By default the file stem is used as object name.
+    """
+
+    logger.info('import_binary_ply_as_point_cloud_mesh: ...')
+    if obj_name is None:
+        obj_name = os.path.splitext(os.path.basename(ifp))[0]
+    coords, colors = read_binary_ply_coords_and_colors(ifp)
+    point_cloud_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+        coords, obj_name, colors=colors, downsampling=downsampling)
+    logger.info('import_binary_ply_as_point_cloud_mesh: Done')
+    return point_cloud_obj
+
+
 def export_ply(object_name, path_to_ply, export_triangulated_mesh=True):
 
     logger.info('export_ply: ...')
@@ -210,4 +232,59 @@ def export_ply(object_name, path_to_ply, export_triangulated_mesh=True):
 
     bpy.data.objects[object_name].hide = hidden
     bpy.ops.object.select_all(action='DESELECT')
-    logger.info('export_ply: Done')
\ No newline at end of file
+    logger.info('export_ply: Done')
+
+
+def _write_binary_ply_and_notify(on_written, path_to_ply, coords, triangles, normals, uv_coords):
+    write_binary_ply(path_to_ply, coords, triangles, normals, uv_coords)
+    if on_written is not None:
+        on_written()
+
+
+def export_ply_direct(object_names,
+                      path_to_ply,
+                      use_normals=True,
+                      use_uv_coords=True,
+                      apply_modifiers=True,
+                      background_writer=None,
+                      on_written=None):
+    """
+    Alternative to export_ply(), which does not use bpy.ops (i.e. the selection, the active object and the
+    modifiers are not changed). The evaluated (and triangulated) meshes are read in bulk and written as binary
+    little endian ply file.
+    :param object_names: name of a mesh object or list of names (the meshes are combined, like join_copy_of_objects)
+    :param path_to_ply:
+    :param use_normals:
+    :param use_uv_coords: uv coordinates are only written, if all meshes have an uv layer
+    :param apply_modifiers:
+    :param background_writer: object with a submit(function, *args) method (e.g. a ThreadPoolExecutor). If
+        provided, the file is written in the background and the result of submit() is returned.
+    :param on_written: function without arguments (optional), which is called after the file has been written
+        completely. With a background_writer, it is called in the writer thread as part of the submitted write,
+        i.e. it has finished when the background writer's flush() returns.
+    """
+    if isinstance(object_names, str):
+        object_names = [object_names]
+    mesh_arrays_list = [
+        get_evaluated_mesh_world_arrays(
+            bpy.data.objects[object_name],
+            use_normals=use_normals,
+            use_uv_coords=use_uv_coords,
+            apply_modifiers=apply_modifiers)
+        for object_name in object_names]
+
+    vertex_offsets = np.cumsum([0] + [len(mesh_arrays['coords']) for mesh_arrays in mesh_arrays_list])
+    coords = np.concatenate([mesh_arrays['coords'] for mesh_arrays in mesh_arrays_list])
+    triangles = np.concatenate([mesh_arrays['triangles'] + vertex_offset
+                                for mesh_arrays, vertex_offset in zip(mesh_arrays_list, vertex_offsets)])
+    normals = None
+    if use_normals:
+        normals = np.concatenate([mesh_arrays['normals'] for mesh_arrays in mesh_arrays_list])
+    uv_coords = None
+    if use_uv_coords and all('uv_coords' in mesh_arrays for mesh_arrays in mesh_arrays_list):
+        uv_coords = np.concatenate([mesh_arrays['uv_coords'] for mesh_arrays in mesh_arrays_list])
+
+    if background_writer is not None:
+        return background_writer.submit(
+            _write_binary_ply_and_notify, on_written, path_to_ply, coords, triangles, normals, uv_coords)
+    _write_binary_ply_and_notify(on_written, path_to_ply, coords, triangles, normals, uv_coords)
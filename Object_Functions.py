@@ -3,10 +3,14 @@ import os
 import os.path
 from math import radians
 
+import bmesh
 import bpy
+import numpy as np
 from mathutils import Matrix, Vector
 
 from BlenderUtility.Ops_Functions import set_mode, check_ops_prerequisites
+from BlenderUtility.Array_Geometry_Functions import apply_matrix_to_coords
+from BlenderUtility.Object_Handle_Index import resolve_objects
 from Utility.Math.Conversion.Conversion_Collection import invert_y_and_z_axis
 
 import logging
@@ -90,19 +94,40 @@ def move_object_to_layer(object_name, layer_id):
 
 
 def add_points_as_mesh(points):
-    logger.info("Adding point cloud...")
-    name = "Point_Cloud"
-    mesh = bpy.data.meshes.new(name)
-    mesh.update()
-    mesh.validate()
+    coords = np.array([point.coord for point in points], dtype=np.float32)
+    return add_coords_as_mesh(coords)
 
-    points = [tuple(point.coord) for point in points]
 
-    mesh.from_pydata(points, [], [])
+def add_coords_as_mesh(coords, name="Point_Cloud"):
+    """
+    :param coords: (N,3) array
+    :param name:
+    :return:
+    """
+    logger.info("Adding point cloud...")
+    mesh = bpy.data.meshes.new(name)
+    add_vertices_to_mesh(mesh, coords)
     meshobj = add_obj(mesh, name)
 
     # TODO replace matrix with identity matrix
     meshobj.matrix_world = Matrix.Rotation(radians(0), 4, 'X')
+    return meshobj
+
+
+def add_vertices_to_mesh(mesh, coords):
+    """
+    Sizes the mesh once and writes all coordinates with a single foreach_set call.
+    This avoids the list of tuples required by mesh.from_pydata()
+    :param mesh: an empty mesh
+    :param coords: (N,3) array
+    :return:
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    mesh.vertices.add(len(coords))
+    # foreach_set expects a flat sequence
+    mesh.vertices.foreach_set('co', coords.ravel())
+    mesh.update()
+    mesh.validate()
 
 
 def add_obj(data, obj_name):
@@ -417,17 +442,174 @@ def convert_object_to_mesh_or_curve(original_object, target, keep_original=False
     logger.info('convert_object_to_mesh_or_curve: Done')
 
 
-def get_mesh_vertex_world_coordinates(mesh_object_name):
+def get_mesh_vertex_coordinates_as_array(mesh):
+    """ Reads all vertex coordinates (in object coordinates) with a single foreach_get call """
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
 
-    mesh_vertex_coordinates = []
+
+def get_mesh_vertex_world_coordinates_as_array(mesh_object_name):
+    """ :return: (N,3) array """
     mesh_object = bpy.data.objects[mesh_object_name]
-    mesh = mesh_object.data
-    for vert in mesh.vertices:
-        #vertex_world_coords = transform_vec_in_object_coordinates_to_world_coordinates(vert.co, mesh_object)
-        vertex_world_coords = mesh_object.matrix_world * vert.co
-        mesh_vertex_coordinates.append(vertex_world_coords)
+    mesh_vertex_coordinates = get_mesh_vertex_coordinates_as_array(mesh_object.data)
+    return apply_matrix_to_coords(np.array(mesh_object.matrix_world), mesh_vertex_coordinates)
+
+
+def get_mesh_triangle_loops_as_array(mesh):
+    """
+    Fan triangulation of all polygons, computed from the polygon arrays (without modifying the mesh).
+    The fan triangulation is only correct for convex polygons, use triangulate_mesh() for arbitrary meshes.
+    :return: (T,3) int32 array of loop indices
+    """
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    # A polygon with n vertices is split into the n - 2 triangles (0, i, i + 1) with i in 1, ..., n - 2
+    num_triangles_per_polygon = loop_totals - 2
+    triangle_loop_starts = np.repeat(loop_starts, num_triangles_per_polygon)
+    first_triangle_indices = np.cumsum(num_triangles_per_polygon) - num_triangles_per_polygon
+    triangle_offsets = np.arange(len(triangle_loop_starts)) - np.repeat(
+        first_triangle_indices, num_triangles_per_polygon) + 1
+
+    triangle_loops = np.empty((len(triangle_loop_starts), 3), dtype=np.int32)
+    triangle_loops[:, 0] = triangle_loop_starts
+    triangle_loops[:, 1] = triangle_loop_starts + triangle_offsets
+    triangle_loops[:, 2] = triangle_loop_starts + triangle_offsets + 1
+    return triangle_loops
+
+
+def triangulate_mesh(mesh):
+    """
+    Triangulates the polygons of the mesh (with the same default methods as the TRIANGULATE modifier), which is
+    also correct for concave polygons. Use this only for temporary meshes (e.g. the result of to_mesh()), since
+    the mesh data is replaced.
+    """
+    triangulation_bmesh = bmesh.new()
+    triangulation_bmesh.from_mesh(mesh)
+    bmesh.ops.triangulate(triangulation_bmesh, faces=triangulation_bmesh.faces[:])
+    triangulation_bmesh.normal_update()
+    triangulation_bmesh.to_mesh(mesh)
+    triangulation_bmesh.free()
+
+
+def get_mesh_loop_vertex_indices_as_array(mesh):
+    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+    return loop_vertex_indices
 
-    return mesh_vertex_coordinates
+
+def get_mesh_triangles_as_array(mesh):
+    """
+    :return: (T,3) int32 array of vertex indices (see get_mesh_triangle_loops_as_array)
+    """
+    return get_mesh_loop_vertex_indices_as_array(mesh)[get_mesh_triangle_loops_as_array(mesh)]
+
+
+def get_mesh_vertex_normals_as_array(mesh):
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('normal', normals)
+    return normals.reshape(-1, 3)
+
+
+def get_mesh_loop_normals_as_array(mesh):
+    """
+    Returns the vertex normal for loops of smooth polygons and the polygon normal for loops of flat polygons
+    (like blender's ply exporter does)
+    :return: (L,3) array
+    """
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    use_smooth = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get('use_smooth', use_smooth)
+    polygon_normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('normal', polygon_normals)
+    polygon_normals = polygon_normals.reshape(-1, 3)
+
+    # The loops of a polygon are stored consecutively (in the order of the polygons)
+    loop_polygon_indices = np.repeat(np.arange(len(mesh.polygons)), loop_totals)
+    loop_vertex_normals = get_mesh_vertex_normals_as_array(mesh)[get_mesh_loop_vertex_indices_as_array(mesh)]
+    return np.where(
+        use_smooth[loop_polygon_indices][:, np.newaxis],
+        loop_vertex_normals,
+        polygon_normals[loop_polygon_indices])
+
+
+def get_mesh_loop_uv_coords_as_array(mesh):
+    """ :return: (L,2) array of the active uv layer or None, if the mesh has no uv layer """
+    if mesh.uv_layers.active is None:
+        return None
+    uv_coords = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    mesh.uv_layers.active.data.foreach_get('uv', uv_coords)
+    return uv_coords.reshape(-1, 2)
+
+
+def get_evaluated_mesh_coordinates_and_triangles(mesh_object, apply_modifiers=True):
+    """
+    :return: (N,3) vertex coordinates (in object coordinates) and (T,3) triangles of the evaluated mesh
+    """
+    evaluated_mesh = mesh_object.to_mesh(bpy.context.scene, apply_modifiers, 'PREVIEW')
+    triangulate_mesh(evaluated_mesh)
+    coords = get_mesh_vertex_coordinates_as_array(evaluated_mesh)
+    triangles = get_mesh_triangles_as_array(evaluated_mesh)
+    bpy.data.meshes.remove(evaluated_mesh)
+    return coords, triangles
+
+
+def get_evaluated_mesh_world_arrays(mesh_object, use_normals=True, use_uv_coords=True, apply_modifiers=True):
+    """
+    Reads the evaluated and triangulated mesh in bulk (without changing the selection or the mode).
+    Like blender's ply exporter, vertices of flat polygons get the polygon normal and vertices with different
+    normals or uv coordinates in adjacent polygons are split.
+    :return: dict with the (N,3) world coordinates 'coords', the (T,3) 'triangles' and (optionally)
+        the (N,3) world space 'normals' and the (N,2) 'uv_coords'
+    """
+    evaluated_mesh = mesh_object.to_mesh(bpy.context.scene, apply_modifiers, 'PREVIEW')
+    # The evaluated mesh is a temporary copy, i.e. the triangulation does not affect the object
+    triangulate_mesh(evaluated_mesh)
+    coords = get_mesh_vertex_coordinates_as_array(evaluated_mesh)
+    triangle_loops = get_mesh_triangle_loops_as_array(evaluated_mesh)
+    loop_vertex_indices = get_mesh_loop_vertex_indices_as_array(evaluated_mesh)
+    loop_normals = get_mesh_loop_normals_as_array(evaluated_mesh) if use_normals else None
+    loop_uv_coords = get_mesh_loop_uv_coords_as_array(evaluated_mesh) if use_uv_coords else None
+    bpy.data.meshes.remove(evaluated_mesh)
+
+    # Each distinct (vertex index, normal, uv coordinate) combination of the loops becomes a vertex
+    loop_key_fields = [('vertex_index', 'i4')]
+    if loop_normals is not None:
+        loop_key_fields += [('nx', 'f4'), ('ny', 'f4'), ('nz', 'f4')]
+    if loop_uv_coords is not None:
+        loop_key_fields += [('u', 'f4'), ('v', 'f4')]
+    loop_keys = np.empty(len(loop_vertex_indices), dtype=loop_key_fields)
+    loop_keys['vertex_index'] = loop_vertex_indices
+    if loop_normals is not None:
+        loop_keys['nx'], loop_keys['ny'], loop_keys['nz'] = loop_normals.T
+    if loop_uv_coords is not None:
+        loop_keys['u'], loop_keys['v'] = loop_uv_coords.T
+    unique_loop_keys, loop_to_vertex = np.unique(loop_keys, return_inverse=True)
+    vertex_indices = unique_loop_keys['vertex_index']
+    triangles = loop_to_vertex.reshape(-1)[triangle_loops].astype(np.int32)
+
+    matrix_world = np.array(mesh_object.matrix_world)
+    mesh_arrays = {'coords': apply_matrix_to_coords(matrix_world, coords[vertex_indices]),
+                   'triangles': triangles}
+    if loop_normals is not None:
+        normals = np.stack([unique_loop_keys['nx'], unique_loop_keys['ny'], unique_loop_keys['nz']], axis=1)
+        normal_mat = np.linalg.inv(matrix_world[:3, :3]).T
+        world_normals = normals.dot(normal_mat.T)
+        world_normals /= np.maximum(np.linalg.norm(world_normals, axis=1), 1e-12)[:, np.newaxis]
+        mesh_arrays['normals'] = world_normals
+    if loop_uv_coords is not None:
+        mesh_arrays['uv_coords'] = np.stack([unique_loop_keys['u'], unique_loop_keys['v']], axis=1)
+    return mesh_arrays
+
+
+def get_mesh_vertex_world_coordinates(mesh_object_name):
+    #vertex_world_coords = transform_vec_in_object_coordinates_to_world_coordinates(vert.co, mesh_object)
+    return [Vector(vertex_world_coords) for vertex_world_coords in
+            get_mesh_vertex_world_coordinates_as_array(mesh_object_name)]
 
 
 # ==============================================================================================================
@@ -504,11 +686,8 @@ def clear_and_set_inverse_object_constraint_child_of(object_name, constraint_nam
 # ==============================================================================================================
 
 def _compute_centroid_of_object_locations(object_names):
-    centroid_location = Vector([0.0, 0.0, 0.0])
-    for object_name in object_names:
-        centroid_location += bpy.data.objects[object_name].location
-    centroid_location /= float(len(object_names))
-    return centroid_location
+    """ :param object_names: list of object names or ObjectHandleIndex """
+    return Vector(resolve_objects(object_names).get_locations().mean(axis=0))
 
 
 def set_cursor_to_objects(object_names):
@@ -524,12 +703,10 @@ def snap_objects_to_cursor(object_names):
     This emulates blender's GUI snapping functionality, i.e. translate the centroid of the obj.location attributes onto
     the cursor position.
     """
-    centroid = _compute_centroid_of_object_locations(object_names)
+    object_handle_index = resolve_objects(object_names)
+    centroid = _compute_centroid_of_object_locations(object_handle_index)
     shift_vec = bpy.context.scene.cursor_location - centroid
-
-    for obj_name in object_names:
-        obj = bpy.data.objects[obj_name]
-        obj.location += shift_vec
+    object_handle_index.translate(shift_vec)
 
 
 # ==============================================================================================================
@@ -632,6 +809,20 @@ def set_constraint_locked_track(object_name, target_object_name, lock_axis='LOCK
         bpy.context.scene.update()
     logger.info('set_constraint_damped_track: Done')
 
+def set_constraint_copy_rotation(object_name, target_object_name, constraint_name='Copy Rotation',
+                                 subtarget_name=None):
+    """
+    Adds or overwrites the copy rotation constraint with constraint_name (using world space rotations)
+    """
+    logger.info('set_constraint_copy_rotation: ...')
+    constraint = _get_or_create_constraint(object_name, constraint_name, constraint_type='COPY_ROTATION')
+    constraint.target = bpy.data.objects[target_object_name]
+    if subtarget_name is not None:
+        constraint.subtarget = subtarget_name
+    constraint.owner_space = 'WORLD'
+    constraint.target_space = 'WORLD'
+    logger.info('set_constraint_copy_rotation: Done')
+
 def set_constraint_copy_location(object_name, target_object_name, constraint_name='Copy Location',
                                  subtarget_name=None, use_offset=True):
     """
@@ -0,0 +1,143 @@
+import bpy
+import numpy as np
+
+
+class ObjectHandleIndex:
+    """
+    Resolves a list of object names ONCE and keeps references to the objects, so batch operations on many objects
+    (e.g. the points created by PointCloudTool) avoid repeated bpy.data.objects[name] lookups.
+
+    The references stay valid if objects are renamed. The batch operations (set_hide(), get_locations(), ...) drop
+    the handles of removed objects, i.e. the index stays valid across removals. refresh() detects removed objects
+    explicitly by comparing the stored pointers with the objects in bpy.data.objects.
+    """
+
+    def __init__(self, object_names=()):
+        data_objects = bpy.data.objects
+        self._set_objects([data_objects[object_name] for object_name in object_names])
+
+    @classmethod
+    def from_objects(cls, objects):
+        object_handle_index = cls()
+        object_handle_index._set_objects(list(objects))
+        return object_handle_index
+
+    def _set_objects(self, objects):
+        self._objects = objects
+        self._pointers = [obj.as_pointer() for obj in self._objects]
+        self._name_to_position = None
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def __getitem__(self, position):
+        return self._objects[position]
+
+    @property
+    def objects(self):
+        return self._objects
+
+    def get_names(self):
+        """ Returns the current names (i.e. including renames) """
+        return [obj.name for obj in self._objects]
+
+    def get_object(self, object_name):
+        """ Lookup by (current) name without accessing bpy.data.objects """
+        if self._name_to_position is None:
+            self._name_to_position = {obj.name: position for position, obj in enumerate(self._objects)}
+        position = self._name_to_position.get(object_name)
+        if position is None or self._objects[position].name != object_name:
+            # The object has been renamed since the mapping was created
+            self._name_to_position = None
+            return self._objects[self.get_names().index(object_name)]
+        return self._objects[position]
+
+    def _drop_positions(self, dropped_positions):
+        dropped_positions = set(dropped_positions)
+        self._objects = [obj for position, obj in enumerate(self._objects) if position not in dropped_positions]
+        self._pointers = [
+            pointer for position, pointer in enumerate(self._pointers) if position not in dropped_positions]
+        self._name_to_position = None
+
+    def refresh(self):
+        """
+        Drops the handles of removed objects
+        :return: the number of dropped handles
+        """
+        valid_pointers = set(obj.as_pointer() for obj in bpy.data.objects)
+        dropped_positions = [
+            position for position, pointer in enumerate(self._pointers) if pointer not in valid_pointers]
+        if dropped_positions:
+            self._drop_positions(dropped_positions)
+        return len(dropped_positions)
+
+    def _for_each_object(self, function):
+        """
+        Calls function(position, obj) for each object. Accessing a removed object raises a ReferenceError,
+        the handles of these objects are dropped after the iteration.
+        :return: the positions (before dropping) of the remaining objects
+        """
+        removed_positions = []
+        for position, obj in enumerate(self._objects):
+            try:
+                function(position, obj)
+            except ReferenceError:
+                removed_positions.append(position)
+        if not removed_positions:
+            return range(len(self._objects))
+        removed_position_set = set(removed_positions)
+        remaining_positions = [
+            position for position in range(len(self._objects)) if position not in removed_position_set]
+        self._drop_positions(removed_positions)
+        return remaining_positions
+
+    def set_hide(self, hide_value, hide_render_value=None):
+        if hide_render_value is None:
+            hide_render_value = hide_value
+
+        def set_object_hide(position, obj):
+            obj.hide = hide_value
+            obj.hide_render = hide_render_value
+        self._for_each_object(set_object_hide)
+
+    def get_locations(self):
+        """ :return: (N,3) array with one row per remaining (i.e. not removed) object """
+        locations = np.empty((len(self._objects), 3), dtype=np.float64)
+
+        def get_object_location(position, obj):
+            locations[position] = obj.location
+        remaining_positions = self._for_each_object(get_object_location)
+        return locations[remaining_positions]
+
+    def set_locations(self, coords):
+        """ :param coords: (N,3) array in the order of the handles (coordinates of removed objects are ignored) """
+        assert len(coords) == len(self._objects)
+
+        def set_object_location(position, obj):
+            obj.location = coords[position]
+        self._for_each_object(set_object_location)
+
+    def translate(self, shift_vec):
+        def translate_object(position, obj):
+            obj.location += shift_vec
+        self._for_each_object(translate_object)
+
+    def move_to_layer(self, layer_id):
+        layers = [layer_index == layer_id for layer_index in range(20)]
+
+        def set_object_layers(position, obj):
+            obj.layers = layers
+        self._for_each_object(set_object_layers)
+
+
+def resolve_objects(object_names_or_index):
+    """
+    :param object_names_or_index: list of object names or ObjectHandleIndex
+    :return: ObjectHandleIndex
+    """
+    if isinstance(object_names_or_index, ObjectHandleIndex):
+        return object_names_or_index
+    return ObjectHandleIndex(object_names_or_index)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from Utility.Logging_Extension import logger
+
+# This module does not depend on blender.
+
+
+def compute_input_hash(*values):
+    """
+    :param values: numpy arrays (e.g. matrix_world values) or values with a deterministic repr (e.g. settings)
+    :return: hex digest
+    """
+    input_hash = hashlib.sha1()
+    for value in values:
+        if isinstance(value, np.ndarray):
+            input_hash.update(str(value.dtype).encode('ascii'))
+            input_hash.update(str(value.shape).encode('ascii'))
+            input_hash.update(np.ascontiguousarray(value).tobytes())
+        else:
+            input_hash.update(repr(value).encode('utf-8'))
+    return input_hash.hexdigest()
+
+
+class OutputManifest:
+    """
+    Records the outputs of a long running job (e.g. one entry per frame or per camera) together with a hash of the
+    corresponding inputs. The manifest is written incrementally (one json line per entry), i.e. after a crash the
+    job can be restarted and the entries of completed outputs are reused.
+    """
+
+    def __init__(self, manifest_fp):
+        self.manifest_fp = manifest_fp
+        self._entries = {}
+        # add_entry() may be called from background writer threads
+        self._lock = threading.Lock()
+        if os.path.isfile(manifest_fp):
+            self._read()
+
+    def _read(self):
+        line = '\n'
+        with open(self.manifest_fp) as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete, if the job crashed while writing it
+                    logger.info('Ignoring invalid manifest line: ' + line.strip())
+                    continue
+                # Later entries replace earlier ones
+                self._entries[entry['key']] = entry
+        if not line.endswith('\n'):
+            # Terminate the incomplete line, so that new entries are not appended to it
+            with open(self.manifest_fp, 'a') as manifest_file:
+                manifest_file.write('\n')
+        logger.info('Read ' + str(len(self._entries)) + ' manifest entries from ' + self.manifest_fp)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_entry(self, key):
+        return self._entries.get(key)
+
+    def is_up_to_date(self, key, input_hash):
+        """
+        :return: True, if the entry exists, has the same input hash and all outputs exist with the recorded sizes
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry['input_hash'] != input_hash:
+            return False
+        for output_fp, output_size in zip(entry['output_paths'], entry['output_sizes']):
+            if not os.path.isfile(output_fp) or os.path.getsize(output_fp) != output_size:
+                return False
+        return True
+
+    def add_entry(self, key, input_hash, output_paths):
+        """
+        Must be called after the outputs have been written completely
+        """
+        entry = {'key': key,
+                 'input_hash': input_hash,
+                 'output_paths': list(output_paths),
+                 'output_sizes': [os.path.getsize(output_fp) for output_fp in output_paths]}
+        with self._lock:
+            self._entries[key] = entry
+            with open(self.manifest_fp, 'a') as manifest_file:
+                manifest_file.write(json.dumps(entry) + '\n')
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
@@ -0,0 +1,176 @@
+import numpy as np
+from Utility.Logging_Extension import logger
+
+# Functions to access binary PLY files without creating a python object per vertex.
+# In contrast to PLYFileHandler, the vertex data is memory mapped and exposed as numpy structured array.
+
+_PLY_TO_NUMPY_TYPE = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8'}
+
+_PLY_FORMAT_TO_BYTE_ORDER = {
+    'binary_little_endian': '<',
+    'binary_big_endian': '>'}
+
+
+class PLYElement:
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        # List of (property_name, ply_type) or (property_name, (ply_count_type, ply_item_type)) for lists
+        self.properties = []
+
+    def has_list_property(self):
+        return any(isinstance(ply_type, tuple) for _, ply_type in self.properties)
+
+    def get_dtype(self, byte_order):
+        assert not self.has_list_property()
+        return np.dtype([(property_name, byte_order + _PLY_TO_NUMPY_TYPE[ply_type])
+                         for property_name, ply_type in self.properties])
+
+
+def read_ply_header(ifp):
+    """
+    :param ifp: path to the ply file
+    :return: format string, list of PLYElement, number of header bytes
+    """
+    elements = []
+    ply_format = None
+    with open(ifp, 'rb') as ply_file:
+        magic_number = ply_file.readline().strip()
+        if magic_number != b'ply':
+            logger.vinfo('ifp', ifp)
+            assert False    # Not a ply file
+        while True:
+            line = ply_file.readline()
+            if not line:
+                logger.vinfo('ifp', ifp)
+                assert False    # Missing end_header
+            words = line.decode('ascii').split()
+            if len(words) == 0 or words[0] in ['comment', 'obj_info']:
+                continue
+            if words[0] == 'end_header':
+                break
+            elif words[0] == 'format':
+                ply_format = words[1]
+            elif words[0] == 'element':
+                elements.append(PLYElement(words[1], int(words[2])))
+            elif words[0] == 'property':
+                if words[1] == 'list':
+                    elements[-1].properties.append((words[4], (words[2], words[3])))
+                else:
+                    elements[-1].properties.append((words[2], words[1]))
+        header_length = ply_file.tell()
+    return ply_format, elements, header_length
+
+
+def memory_map_ply_element(ifp, element_name='vertex'):
+    """
+    Memory maps the data of the element as numpy structured array (the file is not loaded into memory).
+    All elements stored in front of the requested element must not contain list properties.
+    :param ifp: path to a binary ply file
+    :param element_name:
+    :return: numpy.memmap with one field per property
+    """
+    ply_format, elements, header_length = read_ply_header(ifp)
+    if ply_format not in _PLY_FORMAT_TO_BYTE_ORDER:
+        logger.vinfo('ply_format', ply_format)
+        assert False    # Only binary ply files can be memory mapped
+    byte_order = _PLY_FORMAT_TO_BYTE_ORDER[ply_format]
+
+    offset = header_length
+    for element in elements:
+        if element.name == element_name:
+            return np.memmap(
+                ifp, dtype=element.get_dtype(byte_order), mode='r', offset=offset, shape=(element.count,))
+        # The size of elements with list properties can not be determined without parsing
+        offset += element.count * element.get_dtype(byte_order).itemsize
+
+    logger.vinfo('element_name', element_name)
+    assert False    # Element not found
+
+
+def get_coords_and_colors(vertex_data):
+    """
+    :param vertex_data: structured array, e.g. the result of memory_map_ply_element()
+    :return: (N,3) float32 coordinates and (N,3) uint8 colors (or None, if the vertices have no color)
+    """
+    field_names = vertex_data.dtype.names
+    coords = np.empty((len(vertex_data), 3), dtype=np.float32)
+    for index, coord_name in enumerate(['x', 'y', 'z']):
+        coords[:, index] = vertex_data[coord_name]
+
+    colors = None
+    for color_names in [['red', 'green', 'blue'], ['diffuse_red', 'diffuse_green', 'diffuse_blue'], ['r', 'g', 'b']]:
+        if all(color_name in field_names for color_name in color_names):
+            colors = np.empty((len(vertex_data), 3), dtype=np.uint8)
+            for index, color_name in enumerate(color_names):
+                colors[:, index] = vertex_data[color_name]
+            break
+    return coords, colors
+
+
+def read_binary_ply_coords_and_colors(ifp):
+    vertex_data = memory_map_ply_element(ifp, 'vertex')
+    return get_coords_and_colors(vertex_data)
+
+
+def write_binary_ply(ofp, coords, triangles=None, normals=None, uv_coords=None, colors=None):
+    """
+    Writes a binary little endian ply file without creating a python object per vertex or face.
+    The property names match the ones of blender's ply exporter.
+    :param ofp: path of the ply file
+    :param coords: (N,3) array
+    :param triangles: (T,3) array of vertex indices (optional)
+    :param normals: (N,3) array (optional)
+    :param uv_coords: (N,2) array (optional)
+    :param colors: (N,3) uint8 array (optional)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    num_vertices = len(coords)
+
+    vertex_properties = [('x', 'float'), ('y', 'float'), ('z', 'float')]
+    vertex_arrays = [coords]
+    if normals is not None:
+        vertex_properties += [('nx', 'float'), ('ny', 'float'), ('nz', 'float')]
+        vertex_arrays.append(np.asarray(normals).reshape(-1, 3))
+    if uv_coords is not None:
+        vertex_properties += [('s', 'float'), ('t', 'float')]
+        vertex_arrays.append(np.asarray(uv_coords).reshape(-1, 2))
+    if colors is not None:
+        vertex_properties += [('red', 'uchar'), ('green', 'uchar'), ('blue', 'uchar')]
+        vertex_arrays.append(np.asarray(colors).reshape(-1, 3))
+
+    vertex_element = PLYElement('vertex', num_vertices)
+    vertex_element.properties = vertex_properties
+    vertex_data = np.empty(num_vertices, dtype=vertex_element.get_dtype('<'))
+    property_names = iter(property_name for property_name, _ in vertex_properties)
+    for vertex_array in vertex_arrays:
+        assert len(vertex_array) == num_vertices
+        for column in range(vertex_array.shape[1]):
+            vertex_data[next(property_names)] = vertex_array[:, column]
+
+    header_lines = ['ply', 'format binary_little_endian 1.0', 'element vertex ' + str(num_vertices)]
+    header_lines += ['property ' + ply_type + ' ' + property_name for property_name, ply_type in vertex_properties]
+
+    face_data = None
+    if triangles is not None:
+        triangles = np.asarray(triangles).reshape(-1, 3)
+        face_data = np.empty(len(triangles), dtype=np.dtype([('count', 'u1'), ('vertex_indices', '<u4', (3,))]))
+        face_data['count'] = 3
+        face_data['vertex_indices'] = triangles
+        header_lines += ['element face ' + str(len(triangles)), 'property list uchar uint vertex_indices']
+    header_lines.append('end_header')
+
+    with open(ofp, 'wb') as ply_file:
+        ply_file.write(('\n'.join(header_lines) + '\n').encode('ascii'))
+        ply_file.write(vertex_data.tobytes())
+        if face_data is not None:
+            ply_file.write(face_data.tobytes())
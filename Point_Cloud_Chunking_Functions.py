@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class ChunkMode:
+    GRID = 'GRID'
+    OCTREE = 'OCTREE'
+
+
+def _split_indices_by_keys(indices, keys):
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    split_positions = np.flatnonzero(np.diff(sorted_keys)) + 1
+    return np.split(indices[order], split_positions)
+
+
+def compute_grid_chunks(coords, num_cells_per_axis=(4, 4, 4)):
+    """
+    Partitions the bounding box of the points into a regular grid
+    :param coords: (N,3) array
+    :param num_cells_per_axis:
+    :return: list of index arrays (one per non-empty cell)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if len(coords) == 0:
+        return []
+    num_cells_per_axis = np.asarray(num_cells_per_axis, dtype=np.int64)
+    min_coord = coords.min(axis=0)
+    extent = coords.max(axis=0) - min_coord
+    extent[extent == 0] = 1.0
+    cell_indices = np.floor((coords - min_coord) / extent * num_cells_per_axis).astype(np.int64)
+    cell_indices = np.minimum(cell_indices, num_cells_per_axis - 1)
+    keys = (cell_indices[:, 0] * num_cells_per_axis[1] + cell_indices[:, 1]) * num_cells_per_axis[2] + \
+        cell_indices[:, 2]
+    return _split_indices_by_keys(np.arange(len(coords)), keys)
+
+
+def compute_octree_chunks(coords, max_points_per_chunk=1000000, max_depth=16):
+    """
+    Recursively splits octree nodes containing more than max_points_per_chunk points
+    :param coords: (N,3) array
+    :param max_points_per_chunk:
+    :param max_depth:
+    :return: list of index arrays (one per non-empty leaf)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if len(coords) == 0:
+        return []
+    min_coord = coords.min(axis=0)
+    max_coord = coords.max(axis=0)
+
+    chunks = []
+    # Each node is represented by the indices of its points, its bounding box and its depth
+    nodes = [(np.arange(len(coords)), min_coord, max_coord, 0)]
+    while nodes:
+        indices, node_min, node_max, depth = nodes.pop()
+        if len(indices) <= max_points_per_chunk or depth == max_depth:
+            chunks.append(indices)
+            continue
+        center = (node_min + node_max) / 2.0
+        octants = (coords[indices] >= center).astype(np.int64)
+        keys = octants[:, 0] * 4 + octants[:, 1] * 2 + octants[:, 2]
+        for child_indices in _split_indices_by_keys(indices, keys):
+            child_octant = (coords[child_indices[0]] >= center)
+            child_min = np.where(child_octant, center, node_min)
+            child_max = np.where(child_octant, node_max, center)
+            nodes.append((child_indices, child_min, child_max, depth + 1))
+    # Keep a deterministic order independent of the traversal
+    chunks.sort(key=lambda chunk_indices: chunk_indices[0])
+    return chunks
+
+
+def compute_chunks(coords, chunk_mode, num_cells_per_axis=(4, 4, 4), max_points_per_chunk=1000000):
+    if chunk_mode == ChunkMode.GRID:
+        return compute_grid_chunks(coords, num_cells_per_axis)
+    elif chunk_mode == ChunkMode.OCTREE:
+        return compute_octree_chunks(coords, max_points_per_chunk)
+    else:
+        assert False
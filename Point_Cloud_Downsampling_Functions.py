@@ -0,0 +1,296 @@
+import numpy as np
+
+
+class DownsamplingMode:
+    VOXEL_GRID = 'VOXEL_GRID'
+    RANDOM_SUBSET = 'RANDOM_SUBSET'
+    OCTREE = 'OCTREE'
+
+
+def _get_max_extent(coords):
+    if len(coords) == 0:
+        return 0.0
+    return float(np.max(coords.max(axis=0) - coords.min(axis=0)))
+
+
+# For larger point clouds, compute_voxel_size_for_target_num_points() estimates the voxel size
+_max_num_points_for_bisection = 1000000
+
+
+def _spread_bits_by_three(values):
+    """
+    Inserts two zero bits between the (lower 21) bits of each value, i.e. bit i is moved to bit 3 * i
+    """
+    values = values.astype(np.uint64) & np.uint64(0x1fffff)
+    values = (values | values << np.uint64(32)) & np.uint64(0x1f00000000ffff)
+    values = (values | values << np.uint64(16)) & np.uint64(0x1f0000ff0000ff)
+    values = (values | values << np.uint64(8)) & np.uint64(0x100f00f00f00f00f)
+    values = (values | values << np.uint64(4)) & np.uint64(0x10c30c30c30c30c3)
+    values = (values | values << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return values
+
+
+class _OctreeCellCounter:
+    """
+    Counts the occupied cells of all octree levels (see downsample_using_octree_level) using a single sort.
+    The points are sorted by their Morton key at max_level. Since the Morton key of a cell at level l is a prefix
+    of the keys of its points, the cells of each level are counted with a linear pass over the sorted keys.
+    """
+
+    max_supported_level = 21
+
+    def __init__(self, coords, max_level=21):
+        assert max_level <= self.max_supported_level
+        self.max_level = max_level
+        self.max_extent = _get_max_extent(coords)
+        self._level_to_num_cells = {0: 1}
+        if self.max_extent == 0:
+            self._sorted_keys = None
+            return
+        # Same cell indices as downsample_using_octree_level(), dividing by a power of two is exact
+        finest_voxel_size = self.get_voxel_size(max_level)
+        cell_indices = np.floor((coords - coords.min(axis=0)) / finest_voxel_size).astype(np.int64)
+        self._sorted_keys = np.sort(
+            _spread_bits_by_three(cell_indices[:, 0]) << np.uint64(2) |
+            _spread_bits_by_three(cell_indices[:, 1]) << np.uint64(1) |
+            _spread_bits_by_three(cell_indices[:, 2]))
+
+    def get_voxel_size(self, level):
+        return self.max_extent * (1.0 + 1e-6) / (2 ** level)
+
+    def get_num_cells(self, level):
+        if self._sorted_keys is None:
+            return 1
+        if level not in self._level_to_num_cells:
+            level_keys = self._sorted_keys >> np.uint64(3 * (self.max_level - level))
+            self._level_to_num_cells[level] = 1 + int(np.count_nonzero(level_keys[1:] != level_keys[:-1]))
+        return self._level_to_num_cells[level]
+
+    def get_deepest_level(self, target_num_points):
+        """ :return: the deepest level with at most target_num_points cells """
+        # The number of cells grows monotonically with the level
+        lower_level, upper_level = 0, self.max_level
+        while lower_level < upper_level:
+            level = (lower_level + upper_level + 1) // 2
+            if self.get_num_cells(level) > target_num_points:
+                upper_level = level - 1
+            else:
+                lower_level = level
+        return lower_level
+
+    def estimate_voxel_size(self, target_num_points):
+        """
+        Interpolates the voxel size between the two octree levels enclosing target_num_points, assuming that the
+        number of occupied voxels grows with voxel_size^-d (where d is estimated from the two levels)
+        """
+        if self._sorted_keys is None:
+            return 1.0
+        level = self.get_deepest_level(target_num_points)
+        if level == self.max_level:
+            return self.get_voxel_size(level)
+        num_cells = self.get_num_cells(level)
+        dimension = np.log2(self.get_num_cells(level + 1) / float(num_cells))
+        return self.get_voxel_size(level) * (num_cells / float(target_num_points)) ** (1.0 / dimension)
+
+
+def downsample_using_voxel_grid(coords, colors, voxel_size):
+    """
+    Replaces all points within a voxel by their centroid (and their average color)
+    :param coords: (N,3) array
+    :param colors: (N,3) uint8 array or None
+    :param voxel_size:
+    :return: (M,3) float32 coordinates, (M,3) uint8 colors (or None)
+    """
+    assert voxel_size > 0
+    coords = np.asarray(coords).reshape(-1, 3)
+    if len(coords) == 0:
+        return coords.astype(np.float32), colors
+
+    scaled_coords = np.floor((coords - coords.min(axis=0)) / voxel_size)
+    if scaled_coords.max() >= 2 ** 62:
+        raise ValueError('The voxel size ' + str(voxel_size) + ' is too small for the extent of the points')
+    voxel_indices = scaled_coords.astype(np.int64)
+    grid_shape = [int(num_cells) for num_cells in voxel_indices.max(axis=0) + 1]
+    if grid_shape[0] * grid_shape[1] * grid_shape[2] < 2 ** 63:
+        keys = (voxel_indices[:, 0] * grid_shape[1] + voxel_indices[:, 1]) * grid_shape[2] + voxel_indices[:, 2]
+        unique_keys, labels = np.unique(keys, return_inverse=True)
+    else:
+        # The linearized keys would overflow (i.e. distinct voxels would be merged), if the voxel size is very
+        # small compared to the extent of the points
+        unique_keys, labels = np.unique(voxel_indices, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    num_voxels = len(unique_keys)
+    counts = np.bincount(labels, minlength=num_voxels).astype(np.float64)
+
+    def average_per_voxel(values):
+        averaged = np.empty((num_voxels, 3), dtype=np.float64)
+        for channel in range(3):
+            averaged[:, channel] = np.bincount(
+                labels, weights=values[:, channel], minlength=num_voxels) / counts
+        return averaged
+
+    downsampled_coords = average_per_voxel(coords).astype(np.float32)
+    downsampled_colors = None
+    if colors is not None:
+        colors = np.asarray(colors).reshape(-1, 3)
+        downsampled_colors = np.clip(np.round(average_per_voxel(colors)), 0, 255).astype(np.uint8)
+    return downsampled_coords, downsampled_colors
+
+
+def downsample_using_random_subset(coords, colors, target_num_points, seed=0):
+    """
+    Keeps a random subset of the points (in the original order)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if target_num_points >= len(coords):
+        return coords, colors
+    random_state = np.random.RandomState(seed)
+    indices = np.sort(random_state.choice(len(coords), target_num_points, replace=False))
+    if colors is not None:
+        colors = np.asarray(colors).reshape(-1, 3)[indices]
+    return coords[indices], colors
+
+
+def downsample_using_octree_level(coords, colors, level):
+    """
+    The octree level l divides the (cubic) bounding box of the points into 2^l cells per axis
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    max_extent = _get_max_extent(coords)
+    if max_extent == 0:
+        return downsample_using_voxel_grid(coords, colors, 1.0)
+    # Enlarge the cell slightly, so that the points on the upper bound are contained in the last cell
+    voxel_size = max_extent * (1.0 + 1e-6) / (2 ** level)
+    return downsample_using_voxel_grid(coords, colors, voxel_size)
+
+
+def compute_octree_level(coords, target_num_points=None, voxel_size=None, max_level=21):
+    """
+    :return: the deepest level with at most target_num_points cells or the level matching voxel_size.
+        If target_num_points >= len(coords), max_level is returned (downsample_point_cloud() does not downsample
+        in this case).
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if voxel_size is not None:
+        max_extent = _get_max_extent(coords)
+        if max_extent <= voxel_size:
+            return 0
+        return min(int(np.ceil(np.log2(max_extent / voxel_size))), max_level)
+
+    assert target_num_points is not None
+    if target_num_points >= len(coords):
+        return max_level
+    return _OctreeCellCounter(coords, max_level).get_deepest_level(target_num_points)
+
+
+def compute_voxel_size_for_target_num_points(coords,
+                                             target_num_points,
+                                             num_iterations=20,
+                                             max_num_points_for_bisection=_max_num_points_for_bisection,
+                                             octree_cell_counter=None):
+    """
+    For up to max_num_points_for_bisection points: bisection (in log space) for the smallest voxel size
+    resulting in at most target_num_points points.
+    For larger point clouds, each bisection step would require a full voxelization. Instead, the voxel size is
+    interpolated between the octree levels enclosing target_num_points (i.e. the resulting number of points is
+    only approximately bounded by target_num_points).
+    :param octree_cell_counter: reused for several target_num_points (see create_lod_hierarchy)
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    max_extent = _get_max_extent(coords)
+    if max_extent == 0:
+        return 1.0
+    if len(coords) > max_num_points_for_bisection:
+        if octree_cell_counter is None:
+            octree_cell_counter = _OctreeCellCounter(coords)
+        return octree_cell_counter.estimate_voxel_size(target_num_points)
+
+    lower_voxel_size = max_extent * 1e-6
+    upper_voxel_size = max_extent * 2.0
+    for _ in range(num_iterations):
+        voxel_size = np.sqrt(lower_voxel_size * upper_voxel_size)
+        downsampled_coords, _ = downsample_using_voxel_grid(coords, None, voxel_size)
+        if len(downsampled_coords) > target_num_points:
+            lower_voxel_size = voxel_size
+        else:
+            upper_voxel_size = voxel_size
+    return upper_voxel_size
+
+
+def downsample_point_cloud(coords,
+                           colors,
+                           downsampling_mode,
+                           target_num_points=None,
+                           voxel_size=None,
+                           seed=0):
+    """
+    :param coords: (N,3) array
+    :param colors: (N,3) uint8 array or None
+    :param downsampling_mode: DownsamplingMode.VOXEL_GRID, DownsamplingMode.RANDOM_SUBSET, DownsamplingMode.OCTREE
+    :param target_num_points: (approximate) upper bound of the number of resulting points
+    :param voxel_size: ignored by DownsamplingMode.RANDOM_SUBSET
+    :param seed: used by DownsamplingMode.RANDOM_SUBSET
+    :return: downsampled coords and colors
+    """
+    assert target_num_points is not None or voxel_size is not None
+    coords = np.asarray(coords).reshape(-1, 3)
+    if voxel_size is None and target_num_points >= len(coords):
+        # Nothing to downsample (avoids a voxelization at the finest level)
+        return coords, colors
+
+    if downsampling_mode == DownsamplingMode.VOXEL_GRID:
+        if voxel_size is None:
+            voxel_size = compute_voxel_size_for_target_num_points(coords, target_num_points)
+        return downsample_using_voxel_grid(coords, colors, voxel_size)
+    elif downsampling_mode == DownsamplingMode.RANDOM_SUBSET:
+        assert target_num_points is not None
+        return downsample_using_random_subset(coords, colors, target_num_points, seed)
+    elif downsampling_mode == DownsamplingMode.OCTREE:
+        level = compute_octree_level(coords, target_num_points, voxel_size)
+        return downsample_using_octree_level(coords, colors, level)
+    else:
+        assert False
+
+
+def create_lod_hierarchy(coords, colors, num_levels, reduction_factor=4):
+    """
+    The finest level contains the original points, level k (from fine to coarse) is a voxel grid
+    with at most N / reduction_factor^k points
+    :param coords: (N,3) array
+    :param colors: (N,3) uint8 array or None
+    :param num_levels:
+    :param reduction_factor:
+    :return: list of (coords, colors) tuples ordered from coarse to fine
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    # The octree cells of large point clouds are only counted once for all levels
+    octree_cell_counter = None
+    if num_levels > 1 and len(coords) > _max_num_points_for_bisection and _get_max_extent(coords) > 0:
+        octree_cell_counter = _OctreeCellCounter(coords)
+    lod_levels = [(coords, colors)]
+    for lod_index in range(1, num_levels):
+        target_num_points = max(len(coords) // (reduction_factor ** lod_index), 1)
+        voxel_size = compute_voxel_size_for_target_num_points(
+            coords, target_num_points, octree_cell_counter=octree_cell_counter)
+        lod_levels.append(downsample_using_voxel_grid(coords, colors, voxel_size))
+    return lod_levels[::-1]
+
+
+class PointCloudDownsampling:
+    """ Bundles the downsampling parameters, which can be passed to the creation methods of PointCloudTool """
+
+    def __init__(self, downsampling_mode, target_num_points=None, voxel_size=None, seed=0):
+        assert target_num_points is not None or voxel_size is not None
+        self.downsampling_mode = downsampling_mode
+        self.target_num_points = target_num_points
+        self.voxel_size = voxel_size
+        self.seed = seed
+
+    def apply(self, coords, colors):
+        return downsample_point_cloud(
+            coords,
+            colors,
+            self.downsampling_mode,
+            target_num_points=self.target_num_points,
+            voxel_size=self.voxel_size,
+            seed=self.seed)
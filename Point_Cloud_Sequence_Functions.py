@@ -0,0 +1,204 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+import numpy as np
+from BlenderUtility.Point_Cloud_Tool import PointCloudTool
+from BlenderUtility.PLY_Binary_Functions import read_ply_header
+from BlenderUtility.PLY_Binary_Functions import read_binary_ply_coords_and_colors
+from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
+from Utility.Logging_Extension import logger
+
+# A point cloud sequence (e.g. a dynamic reconstruction with one ply file per frame) is represented by a single mesh
+# object, whose vertices (and colors) are replaced on frame change. This keeps the number of scene objects constant.
+
+
+def _read_ply_coords_and_colors(ply_ifp):
+    ply_format, _, _ = read_ply_header(ply_ifp)
+    if ply_format == 'ascii':
+        points, _ = PLYFileHandler.parse_ply_file(ply_ifp)
+        return PointCloudTool.convert_points_to_arrays(points)
+    coords, colors = read_binary_ply_coords_and_colors(ply_ifp)
+    if colors is None:
+        colors = np.full((len(coords), 3), 255, dtype=np.uint8)
+    return coords, colors
+
+
+def cache_point_cloud_sequence(ply_ifps, cache_dp, get_index_str_of_ply):
+    """
+    Decodes each ply file once and stores the coordinates and colors as .npz file.
+    Cache files, which are newer than the corresponding ply file, are reused.
+    :param ply_ifps: ply files ordered by frame
+    :param cache_dp: cache directory
+    :param get_index_str_of_ply: function mapping a ply file path to its index string
+    :return: list of cache file paths (in the same order as ply_ifps)
+    """
+    logger.info('cache_point_cloud_sequence: ...')
+    if not os.path.isdir(cache_dp):
+        os.makedirs(cache_dp)
+    cache_ifps = []
+    for ply_ifp in ply_ifps:
+        cache_ifp = os.path.join(cache_dp, get_index_str_of_ply(ply_ifp) + '.npz')
+        if not os.path.isfile(cache_ifp) or os.path.getmtime(cache_ifp) < os.path.getmtime(ply_ifp):
+            logger.info('Caching ' + str(ply_ifp))
+            coords, colors = _read_ply_coords_and_colors(ply_ifp)
+            np.savez(cache_ifp, coords=coords, colors=colors)
+        cache_ifps.append(cache_ifp)
+    logger.info('cache_point_cloud_sequence: Done')
+    return cache_ifps
+
+
+class PointCloudSequence:
+    """
+    Provides the (decoded) frames of a cached point cloud sequence. The most recently used frames are kept in
+    memory and the upcoming frames are loaded in the background.
+    """
+
+    def __init__(self, cache_ifps, max_num_frames_in_memory=16, num_prefetched_frames=4, num_prefetch_threads=2):
+        assert max_num_frames_in_memory > num_prefetched_frames
+        self.cache_ifps = cache_ifps
+        self.max_num_frames_in_memory = max_num_frames_in_memory
+        self.num_prefetched_frames = num_prefetched_frames
+        self._frames = OrderedDict()
+        self._pending_frames = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=num_prefetch_threads)
+
+    def __len__(self):
+        return len(self.cache_ifps)
+
+    def _load_frame(self, frame_index):
+        with np.load(self.cache_ifps[frame_index]) as frame_data:
+            return frame_data['coords'], frame_data['colors']
+
+    def _evict_frames(self):
+        # Must be called with the lock held. Pending prefetches count against the limit, since their results are
+        # moved into memory (see _on_prefetch_done).
+        while self._frames and len(self._frames) + len(self._pending_frames) > self.max_num_frames_in_memory:
+            self._frames.popitem(last=False)
+
+    def _add_frame(self, frame_index, frame_arrays):
+        with self._lock:
+            self._frames[frame_index] = frame_arrays
+            self._frames.move_to_end(frame_index)
+            self._evict_frames()
+
+    def _on_prefetch_done(self, frame_index, future):
+        with self._lock:
+            if self._pending_frames.get(frame_index) is not future:
+                # The frame has been requested by get_frame() or the prefetch has been discarded
+                return
+            del self._pending_frames[frame_index]
+            if future.cancelled() or future.exception() is not None:
+                # get_frame() loads the frame again (and raises the error)
+                return
+            self._frames[frame_index] = future.result()
+            self._evict_frames()
+
+    def _prefetch(self, frame_index):
+        with self._lock:
+            if frame_index in self._frames or frame_index in self._pending_frames:
+                return
+            future = self._executor.submit(self._load_frame, frame_index)
+            self._pending_frames[frame_index] = future
+            self._evict_frames()
+        # Outside of the lock, since the callback is called immediately if the future is already done
+        future.add_done_callback(functools.partial(self._on_prefetch_done, frame_index))
+
+    def _discard_pending_frames(self, first_frame_index, last_frame_index):
+        """
+        Discards the prefetches outside of [first_frame_index, last_frame_index], e.g. after a jump in the timeline
+        """
+        with self._lock:
+            discarded_frame_indices = [pending_frame_index for pending_frame_index in self._pending_frames
+                                       if not first_frame_index <= pending_frame_index <= last_frame_index]
+            discarded_futures = [self._pending_frames.pop(pending_frame_index)
+                                 for pending_frame_index in discarded_frame_indices]
+        # Outside of the lock, since cancel() calls the done callbacks
+        for future in discarded_futures:
+            future.cancel()
+
+    def get_frame(self, frame_index):
+        """
+        :param frame_index: index in [0, len(self))
+        :return: (N,3) float32 coordinates and (N,3) uint8 colors
+        """
+        last_prefetched_frame_index = min(frame_index + self.num_prefetched_frames, len(self) - 1)
+        self._discard_pending_frames(frame_index, last_prefetched_frame_index)
+
+        with self._lock:
+            frame_arrays = self._frames.get(frame_index)
+            future = self._pending_frames.pop(frame_index, None)
+        if frame_arrays is None:
+            # A prefetch, which has not been started yet, is cancelled (instead of waiting for the other prefetches)
+            if future is not None and not future.cancel():
+                frame_arrays = future.result()
+            else:
+                frame_arrays = self._load_frame(frame_index)
+        self._add_frame(frame_index, frame_arrays)
+
+        for next_frame_index in range(frame_index + 1, last_prefetched_frame_index + 1):
+            self._prefetch(next_frame_index)
+        return frame_arrays
+
+    def get_num_frames_in_memory(self):
+        """
+        :return: number of loaded frames including the pending prefetches
+        """
+        with self._lock:
+            return len(self._frames) + len(self._pending_frames)
+
+    def shutdown(self):
+        self._discard_pending_frames(0, -1)
+        self._executor.shutdown(wait=False)
+
+
+def register_point_cloud_sequence_playback(point_cloud_sequence, point_cloud_obj_name, start_frame=1):
+    """
+    Registers a frame change handler, which replaces the vertices (and colors) of the point cloud object.
+    Frames outside of the sequence show the first or the last point cloud, respectively.
+    :return: the handler (required to unregister the playback)
+    """
+
+    def update_point_cloud_on_frame_change(scene):
+        frame_index = min(max(scene.frame_current - start_frame, 0), len(point_cloud_sequence) - 1)
+        coords, colors = point_cloud_sequence.get_frame(frame_index)
+        PointCloudTool.update_point_cloud_mesh_from_arrays(point_cloud_obj_name, coords, colors)
+
+    bpy.app.handlers.frame_change_pre.append(update_point_cloud_on_frame_change)
+    return update_point_cloud_on_frame_change
+
+
+def unregister_point_cloud_sequence_playback(handler):
+    if handler in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(handler)
+
+
+def add_point_cloud_sequence(ply_ifps,
+                             cache_dp,
+                             get_index_str_of_ply,
+                             point_cloud_obj_name,
+                             start_frame=1,
+                             max_num_frames_in_memory=16,
+                             num_prefetched_frames=4):
+    """
+    Alternative to import_ply_s() / import_ply_as_point_cloud() for point cloud sequences, which uses a single
+    mesh object instead of one object per frame
+    :return: point cloud object, PointCloudSequence, frame change handler
+    """
+    logger.info('add_point_cloud_sequence: ...')
+    cache_ifps = cache_point_cloud_sequence(ply_ifps, cache_dp, get_index_str_of_ply)
+    point_cloud_sequence = PointCloudSequence(
+        cache_ifps,
+        max_num_frames_in_memory=max_num_frames_in_memory,
+        num_prefetched_frames=num_prefetched_frames)
+    coords, colors = point_cloud_sequence.get_frame(0)
+    point_cloud_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+        coords, point_cloud_obj_name, colors=colors)
+    handler = register_point_cloud_sequence_playback(
+        point_cloud_sequence, point_cloud_obj.name, start_frame=start_frame)
+    logger.info('add_point_cloud_sequence: Done')
+    return point_cloud_obj, point_cloud_sequence, handler
@@ -1,11 +1,31 @@
+import timeit
+from itertools import repeat
+from itertools import zip_longest
 from math import radians
 
 import bpy
 import numpy as np
 from BlenderUtility.Object_Functions import set_constraint_track_to
+from BlenderUtility.Object_Functions import set_constraint_copy_rotation
 from BlenderUtility.Object_Functions import add_obj
-from Utility.Math.Geometry.Geometry_Collection import GeometryCollection
+from BlenderUtility.Object_Functions import add_vertices_to_mesh
+from BlenderUtility.Object_Functions import add_empty
+from BlenderUtility.Object_Functions import set_object_parent
+from BlenderUtility.Object_Handle_Index import resolve_objects
+from BlenderUtility.Array_Geometry_Functions import recenter_coords
+from BlenderUtility.Color_Quantization_Functions import quantize_colors
+from BlenderUtility.Point_Cloud_Downsampling_Functions import create_lod_hierarchy
+from BlenderUtility.Point_Cloud_Chunking_Functions import ChunkMode
+from BlenderUtility.Point_Cloud_Chunking_Functions import compute_chunks
 from Utility.Logging_Extension import logger
+from Utility.Types.Point import Point
+
+
+# Name of the integer vertex layer storing the point colors (packed as 0xRRGGBB)
+POINT_COLOR_LAYER_NAME = 'point_color'
+
+# Fill value of stream_point_cloud_mesh_updates() marking the end of the shorter iterable
+_MISSING_FRAME = object()
 
 
 class VertexType:
@@ -14,6 +34,32 @@ class VertexType:
     PLANE = 'PLANE'
 
 
+def _get_vertex_type_geometry(vertex_type):
+    """
+    Returns the vertices (with an extent of 2 like the mesh primitives) and the faces of the vertex type.
+    All faces of a vertex type have the same number of vertices.
+    """
+    if vertex_type == VertexType.PLANE:
+        vertices = [(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)]
+        faces = [(0, 1, 2, 3)]
+    elif vertex_type == VertexType.CUBE:
+        vertices = [(-1, -1, -1), (1, -1, -1), (1, 1, -1), (-1, 1, -1),
+                    (-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)]
+        faces = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    else:
+        # Use an icosahedron as (low poly) sphere
+        t = (1.0 + np.sqrt(5.0)) / 2.0
+        vertices = [(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0),
+                    (0, -1, t), (0, 1, t), (0, -1, -t), (0, 1, -t),
+                    (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)]
+        faces = [(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+                 (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+                 (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+                 (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)]
+        vertices = np.array(vertices) / np.linalg.norm(vertices[0])
+    return np.array(vertices, dtype=np.float32), np.array(faces, dtype=np.int32)
+
+
 class PointCloudTool:
 
     # ===== Performance in Blender ========
@@ -62,54 +108,356 @@ class PointCloudTool:
         return current_vertex
 
     @staticmethod
-    def add_point_cloud_as_mesh(points, point_cloud_name):
-        point_cloud_mesh = bpy.data.meshes.new(point_cloud_name)
-        point_cloud_mesh.update()
-        point_cloud_mesh.validate()
+    def convert_points_to_arrays(points):
+        """
+        :param points: list of Point objects
+        :return: (N,3) float32 coordinates and (N,3) uint8 colors
+        """
+        coords = np.array([point.coord for point in points], dtype=np.float32).reshape(-1, 3)
+        colors = np.array([point.color for point in points], dtype=np.uint8).reshape(-1, 3)
+        return coords, colors
 
-        point_world_coordinates = [tuple(point.coord) for point in points]
+    @staticmethod
+    def set_point_cloud_colors(point_cloud_mesh, colors, layer_name=POINT_COLOR_LAYER_NAME):
+        """
+        Stores the colors in an integer vertex layer (one packed 0xRRGGBB value per vertex),
+        since vertex color layers require faces (i.e. loops)
+        :param point_cloud_mesh:
+        :param colors: (N,3) uint8 array
+        :param layer_name:
+        :return:
+        """
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+        assert len(colors) == len(point_cloud_mesh.vertices)
+        packed_colors = \
+            (colors[:, 0].astype(np.int32) << 16) | \
+            (colors[:, 1].astype(np.int32) << 8) | \
+            colors[:, 2].astype(np.int32)
+        if layer_name in point_cloud_mesh.vertex_layers_int:
+            color_layer = point_cloud_mesh.vertex_layers_int[layer_name]
+        else:
+            color_layer = point_cloud_mesh.vertex_layers_int.new(name=layer_name)
+        color_layer.data.foreach_set('value', packed_colors)
 
-        point_cloud_mesh.from_pydata(point_world_coordinates, [], [])
+    @staticmethod
+    def get_point_cloud_colors(point_cloud_mesh, layer_name=POINT_COLOR_LAYER_NAME):
+        """
+        :return: (N,3) uint8 array or None, if the mesh does not contain colors
+        """
+        if layer_name not in point_cloud_mesh.vertex_layers_int:
+            return None
+        packed_colors = np.empty(len(point_cloud_mesh.vertices), dtype=np.int32)
+        point_cloud_mesh.vertex_layers_int[layer_name].data.foreach_get('value', packed_colors)
+        colors = np.empty((len(packed_colors), 3), dtype=np.uint8)
+        colors[:, 0] = (packed_colors >> 16) & 255
+        colors[:, 1] = (packed_colors >> 8) & 255
+        colors[:, 2] = packed_colors & 255
+        return colors
+
+    @staticmethod
+    def add_point_cloud_as_mesh(points, point_cloud_name, downsampling=None, frustum_culling=None):
+        coords = np.array([point.coord for point in points], dtype=np.float32)
+        return PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+            coords, point_cloud_name, downsampling=downsampling, frustum_culling=frustum_culling)
+
+    @staticmethod
+    def add_point_cloud_as_mesh_from_arrays(coords,
+                                            point_cloud_name,
+                                            colors=None,
+                                            downsampling=None,
+                                            frustum_culling=None):
+        """
+        Bulk version of add_point_cloud_as_mesh. The mesh is sized once and the coordinates (and colors)
+        are written with foreach_set, i.e. no python object is created per point.
+        :param coords: (N,3) float32 array
+        :param point_cloud_name:
+        :param colors: (N,3) uint8 array (optional)
+        :param downsampling: PointCloudDownsampling (optional)
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
+        :return:
+        """
+        if downsampling is not None:
+            coords, colors = downsampling.apply(coords, colors)
+        if frustum_culling is not None:
+            coords, colors = frustum_culling.apply(coords, colors)
+        point_cloud_mesh = bpy.data.meshes.new(point_cloud_name)
+        add_vertices_to_mesh(point_cloud_mesh, coords)
+        if colors is not None:
+            PointCloudTool.set_point_cloud_colors(point_cloud_mesh, colors)
         point_cloud_obj = add_obj(point_cloud_mesh, point_cloud_name)
 
         # point_cloud_obj.matrix_world = Matrix.Rotation(radians(0), 4, 'X')
         return point_cloud_obj
 
+    @staticmethod
+    def downsample_points(points, downsampling):
+        """
+        :param points: list of Point objects
+        :param downsampling: PointCloudDownsampling
+        :return: list of Point objects
+        """
+        coords, colors = PointCloudTool.convert_points_to_arrays(points)
+        coords, colors = downsampling.apply(coords, colors)
+        logger.info('Downsampled ' + str(len(points)) + ' points to ' + str(len(coords)) + ' points')
+        return [Point(coord=coord, color=color) for coord, color in zip(coords, colors)]
+
+    @staticmethod
+    def cull_points(points, frustum_culling):
+        """
+        :param points: list of Point objects
+        :param frustum_culling: PointCloudFrustumCulling
+        :return: list of Point objects (visible from the camera(s))
+        """
+        coords, colors = PointCloudTool.convert_points_to_arrays(points)
+        coords, colors = frustum_culling.apply(coords, colors)
+        return [Point(coord=coord, color=color) for coord, color in zip(coords, colors)]
+
+    @staticmethod
+    def add_point_cloud_lod_hierarchy(coords, colors, point_cloud_name, num_levels=3, reduction_factor=4):
+        """
+        Adds one mesh per level of detail below a common parent empty. Only the finest level is visible initially.
+        :param coords: (N,3) float32 array
+        :param colors: (N,3) uint8 array or None
+        :param point_cloud_name:
+        :param num_levels:
+        :param reduction_factor: ratio of the number of points of consecutive levels
+        :return: list of the level objects ordered from coarse to fine
+        """
+        logger.info('add_point_cloud_lod_hierarchy: ...')
+        point_cloud_parent = add_empty(point_cloud_name)
+        lod_objs = []
+        for lod_index, (lod_coords, lod_colors) in enumerate(
+                create_lod_hierarchy(coords, colors, num_levels, reduction_factor)):
+            lod_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+                lod_coords, point_cloud_name + '_lod_' + str(lod_index), colors=lod_colors)
+            set_object_parent(lod_obj, point_cloud_parent)
+            logger.info('Level ' + str(lod_index) + ': ' + str(len(lod_coords)) + ' points')
+            lod_objs.append(lod_obj)
+        PointCloudTool.set_point_cloud_lod_level(lod_objs, len(lod_objs) - 1, len(lod_objs) - 1)
+        logger.info('add_point_cloud_lod_hierarchy: Done')
+        return lod_objs
+
+    @staticmethod
+    def set_point_cloud_lod_level(lod_objs, viewport_level_index, render_level_index):
+        """
+        Shows exactly one level of detail in the viewport and one (possibly different) level in the rendering
+        """
+        for lod_index, lod_obj in enumerate(lod_objs):
+            lod_obj.hide = lod_index != viewport_level_index
+            lod_obj.hide_render = lod_index != render_level_index
+
+    @staticmethod
+    def add_point_cloud_as_chunked_meshes(coords,
+                                          point_cloud_name,
+                                          colors=None,
+                                          chunk_mode=ChunkMode.GRID,
+                                          num_cells_per_axis=(4, 4, 4),
+                                          max_points_per_chunk=1000000,
+                                          progress_callback=None,
+                                          downsampling=None,
+                                          frustum_culling=None):
+        """
+        Splits the point cloud spatially and adds each chunk as separate mesh object below a common parent empty.
+        Only the data of a single chunk is copied at a time, which bounds the peak memory.
+        The chunk objects can be hidden (or culled) individually.
+        Downsampling and frustum culling are applied before chunking. Note that they create (reduced) copies of
+        coords and colors, i.e. a memory mapped input is read completely.
+        :param coords: (N,3) float32 array (may be a memory mapped array)
+        :param point_cloud_name:
+        :param colors: (N,3) uint8 array (optional)
+        :param chunk_mode: ChunkMode.GRID or ChunkMode.OCTREE
+        :param num_cells_per_axis: used by ChunkMode.GRID
+        :param max_points_per_chunk: used by ChunkMode.OCTREE
+        :param progress_callback: called with (chunk_index, num_chunks, num_chunk_points) after each chunk
+        :param downsampling: PointCloudDownsampling (optional)
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
+        :return: list of chunk objects
+        """
+        logger.info('add_point_cloud_as_chunked_meshes: ...')
+        if downsampling is not None:
+            coords, colors = downsampling.apply(coords, colors)
+        if frustum_culling is not None:
+            coords, colors = frustum_culling.apply(coords, colors)
+        chunks = compute_chunks(coords, chunk_mode, num_cells_per_axis, max_points_per_chunk)
+        point_cloud_parent = add_empty(point_cloud_name)
+
+        chunk_objs = []
+        for chunk_index, chunk_indices in enumerate(chunks):
+            chunk_colors = None
+            if colors is not None:
+                chunk_colors = colors[chunk_indices]
+            chunk_obj = PointCloudTool.add_point_cloud_as_mesh_from_arrays(
+                coords[chunk_indices], point_cloud_name + '_chunk_' + str(chunk_index), colors=chunk_colors)
+            set_object_parent(chunk_obj, point_cloud_parent)
+            chunk_objs.append(chunk_obj)
+
+            logger.info('Added chunk ' + str(chunk_index + 1) + ' of ' + str(len(chunks)) +
+                        ' (' + str(len(chunk_indices)) + ' points)')
+            if progress_callback is not None:
+                progress_callback(chunk_index, len(chunks), len(chunk_indices))
+
+        logger.info('add_point_cloud_as_chunked_meshes: Done')
+        return chunk_objs
+
     @staticmethod
     def toggle_hide_point_cloud(point_obj_names, hide_value):
-        for point_obj_name in point_obj_names:
-            bpy.data.objects[point_obj_name].hide = hide_value
-            bpy.data.objects[point_obj_name].hide_render = hide_value
+        """ :param point_obj_names: list of object names or ObjectHandleIndex """
+        resolve_objects(point_obj_names).set_hide(hide_value)
 
     @staticmethod
     def update_point_cloud_object_positions(points, point_obj_names):
-        """ This method assumes the point cloud is represented by a set of points """
+        """
+        This method assumes the point cloud is represented by a set of points
+        :param points:
+        :param point_obj_names: list of object names or ObjectHandleIndex
+        """
         assert len(points) == len(point_obj_names)
-        for point, point_obj_name in zip(points, point_obj_names):
-            bpy.data.objects[point_obj_name].location = point.coord
+        resolve_objects(point_obj_names).set_locations([point.coord for point in points])
 
     @staticmethod
     def update_point_cloud_mesh(points, point_cloud_mesh_name):
         """ This method assumes the point cloud is represented by a single mesh (with a particle system) """
-        point_cloud_vertices = bpy.data.objects[point_cloud_mesh_name].data.vertices
-        for index, point in enumerate(points):
-            point_cloud_vertices[index].co = point.coord
+        coords = np.array([point.coord for point in points], dtype=np.float32)
+        PointCloudTool.update_point_cloud_mesh_from_arrays(point_cloud_mesh_name, coords)
+
+    @staticmethod
+    def update_point_cloud_mesh_from_arrays(point_cloud_mesh_name, coords, colors=None):
+        """
+        Writes all coordinates (and colors) with a single foreach_set call.
+        If the number of points changed, the mesh data of the object is replaced.
+        :param point_cloud_mesh_name:
+        :param coords: (N,3) float32 array
+        :param colors: (N,3) uint8 array (optional)
+        :return:
+        """
+        point_cloud_obj = bpy.data.objects[point_cloud_mesh_name]
+        coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+        point_cloud_mesh = point_cloud_obj.data
+        if len(point_cloud_mesh.vertices) == len(coords):
+            point_cloud_mesh.vertices.foreach_set('co', coords.ravel())
+            point_cloud_mesh.update()
+        else:
+            point_cloud_mesh = PointCloudTool._replace_point_cloud_mesh(point_cloud_obj, coords)
+        if colors is not None:
+            PointCloudTool.set_point_cloud_colors(point_cloud_mesh, colors)
+        return point_cloud_mesh
+
+    @staticmethod
+    def _replace_point_cloud_mesh(point_cloud_obj, coords):
+        # The vertices of a mesh can not be removed without bmesh, thus we create a new mesh with the correct size
+        old_mesh = point_cloud_obj.data
+        mesh_name = old_mesh.name
+        new_mesh = bpy.data.meshes.new(mesh_name)
+        add_vertices_to_mesh(new_mesh, coords)
+        for material in old_mesh.materials:
+            new_mesh.materials.append(material)
+        point_cloud_obj.data = new_mesh
+        if old_mesh.users == 0:
+            bpy.data.meshes.remove(old_mesh)
+            new_mesh.name = mesh_name
+        # Particle systems emitting from vertices must know the new number of points
+        for particle_sys in point_cloud_obj.particle_systems:
+            if particle_sys.settings.emit_from == 'VERT':
+                particle_sys.settings.count = len(coords)
+        return new_mesh
+
+    @staticmethod
+    def stream_point_cloud_mesh_updates(point_cloud_mesh_name,
+                                        coords_per_frame,
+                                        colors_per_frame=None,
+                                        frame_callback=None):
+        """
+        Updates the point cloud mesh for each frame (e.g. of a dynamic reconstruction).
+        :param point_cloud_mesh_name:
+        :param coords_per_frame: iterable (e.g. a generator) of (N,3) float32 arrays, N may vary between frames
+        :param colors_per_frame: iterable of (N,3) uint8 arrays (optional), must have as many frames as
+            coords_per_frame. Otherwise a ValueError is raised (after processing the frames of the shorter iterable,
+            since generators have no length).
+        :param frame_callback: called with the frame index after each update, e.g. to set the frame or to render
+        :return: the number of processed frames and points
+        """
+        logger.info('stream_point_cloud_mesh_updates: ...')
+        if colors_per_frame is None:
+            frames = zip(coords_per_frame, repeat(None))
+        else:
+            # zip() would silently drop the trailing frames of the longer iterable
+            frames = zip_longest(coords_per_frame, colors_per_frame, fillvalue=_MISSING_FRAME)
+        num_frames = 0
+        num_points = 0
+        for frame_index, (coords, colors) in enumerate(frames):
+            if coords is _MISSING_FRAME or colors is _MISSING_FRAME:
+                raise ValueError('coords_per_frame and colors_per_frame have different numbers of frames '
+                                 '(mismatch at frame ' + str(frame_index) + ')')
+            PointCloudTool.update_point_cloud_mesh_from_arrays(point_cloud_mesh_name, coords, colors)
+            if frame_callback is not None:
+                frame_callback(frame_index)
+            num_frames += 1
+            num_points += len(coords)
+        logger.info('stream_point_cloud_mesh_updates: Done')
+        return num_frames, num_points
+
+
+    @staticmethod
+    def create_palette_materials(points,
+                                 palette_mode,
+                                 num_bins_per_channel=8,
+                                 max_palette_size=256,
+                                 template_material=None):
+        """
+        Quantizes the point colors, so that points with similar colors share a material
+        :return: list of materials, (N,) array with the material index of each point
+        """
+        colors = np.array([point.color for point in points], dtype=np.uint8).reshape(-1, 3)
+        palette, point_palette_indices = quantize_colors(
+            colors, palette_mode, num_bins_per_channel, max_palette_size)
+
+        palette_materials = []
+        for palette_color in palette:
+            if template_material is not None:
+                material = template_material.copy()
+            else:
+                material = bpy.data.materials.new("materialName")
+            material.diffuse_color = palette_color / 255.0
+            palette_materials.append(material)
+        return palette_materials, point_palette_indices
 
+    @staticmethod
+    def _log_palette_report(num_points, num_materials, build_time):
+        logger.info('Number of points: ' + str(num_points))
+        logger.info('Number of palette materials: ' + str(num_materials))
+        logger.info('Number of saved materials: ' + str(num_points - num_materials))
+        logger.info('Build time: ' + str(build_time) + ' s')
 
     @staticmethod
     def add_point_cloud_using_dupliverts(points,
                                          add_meshes_at_vertex_positions,
                                          mesh_type=VertexType.CUBE,
-                                         mesh_scale=1.0):
+                                         mesh_scale=1.0,
+                                         palette_mode=None,
+                                         num_bins_per_channel=8,
+                                         max_palette_size=256,
+                                         downsampling=None,
+                                         frustum_culling=None):
         """
         http://blender.stackexchange.com/questions/1829/is-it-possible-to-render-vertices-in-blender
         :param points:
         :param add_meshes_at_vertex_positions:
         :param mesh_type: VertexType.PLANE, VertexType.CUBE, VertexType.SPHERE
         :param mesh_scale:
+        :param palette_mode: None (one material per point), PaletteMode.BINS or PaletteMode.OCTREE
+        :param num_bins_per_channel: used by PaletteMode.BINS
+        :param max_palette_size: used by PaletteMode.OCTREE
+        :param downsampling: PointCloudDownsampling (optional)
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
         :return:
         """
         logger.info("add_point_cloud_using_dupliverts: ...")
+        start_time = timeit.default_timer()
+
+        if downsampling is not None:
+            points = PointCloudTool.downsample_points(points, downsampling)
+        if frustum_culling is not None:
+            points = PointCloudTool.cull_points(points, frustum_culling)
 
         point_obj_names = []
 
@@ -125,6 +473,10 @@ class PointCloudTool:
                 bpy.ops.mesh.primitive_uv_sphere_add(size=mesh_scale)
             viz_mesh = bpy.context.object
 
+            if palette_mode is not None:
+                palette_materials, point_palette_indices = PointCloudTool.create_palette_materials(
+                    points, palette_mode, num_bins_per_channel, max_palette_size)
+
             for index, point in enumerate(points):
 
                 if index % 1000 == 0:
@@ -136,8 +488,11 @@ class PointCloudTool:
                 ob.location = coord
                 bpy.context.scene.objects.link(ob)
 
-                mat = bpy.data.materials.new("materialName")
-                mat.diffuse_color = [color[0]/255.0, color[1]/255.0, color[2]/255.0]
+                if palette_mode is not None:
+                    mat = palette_materials[point_palette_indices[index]]
+                else:
+                    mat = bpy.data.materials.new("materialName")
+                    mat.diffuse_color = [color[0]/255.0, color[1]/255.0, color[2]/255.0]
                 ob.active_material = mat
                 ob.material_slots[0].link = 'OBJECT'
                 ob.material_slots[0].material = mat
@@ -146,6 +501,10 @@ class PointCloudTool:
 
             # Delete the original primitive
             bpy.data.objects.remove(bpy.data.objects[viz_mesh.name], True)
+
+            if palette_mode is not None:
+                PointCloudTool._log_palette_report(
+                    len(points), len(palette_materials), timeit.default_timer() - start_time)
         bpy.ops.object.select_all(action='DESELECT')
         logger.info("add_point_cloud_using_dupliverts: Done")
         return point_obj_names
@@ -157,9 +516,16 @@ class PointCloudTool:
                                      rotation_angles_degrees=None,
                                      scale_factor=0.01,
                                      vertex_type=VertexType.CUBE,
-                                     camera_name_for_billboarding=None):
+                                     camera_name_for_billboarding=None,
+                                     palette_mode=None,
+                                     num_bins_per_channel=8,
+                                     max_palette_size=256,
+                                     share_mesh_data=False,
+                                     downsampling=None,
+                                     frustum_culling=None):
 
         logger.info('Add Point Cloud: ...')
+        start_time = timeit.default_timer()
 
         """
         Determine the rotation_angles by running the script without a rotation argument,
@@ -167,9 +533,23 @@ class PointCloudTool:
         :param points:
         :param rotation_angles_degrees:
         :param scale_factor:
+        :param palette_mode: None (one material per point), PaletteMode.BINS or PaletteMode.OCTREE
+        :param num_bins_per_channel: used by PaletteMode.BINS
+        :param max_palette_size: used by PaletteMode.OCTREE
+        :param share_mesh_data: if True, all points share the mesh of the template vertex. The colors are defined
+            with object-level material links (palette mode) or with the object color of a single shared material
+        :param downsampling: PointCloudDownsampling (optional)
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
+        :param camera_name_for_billboarding: adds a track to constraint to EACH point, i.e. the cost per frame
+            grows with the number of points. See add_point_cloud_using_particle_system for an alternative.
         :return:
         """
 
+        if downsampling is not None:
+            points = PointCloudTool.downsample_points(points, downsampling)
+        if frustum_culling is not None:
+            points = PointCloudTool.cull_points(points, frustum_culling)
+
         # create an empty object, which will represent the point cloud / be the parent of the points
         point_cloud = bpy.data.objects.new(point_cloud_name, None)
         point_cloud.location = [0, 0, 0]
@@ -180,7 +560,17 @@ class PointCloudTool:
             point_cloud.rotation_euler[1] = radians(rotation_angles_degrees[1])
             point_cloud.rotation_euler[2] = radians(rotation_angles_degrees[2])
 
-        centroid = GeometryCollection.compute_centroid_coord(points)
+        if len(points) == 0:
+            # e.g. if the frustum culling removed all points, since the camera does not see the point cloud
+            logger.info('No points left, returning the empty point cloud parent')
+            logger.info('Add Point Cloud: Done')
+            return point_cloud
+
+        coords, colors = PointCloudTool.convert_points_to_arrays(points)
+        if recenter_point_cloud_around_centroid:
+            # we resenter the object to the woorld coordinate frame
+            coords = recenter_coords(coords)
+        pseudo_colors = colors / 255.0
 
         # create template vertex (this one will be copied in order to safe time)
         template_vertex = PointCloudTool.create_vertex(point_cloud, scale_factor, vertex_type)
@@ -188,25 +578,40 @@ class PointCloudTool:
         # each channel of a pseudo colors is in range [0 .. 1]
         template_material = PointCloudTool.make_material(name='color', diffuse_pseudo_color=np.array([0, 0, 0]))
 
+        if palette_mode is not None:
+            palette_materials, point_palette_indices = PointCloudTool.create_palette_materials(
+                points, palette_mode, num_bins_per_channel, max_palette_size, template_material=template_material)
+
+        if share_mesh_data:
+            # The shared mesh requires a material slot, which is overwritten by each object
+            if palette_mode is None:
+                template_material.use_object_color = True
+            template_vertex.data.materials.append(template_material)
+
         point_cloud_vertices = []
-        for index, point in enumerate(points):
+        for index, coord in enumerate(coords):
 
             current_vertex = template_vertex.copy()
+            current_vertex.location = coord
 
-            if recenter_point_cloud_around_centroid:
-                # we resenter the object to the woorld coordinate frame
-                current_vertex.location = point.coord - centroid
+            if share_mesh_data:
+                if palette_mode is not None:
+                    current_vertex.material_slots[0].link = 'OBJECT'
+                    current_vertex.material_slots[0].material = palette_materials[point_palette_indices[index]]
+                else:
+                    pseudo_color = pseudo_colors[index]
+                    current_vertex.color = (pseudo_color[0], pseudo_color[1], pseudo_color[2], 1.0)
+            elif palette_mode is not None:
+                # also duplicate mesh
+                current_vertex.data = current_vertex.data.copy()
+                current_vertex.data.materials.append(palette_materials[point_palette_indices[index]])
             else:
-                current_vertex.location = point.coord
-
-            # also duplicate mesh
-            current_vertex.data = current_vertex.data.copy()
-
-            current_vertex.data.materials.append(template_material.copy())
+                # also duplicate mesh
+                current_vertex.data = current_vertex.data.copy()
+                current_vertex.data.materials.append(template_material.copy())
 
-            # assign a pseudo color, range (0,1)
-            pseudo_color = np.array(point.color) / 255.0
-            current_vertex.data.materials[0].diffuse_color = pseudo_color
+                # assign a pseudo color, range (0,1)
+                current_vertex.data.materials[0].diffuse_color = pseudo_colors[index]
 
             if camera_name_for_billboarding:
                 set_constraint_track_to(
@@ -234,7 +639,178 @@ class PointCloudTool:
         # don't place this in either of the above loops!
         bpy.context.scene.update()
 
+        if palette_mode is not None:
+            PointCloudTool._log_palette_report(
+                len(points), len(palette_materials), timeit.default_timer() - start_time)
+
         logger.info('Add Point Cloud: Done')
+        return point_cloud
+
+    @staticmethod
+    def add_point_cloud_using_vertex_colors(coords,
+                                            colors,
+                                            point_cloud_name,
+                                            mesh_type=VertexType.CUBE,
+                                            point_extent=1.0,
+                                            vertex_color_layer_name='Col',
+                                            downsampling=None,
+                                            frustum_culling=None):
+        """
+        Represents each point with a copy of the vertex type geometry within a single mesh. The point colors
+        are stored in a vertex color layer, which is read by a single material. In contrast to
+        add_point_cloud_using_particle_system no texture (lookup) is required.
+        Note: vertex colors are stored per loop, i.e. they are not available for meshes consisting only of vertices.
+        :param coords: (N,3) float32 array
+        :param colors: (N,3) uint8 array
+        :param point_cloud_name:
+        :param mesh_type: VertexType.PLANE, VertexType.CUBE, VertexType.SPHERE
+        :param point_extent:
+        :param vertex_color_layer_name:
+        :param downsampling: PointCloudDownsampling (optional)
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
+        :return:
+        """
+        logger.info('add_point_cloud_using_vertex_colors: ...')
+        if downsampling is not None:
+            coords, colors = downsampling.apply(coords, colors)
+        if frustum_culling is not None:
+            coords, colors = frustum_culling.apply(coords, colors)
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        colors = np.asarray(colors).reshape(-1, 3)
+        num_points = len(coords)
+
+        template_vertices, template_faces = _get_vertex_type_geometry(mesh_type)
+        num_template_vertices = len(template_vertices)
+        num_faces_per_point, num_vertices_per_face = template_faces.shape
+
+        # The default size of elements added with
+        #   primitive_cube_add, primitive_uv_sphere_add, etc. is (2,2,2)
+        point_scale = point_extent * 0.5
+        vertices = coords[:, np.newaxis, :] + point_scale * template_vertices[np.newaxis, :, :]
+        vertex_offsets = np.arange(num_points, dtype=np.int32) * num_template_vertices
+        loop_vertex_indices = template_faces[np.newaxis, :, :] + vertex_offsets[:, np.newaxis, np.newaxis]
+        num_faces = num_points * num_faces_per_point
+        num_loops = num_faces * num_vertices_per_face
+
+        mesh = bpy.data.meshes.new(point_cloud_name)
+        add_vertices_to_mesh(mesh, vertices.reshape(-1, 3))
+        mesh.loops.add(num_loops)
+        mesh.loops.foreach_set('vertex_index', loop_vertex_indices.ravel())
+        mesh.polygons.add(num_faces)
+        mesh.polygons.foreach_set(
+            'loop_start', np.arange(num_faces, dtype=np.int32) * num_vertices_per_face)
+        mesh.polygons.foreach_set(
+            'loop_total', np.full(num_faces, num_vertices_per_face, dtype=np.int32))
+        mesh.update(calc_edges=True)
+
+        vertex_color_layer = mesh.vertex_colors.new(name=vertex_color_layer_name)
+        # Depending on the blender version a loop color has 3 (RGB) or 4 (RGBA) channels
+        num_channels = len(vertex_color_layer.data[0].color) if num_loops > 0 else 3
+        loop_colors = np.ones((num_points, num_channels), dtype=np.float32)
+        loop_colors[:, :3] = colors / 255.0
+        loop_colors = np.repeat(loop_colors, num_faces_per_point * num_vertices_per_face, axis=0)
+        vertex_color_layer.data.foreach_set('color', loop_colors.ravel())
+
+        mesh.materials.append(
+            PointCloudTool.create_vertex_color_material(point_cloud_name + '_material', vertex_color_layer_name))
+        point_cloud_obj = add_obj(mesh, point_cloud_name)
+        logger.info('add_point_cloud_using_vertex_colors: Done')
+        return point_cloud_obj
+
+    @staticmethod
+    def create_vertex_color_material(material_name, vertex_color_layer_name):
+        material = bpy.data.materials.new(name=material_name)
+        # Blender Render
+        material.use_vertex_color_paint = True
+
+        # Cycles
+        material.use_nodes = True
+        node_tree = material.node_tree
+        if 'Material Output' in node_tree.nodes:
+            material_output_node = node_tree.nodes['Material Output']
+        else:
+            material_output_node = node_tree.nodes.new('ShaderNodeOutputMaterial')
+        if 'Diffuse BSDF' in node_tree.nodes:
+            diffuse_node = node_tree.nodes['Diffuse BSDF']
+        else:
+            diffuse_node = node_tree.nodes.new("ShaderNodeBsdfDiffuse")
+        node_tree.links.new(diffuse_node.outputs['BSDF'], material_output_node.inputs['Surface'])
+        attribute_node = node_tree.nodes.new('ShaderNodeAttribute')
+        attribute_node.attribute_name = vertex_color_layer_name
+        node_tree.links.new(attribute_node.outputs['Color'], diffuse_node.inputs['Color'])
+        return material
+
+    @staticmethod
+    def compute_particle_color_image_size(num_points):
+        """
+        Returns a square-ish (width, height) layout, since very wide images (one pixel per point in a single row)
+        exceed the image size limits for large point clouds
+        """
+        width = max(int(np.ceil(np.sqrt(num_points))), 1)
+        height = max(int(np.ceil(num_points / float(width))), 1)
+        return width, height
+
+    @staticmethod
+    def create_particle_color_image(image_name, colors):
+        """
+        The color of the particle with index i is stored at pixel (i % width, i // width)
+        :param image_name:
+        :param colors: (N,3) uint8 array
+        :return:
+        """
+        colors = np.asarray(colors).reshape(-1, 3)
+        num_points = len(colors)
+        width, height = PointCloudTool.compute_particle_color_image_size(num_points)
+        image = bpy.data.images.new(image_name, width, height)
+
+        # Order is R,G,B, opacity (0 = transparent, 1 = opaque)
+        local_pixels = np.ones((width * height, 4), dtype=np.float32)
+        local_pixels[:num_points, :3] = colors / 255.0
+        # Image rows are stored consecutively (starting with the bottom row)
+        PointCloudTool._set_image_pixels(image, local_pixels.ravel())
+        return image
+
+    @staticmethod
+    def _set_image_pixels(image, flat_pixels):
+        if hasattr(image.pixels, 'foreach_set'):
+            image.pixels.foreach_set(flat_pixels)
+        else:
+            # Assigning a list is considerably faster than assigning a numpy array element by element
+            image.pixels[:] = flat_pixels.tolist()
+
+    @staticmethod
+    def add_particle_index_to_uv_nodes(node_tree, index_socket, image_width, image_height):
+        """
+        Maps the particle index to the (u,v) coordinate of the pixel center in the image created with
+        create_particle_color_image(), i.e.
+            u = (index % width + 0.5) / width
+            v = ((index - index % width) / width + 0.5) / height
+        :return: the vector output socket containing (u,v,0)
+        """
+
+        def add_math_node(operation, first_input, second_input):
+            math_node = node_tree.nodes.new('ShaderNodeMath')
+            math_node.operation = operation
+            for input_socket, input_value in zip(math_node.inputs, [first_input, second_input]):
+                if isinstance(input_value, bpy.types.NodeSocket):
+                    node_tree.links.new(input_value, input_socket)
+                else:
+                    input_socket.default_value = input_value
+            return math_node.outputs['Value']
+
+        column_socket = add_math_node('MODULO', index_socket, image_width)
+        u_socket = add_math_node(
+            'DIVIDE', add_math_node('ADD', column_socket, 0.5), image_width)
+
+        row_socket = add_math_node(
+            'DIVIDE', add_math_node('SUBTRACT', index_socket, column_socket), image_width)
+        v_socket = add_math_node(
+            'DIVIDE', add_math_node('ADD', row_socket, 0.5), image_height)
+
+        shader_node_combine = node_tree.nodes.new('ShaderNodeCombineXYZ')
+        node_tree.links.new(u_socket, shader_node_combine.inputs['X'])
+        node_tree.links.new(v_socket, shader_node_combine.inputs['Y'])
+        return shader_node_combine.outputs['Vector']
 
     @staticmethod
     def add_point_cloud_using_particle_system(point_cloud_name,
@@ -243,19 +819,31 @@ class PointCloudTool:
                                               mesh_type=VertexType.CUBE,
                                               point_extent=1.0,
                                               default_point_color=(255, 255, 255),
-                                              overwrite_color=False):
+                                              overwrite_color=False,
+                                              downsampling=None,
+                                              camera_name_for_billboarding=None,
+                                              frustum_culling=None):
+
+        """
+        :param camera_name_for_billboarding: if provided, all particles share the rotation of the camera.
+            In contrast to add_point_cloud_using_parent, this requires only a single constraint
+            (on the instanced object), i.e. the cost per frame does not depend on the number of points.
+            Use mesh_type=VertexType.PLANE to obtain (screen aligned) billboards.
+        :param frustum_culling: PointCloudFrustumCulling (optional), removes the points outside of the camera view(s)
+        """
 
         logger.info('add_point_cloud_using_particle_system: ...')
 
         name = point_cloud_name
+        coords, colors = PointCloudTool.convert_points_to_arrays(points)
+        if downsampling is not None:
+            coords, colors = downsampling.apply(coords, colors)
+        if frustum_culling is not None:
+            coords, colors = frustum_culling.apply(coords, colors)
         mesh = bpy.data.meshes.new(name)
-        mesh.update()
-        mesh.validate()
-
-        point_world_coordinates = [tuple(point.coord) for point in points]
-
-        mesh.from_pydata(point_world_coordinates, [], [])
+        add_vertices_to_mesh(mesh, coords)
         meshobj = add_obj(mesh, name)
+        num_points = len(coords)
 
         if add_points_as_particle_system:
             # logger.info("Representing Points in the Point Cloud with Meshes: True")
@@ -304,42 +892,17 @@ class PointCloudTool:
                 image_texture_node = node_tree.nodes.new("ShaderNodeTexImage")
                 node_tree.links.new(image_texture_node.outputs['Color'], diffuse_node.inputs['Color'])
 
-                vis_image_height = 1
-
-                # To view the texture we set the height of the texture to vis_image_height
-                image = bpy.data.images.new('ParticleColor', len(point_world_coordinates), vis_image_height)
-
-                # working on a copy of the pixels results in a MASSIVE performance speed
-                local_pixels = list(image.pixels[:])
-
-                num_points = len(points)
-
-                for j in range(vis_image_height):
-                    for point_index, point in enumerate(points):
-                        column_offset = point_index * 4  # (R,G,B,A)
-                        row_offset = j * 4 * num_points
-                        if overwrite_color:
-                            color = default_point_color
-                        else:
-                            color = point.color
-                        # Order is R,G,B, opacity
-                        local_pixels[row_offset + column_offset] = color[0] / 255.0
-                        local_pixels[row_offset + column_offset + 1] = color[1] / 255.0
-                        local_pixels[row_offset + column_offset + 2] = color[2] / 255.0
-                        # opacity (0 = transparent, 1 = opaque)
-                        # local_pixels[row_offset + column_offset + 3] = 1.0    # already set by default
-
-                image.pixels = local_pixels[:]
-
+                if overwrite_color:
+                    colors = np.tile(np.asarray(default_point_color, dtype=np.uint8), (num_points, 1))
+                image = PointCloudTool.create_particle_color_image('ParticleColor', colors)
                 image_texture_node.image = image
+                # Neighboring pixels belong to different particles, i.e. they must not be interpolated
+                image_texture_node.interpolation = 'Closest'
+
                 particle_info_node = node_tree.nodes.new('ShaderNodeParticleInfo')
-                divide_node = node_tree.nodes.new('ShaderNodeMath')
-                divide_node.operation = 'DIVIDE'
-                node_tree.links.new(particle_info_node.outputs['Index'], divide_node.inputs[0])
-                divide_node.inputs[1].default_value = num_points
-                shader_node_combine = node_tree.nodes.new('ShaderNodeCombineXYZ')
-                node_tree.links.new(divide_node.outputs['Value'], shader_node_combine.inputs['X'])
-                node_tree.links.new(shader_node_combine.outputs['Vector'], image_texture_node.inputs['Vector'])
+                uv_socket = PointCloudTool.add_particle_index_to_uv_nodes(
+                    node_tree, particle_info_node.outputs['Index'], image.size[0], image.size[1])
+                node_tree.links.new(uv_socket, image_texture_node.inputs['Vector'])
 
             if len(meshobj.particle_systems) == 0:
                 meshobj.modifiers.new("particle sys", type='PARTICLE_SYSTEM')
@@ -348,13 +911,21 @@ class PointCloudTool:
                 settings.type = 'HAIR'
                 settings.use_advanced_hair = True
                 settings.emit_from = 'VERT'
-                settings.count = len(point_world_coordinates)
+                settings.count = num_points
                 # The final object extent is hair_length * obj.scale
                 settings.hair_length = 100  # This must not be 0
                 settings.use_emit_random = False
                 settings.render_type = 'OBJECT'
                 settings.dupli_object = viz_mesh
 
+                if camera_name_for_billboarding:
+                    # The particles use the (world) rotation of the instanced object,
+                    # which copies the rotation of the camera
+                    settings.use_rotations = True
+                    settings.rotation_mode = 'NONE'
+                    settings.use_rotation_dupli = True
+                    set_constraint_copy_rotation(viz_mesh.name, camera_name_for_billboarding)
+
         else:
             logger.info("Representing Points in the Point Cloud with Meshes: False")
 
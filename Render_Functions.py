@@ -1,5 +1,8 @@
 import os
 import bpy
+import numpy as np
+from BlenderUtility.Output_Manifest import OutputManifest
+from BlenderUtility.Output_Manifest import compute_input_hash
 
 from Utility.Logging_Extension import logger
 
@@ -182,7 +185,48 @@ def configure_render_settings(
     logger.info('configure_render_settings: Done')
 
 
-def render_scene_from_virtual_camera_positions(output_file_path):
+def _compute_camera_render_input_hash(camera_object, scene):
+    camera_data = camera_object.data
+    render = scene.render
+    settings = (camera_data.lens, camera_data.sensor_width, camera_data.shift_x, camera_data.shift_y,
+                camera_data.clip_start, camera_data.clip_end,
+                render.resolution_x, render.resolution_y, render.resolution_percentage,
+                render.image_settings.file_format, render.image_settings.color_mode, render.alpha_mode,
+                scene.frame_current)
+    return compute_input_hash(np.array(camera_object.matrix_world), settings)
+
+
+def _get_rendered_still_file_path(scene):
+    """
+    :return: the path of the image written by bpy.ops.render.render(write_still=True) or None, if no file exists
+    """
+    render = scene.render
+    # frame_path() considers use_file_extension and replaces '#' with the (padded) frame number, but it also
+    # appends the frame number to paths without '#' (which is not done for still images)
+    candidate_file_paths = [render.frame_path(frame=scene.frame_current)]
+    still_file_path = bpy.path.abspath(render.filepath)
+    if render.use_file_extension:
+        still_file_path += render.file_extension
+    candidate_file_paths.append(still_file_path)
+    for candidate_file_path in candidate_file_paths:
+        if os.path.isfile(candidate_file_path):
+            return candidate_file_path
+    return None
+
+
+def render_scene_from_virtual_camera_positions(output_file_path,
+                                               use_manifest=False,
+                                               output_manifest_file_name='render_manifest.jsonl'):
+    """
+    :param output_file_path:
+    :param use_manifest: if True, the rendered images are recorded in a manifest. A rerun (e.g. after a crash)
+        skips the cameras, whose images exist and whose pose and render settings did not change.
+        Note: changes of the scene content are not detected.
+    :param output_manifest_file_name:
+    Note: The images are written synchronously by bpy.ops.render.render(write_still=True). A BackgroundWriter
+    can not be used here, since the pixels of the render result are not accessible from python (without
+    writing the image), i.e. there are no extracted arrays, which could be written in the background.
+    """
     logger.info('render_scene_from_virtual_camera_positions: ...')
 
     scene = bpy.context.scene
@@ -201,19 +245,37 @@ def render_scene_from_virtual_camera_positions(output_file_path):
         data.use_shadeless = True
         data.translucency = 0.0
 
+    manifest = None
+    if use_manifest:
+        manifest = OutputManifest(os.path.join(output_file_path, output_manifest_file_name))
+
     for current_object in scene.objects:
         if current_object.type == 'CAMERA':
             # print(current_object.name)
 
+            camera_name = current_object.name
+            if manifest is not None:
+                input_hash = _compute_camera_render_input_hash(current_object, scene)
+                if manifest.is_up_to_date(camera_name, input_hash):
+                    logger.info('Skipping up to date camera: ' + camera_name)
+                    continue
+
             # set the current camera as active camera
             bpy.context.scene.camera = current_object
-            camera_name = current_object.name
             # adjust the starting index
             scene.render.filepath = os.path.join(output_file_path, camera_name)
 
             # render the image seen from the current camera and write it to disc
             bpy.ops.render.render(write_still=True)
 
+            if manifest is not None:
+                rendered_file_path = _get_rendered_still_file_path(scene)
+                if rendered_file_path is None:
+                    # e.g. multiview renderings (with view suffixes), the camera is rendered again in the next run
+                    logger.info('Rendered image not found, not recording camera in the manifest: ' + camera_name)
+                else:
+                    manifest.add_entry(camera_name, input_hash, [rendered_file_path])
+
 
 def configure_stereo_camera_settings(camera_name, baseline, left_suffix='_left', right_suffix='_right'):
 
@@ -0,0 +1,92 @@
+import numpy as np
+from BlenderUtility.Array_Geometry_Functions import apply_matrix_to_coords
+
+# This module does not depend on blender, i.e. the ground truth meshes can be materialized outside of blender.
+
+
+class RigidGroundTruthMesh:
+    """
+    Compact representation of the ground truth mesh of an animation consisting of rigid parts (e.g. a car body and
+    its wheels). The geometry of each part is stored once (in object coordinates) together with the matrix_world
+    of each part at each frame, i.e. the size is O(vertices + frames) instead of O(vertices * frames).
+    """
+
+    def __init__(self, part_names, part_coords, part_triangles, frame_numbers, part_matrix_world_mats):
+        """
+        :param part_names: list of P object names
+        :param part_coords: list of P (N_p,3) arrays (object coordinates)
+        :param part_triangles: list of P (T_p,3) arrays (vertex indices of the corresponding part)
+        :param frame_numbers: (F,) array
+        :param part_matrix_world_mats: (F,P,4,4) array
+        """
+        self.part_names = list(part_names)
+        num_parts = len(self.part_names)
+        assert len(part_coords) == num_parts and len(part_triangles) == num_parts
+
+        self.part_vertex_counts = np.array([len(coords) for coords in part_coords], dtype=np.int64)
+        self.part_vertex_offsets = np.concatenate([[0], np.cumsum(self.part_vertex_counts)])
+        self.coords = np.concatenate(
+            [np.asarray(coords, dtype=np.float32).reshape(-1, 3) for coords in part_coords])
+        # The triangles refer to the concatenated vertices of all parts
+        self.triangles = np.concatenate(
+            [np.asarray(triangles, dtype=np.int32).reshape(-1, 3) + vertex_offset
+             for triangles, vertex_offset in zip(part_triangles, self.part_vertex_offsets)])
+
+        self.frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+        self.part_matrix_world_mats = np.asarray(part_matrix_world_mats, dtype=np.float64)
+        assert self.part_matrix_world_mats.shape == (len(self.frame_numbers), num_parts, 4, 4)
+        self._frame_number_to_index = {
+            int(frame_number): frame_index for frame_index, frame_number in enumerate(self.frame_numbers)}
+
+    def get_frame_index(self, frame_number):
+        return self._frame_number_to_index[int(frame_number)]
+
+    def get_coords(self, frame_number):
+        """
+        :return: (N,3) vertex coordinates of all parts in world coordinates at the given frame
+        """
+        frame_index = self.get_frame_index(frame_number)
+        world_coords = np.empty(self.coords.shape, dtype=np.float64)
+        for part_index in range(len(self.part_names)):
+            part_slice = slice(self.part_vertex_offsets[part_index], self.part_vertex_offsets[part_index + 1])
+            world_coords[part_slice] = apply_matrix_to_coords(
+                self.part_matrix_world_mats[frame_index, part_index], self.coords[part_slice])
+        return world_coords
+
+    def get_mesh(self, frame_number):
+        """
+        :return: (N,3) world coordinates and (T,3) triangles of the mesh at the given frame
+        """
+        return self.get_coords(frame_number), self.triangles
+
+    def write(self, ofp):
+        np.savez(
+            ofp,
+            part_names=np.array(self.part_names),
+            part_vertex_counts=self.part_vertex_counts,
+            coords=self.coords,
+            triangles=self.triangles,
+            frame_numbers=self.frame_numbers,
+            part_matrix_world_mats=self.part_matrix_world_mats)
+
+    @classmethod
+    def read(cls, ifp):
+        with np.load(ifp) as data:
+            part_vertex_offsets = np.concatenate([[0], np.cumsum(data['part_vertex_counts'])])
+            coords = data['coords']
+            triangles = data['triangles']
+            part_coords = []
+            part_triangles = []
+            for part_index in range(len(data['part_names'])):
+                vertex_start = part_vertex_offsets[part_index]
+                vertex_end = part_vertex_offsets[part_index + 1]
+                part_coords.append(coords[vertex_start:vertex_end])
+                # Each triangle belongs to the part of its first vertex
+                part_triangle_mask = (triangles[:, 0] >= vertex_start) & (triangles[:, 0] < vertex_end)
+                part_triangles.append(triangles[part_triangle_mask] - vertex_start)
+            return cls(
+                [str(part_name) for part_name in data['part_names']],
+                part_coords,
+                part_triangles,
+                data['frame_numbers'],
+                data['part_matrix_world_mats'])
@@ -0,0 +1,267 @@
+import heapq
+import zlib
+
+import numpy as np
+from BlenderUtility.Array_Geometry_Functions import apply_matrix_to_coords
+
+# This module does not depend on blender. If scipy is available, its kd-tree is used. Otherwise a kd-tree
+# implemented with numpy is used.
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+class _NumpyKDTree:
+    """
+    Kd-tree with leaf buckets. The tree traversal is done in python, the distance computations within the
+    leaves are vectorized.
+    """
+
+    def __init__(self, coords, leaf_size=32):
+        self.coords = coords
+        self.leaf_size = max(leaf_size, 1)
+        self.indices = np.arange(len(coords))
+        # Per node: start, end, left child, right child (-1 for leaves), bounding box min and max
+        self._node_ranges = []
+        self._node_children = []
+        self._node_bbox_min = []
+        self._node_bbox_max = []
+        if len(coords) > 0:
+            self._build()
+
+    def _add_node(self, start, end):
+        node_coords = self.coords[self.indices[start:end]]
+        self._node_ranges.append((start, end))
+        self._node_children.append((-1, -1))
+        self._node_bbox_min.append(node_coords.min(axis=0))
+        self._node_bbox_max.append(node_coords.max(axis=0))
+        return len(self._node_ranges) - 1
+
+    def _build(self):
+        stack = [self._add_node(0, len(self.coords))]
+        while stack:
+            node_id = stack.pop()
+            start, end = self._node_ranges[node_id]
+            if end - start <= self.leaf_size:
+                continue
+            split_dim = int(np.argmax(self._node_bbox_max[node_id] - self._node_bbox_min[node_id]))
+            node_indices = self.indices[start:end]
+            median_position = (end - start) // 2
+            partition = np.argpartition(self.coords[node_indices, split_dim], median_position)
+            self.indices[start:end] = node_indices[partition]
+            left_id = self._add_node(start, start + median_position)
+            right_id = self._add_node(start + median_position, end)
+            self._node_children[node_id] = (left_id, right_id)
+            stack.extend([left_id, right_id])
+        self._node_bbox_min = np.array(self._node_bbox_min)
+        self._node_bbox_max = np.array(self._node_bbox_max)
+
+    def _compute_squared_bbox_distance(self, node_id, query_coord):
+        closest = np.clip(query_coord, self._node_bbox_min[node_id], self._node_bbox_max[node_id])
+        return float(np.sum((closest - query_coord) ** 2))
+
+    def _get_leaf_indices_and_squared_distances(self, node_id, query_coord):
+        start, end = self._node_ranges[node_id]
+        leaf_indices = self.indices[start:end]
+        squared_distances = np.sum((self.coords[leaf_indices] - query_coord) ** 2, axis=1)
+        return leaf_indices, squared_distances
+
+    def query_knn(self, query_coord, k):
+        k = min(k, len(self.coords))
+        best_indices = np.empty(0, dtype=np.int64)
+        best_squared_distances = np.empty(0, dtype=np.float64)
+        heap = [(0.0, 0)] if len(self.coords) > 0 else []
+        while heap:
+            squared_bbox_distance, node_id = heapq.heappop(heap)
+            if len(best_indices) == k and squared_bbox_distance > best_squared_distances[-1]:
+                break
+            left_id, right_id = self._node_children[node_id]
+            if left_id < 0:
+                leaf_indices, squared_distances = self._get_leaf_indices_and_squared_distances(
+                    node_id, query_coord)
+                best_indices = np.concatenate([best_indices, leaf_indices])
+                best_squared_distances = np.concatenate([best_squared_distances, squared_distances])
+                order = np.argsort(best_squared_distances, kind='stable')[:k]
+                best_indices = best_indices[order]
+                best_squared_distances = best_squared_distances[order]
+            else:
+                for child_id in [left_id, right_id]:
+                    heapq.heappush(heap, (self._compute_squared_bbox_distance(child_id, query_coord), child_id))
+        return np.sqrt(best_squared_distances), best_indices
+
+    def query_radius(self, query_coord, radius):
+        squared_radius = radius ** 2
+        result = []
+        stack = [0] if len(self.coords) > 0 else []
+        while stack:
+            node_id = stack.pop()
+            if self._compute_squared_bbox_distance(node_id, query_coord) > squared_radius:
+                continue
+            left_id, right_id = self._node_children[node_id]
+            if left_id < 0:
+                leaf_indices, squared_distances = self._get_leaf_indices_and_squared_distances(
+                    node_id, query_coord)
+                result.append(leaf_indices[squared_distances <= squared_radius])
+            else:
+                stack.extend([left_id, right_id])
+        if not result:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(result))
+
+    def query_aabb(self, min_coord, max_coord):
+        result = []
+        stack = [0] if len(self.coords) > 0 else []
+        while stack:
+            node_id = stack.pop()
+            node_min = self._node_bbox_min[node_id]
+            node_max = self._node_bbox_max[node_id]
+            if np.any(node_max < min_coord) or np.any(node_min > max_coord):
+                continue
+            start, end = self._node_ranges[node_id]
+            if np.all(node_min >= min_coord) and np.all(node_max <= max_coord):
+                result.append(self.indices[start:end])
+                continue
+            left_id, right_id = self._node_children[node_id]
+            if left_id < 0:
+                leaf_indices = self.indices[start:end]
+                leaf_coords = self.coords[leaf_indices]
+                inside = np.all((leaf_coords >= min_coord) & (leaf_coords <= max_coord), axis=1)
+                result.append(leaf_indices[inside])
+            else:
+                stack.extend([left_id, right_id])
+        if not result:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(result))
+
+
+class SpatialIndex:
+    """
+    Nearest neighbor, radius and axis aligned bounding box queries on a (N,3) point set.
+    All query functions accept a single coordinate (3,) or a batch of coordinates (M,3).
+    """
+
+    def __init__(self, coords, leaf_size=32, use_scipy=True):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 3)
+        if use_scipy and cKDTree is not None:
+            self._scipy_tree = cKDTree(self.coords, leafsize=leaf_size)
+            self._numpy_tree = None
+        else:
+            self._scipy_tree = None
+            self._numpy_tree = _NumpyKDTree(self.coords, leaf_size)
+
+    def __len__(self):
+        return len(self.coords)
+
+    @staticmethod
+    def _as_query_batch(query_coords):
+        query_coords = np.asarray(query_coords, dtype=np.float64)
+        is_single_query = query_coords.ndim == 1
+        return query_coords.reshape(-1, 3), is_single_query
+
+    def query_knn(self, query_coords, k=1):
+        """
+        :return: distances (M,k) and indices (M,k), or (k,) and (k,) for a single query coordinate
+        """
+        query_coords, is_single_query = self._as_query_batch(query_coords)
+        k = min(k, len(self.coords))
+        if self._scipy_tree is not None:
+            distances, indices = self._scipy_tree.query(query_coords, k=k)
+            distances = np.asarray(distances).reshape(len(query_coords), k)
+            indices = np.asarray(indices).reshape(len(query_coords), k)
+        else:
+            distances = np.empty((len(query_coords), k), dtype=np.float64)
+            indices = np.empty((len(query_coords), k), dtype=np.int64)
+            for position, query_coord in enumerate(query_coords):
+                distances[position], indices[position] = self._numpy_tree.query_knn(query_coord, k)
+        if is_single_query:
+            return distances[0], indices[0]
+        return distances, indices
+
+    def query_radius(self, query_coords, radius):
+        """
+        :return: list of (sorted) index arrays, or a single index array for a single query coordinate
+        """
+        query_coords, is_single_query = self._as_query_batch(query_coords)
+        if self._scipy_tree is not None:
+            result = [np.sort(np.asarray(indices, dtype=np.int64))
+                      for indices in self._scipy_tree.query_ball_point(query_coords, radius)]
+        else:
+            result = [self._numpy_tree.query_radius(query_coord, radius) for query_coord in query_coords]
+        if is_single_query:
+            return result[0]
+        return result
+
+    def query_aabb(self, min_coord, max_coord):
+        """
+        Crop query
+        :return: (sorted) indices of the points within the axis aligned bounding box
+        """
+        min_coord = np.asarray(min_coord, dtype=np.float64)
+        max_coord = np.asarray(max_coord, dtype=np.float64)
+        if self._numpy_tree is not None:
+            return self._numpy_tree.query_aabb(min_coord, max_coord)
+        inside = np.all((self.coords >= min_coord) & (self.coords <= max_coord), axis=1)
+        return np.flatnonzero(inside)
+
+
+# ==============================================================================================================
+#                                               Cache (per Object)
+# ==============================================================================================================
+
+_spatial_index_cache = {}
+
+
+def _get_object_vertex_world_coords(obj):
+    mesh = obj.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    return apply_matrix_to_coords(np.array(obj.matrix_world), coords.reshape(-1, 3))
+
+
+def _compute_cheap_fingerprint(obj):
+    # Does not read the vertices, i.e. edits of the vertex positions require invalidate_spatial_index_of_object()
+    return (obj.name,
+            obj.data.as_pointer(),
+            len(obj.data.vertices),
+            tuple(value for row in obj.matrix_world for value in row))
+
+
+def _compute_content_hash(coords):
+    return zlib.adler32(np.ascontiguousarray(coords).view(np.uint8))
+
+
+def get_spatial_index_of_object(obj, leaf_size=32, use_content_hash=False):
+    """
+    Returns the (cached) spatial index of the mesh vertices (in world coordinates) of the object.
+    The index is rebuilt, if the name, the mesh data, the number of vertices or the world matrix changed.
+    Call invalidate_spatial_index_of_object() after editing the vertex positions (or use use_content_hash).
+    :param obj: blender object with mesh data
+    :param leaf_size:
+    :param use_content_hash: if True, the vertex coordinates are read and hashed on each call, i.e. vertex edits
+        are detected. This costs O(N) per call.
+    :return: SpatialIndex
+    """
+    fingerprint = _compute_cheap_fingerprint(obj)
+    coords = None
+    if use_content_hash:
+        coords = _get_object_vertex_world_coords(obj)
+        fingerprint += (_compute_content_hash(coords),)
+    fingerprint += (leaf_size,)
+    cache_key = obj.as_pointer()
+    cache_entry = _spatial_index_cache.get(cache_key)
+    if cache_entry is None or cache_entry[0] != fingerprint:
+        if coords is None:
+            coords = _get_object_vertex_world_coords(obj)
+        cache_entry = (fingerprint, SpatialIndex(coords, leaf_size=leaf_size))
+        _spatial_index_cache[cache_key] = cache_entry
+    return cache_entry[1]
+
+
+def invalidate_spatial_index_of_object(obj):
+    _spatial_index_cache.pop(obj.as_pointer(), None)
+
+
+def clear_spatial_index_cache():
+    _spatial_index_cache.clear()
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+from BlenderUtility.Camera_Object_Trajectory_Arrays import CameraObjectTrajectoryArrays
+from BlenderUtility.PLY_Binary_Functions import write_binary_ply
+from Utility.File_Handler.NVM_File_Handler import NVMFileHandler
+from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
+from Utility.File_Handler.Trajectory_File_Handler import TrajectoryFileHandler
+from Utility.Types.Point import Point
+
+# This module does not depend on blender, i.e. trajectories can also be written outside of blender
+# (e.g. when merging the results of several blender processes).
+
+
+def get_camera_centers_as_array(camera_object_trajectory):
+    """
+    :param camera_object_trajectory: CameraObjectTrajectory or CameraObjectTrajectoryArrays
+    :return: (N,3) array with the left and the right camera center (in this order) of stereo cameras
+    """
+    if isinstance(camera_object_trajectory, CameraObjectTrajectoryArrays):
+        return camera_object_trajectory.get_camera_centers(expand_stereo_cameras=True)
+
+    camera_centers = []
+    for frame_name in camera_object_trajectory.get_frame_names_sorted():
+        cam = camera_object_trajectory.get_camera(frame_name)
+
+        if cam.is_monocular_cam():
+            camera_centers.append(cam.get_camera_center())
+        else:
+            camera_centers.append(cam.get_left_camera().get_camera_center())
+            camera_centers.append(cam.get_right_camera().get_camera_center())
+    return np.array(camera_centers, dtype=np.float64).reshape(-1, 3)
+
+
+def write_camera_centers_as_ply(camera_object_trajectory,
+                                camera_trajectory_ply_file_path,
+                                plain_text_output=False,
+                                color=(0, 255, 0)):
+    """
+    :param camera_object_trajectory: CameraObjectTrajectory or CameraObjectTrajectoryArrays
+    :param camera_trajectory_ply_file_path:
+    :param plain_text_output: if False, a binary little endian ply file is written
+    :param color: color of all camera centers
+    """
+    camera_centers = get_camera_centers_as_array(camera_object_trajectory)
+    colors = np.tile(np.array(color, dtype=np.uint8), (len(camera_centers), 1))
+    write_point_array_as_ply(camera_centers, colors, camera_trajectory_ply_file_path, plain_text_output)
+
+
+def write_point_array_as_ply(coords, colors, ply_ofp, plain_text_output=False):
+    """
+    :param coords: (N,3) array (e.g. camera centers or trajectory points)
+    :param colors: (N,3) uint8 array
+    :param ply_ofp:
+    :param plain_text_output: if False, a binary little endian ply file is written (without creating Point objects)
+    """
+    if plain_text_output:
+        points = [Point(coord=coord, color=color) for coord, color in zip(coords, colors)]
+        PLYFileHandler.write_ply_file(ofp=ply_ofp, vertices=points, plain_text_output=True)
+    else:
+        write_binary_ply(ply_ofp, np.asarray(coords, dtype=np.float32), colors=colors)
+
+
+def write_cameras_as_nvm(camera_object_trajectory, camera_trajectory_nvm_file_path):
+
+    cameras = []
+    for frame_name in camera_object_trajectory.get_frame_names_sorted():
+        cam = camera_object_trajectory.get_camera(frame_name)
+        if cam.is_monocular_cam():
+            cameras.append(cam)
+        else:
+            cameras.append(cam.get_left_camera())
+            cameras.append(cam.get_right_camera())
+
+    NVMFileHandler.write_nvm_file(
+        output_nvm_file_name=camera_trajectory_nvm_file_path,
+        cameras=cameras,
+        points=[])
+
+
+def write_camera_object_trajectory_files(
+        camera_object_trajectory,
+        path_to_ground_truth_folder,
+        virtual_camera_name,
+        car_body_name,
+        output_animation_transformation_txt_file_name='animation_transformations.txt',
+        output_camera_trajectory_ply_file_name='camera_trajectory.ply',
+        output_camera_trajectory_nvm_file_name='output_camera_trajectory_nvm_file_name',
+        camera_object_trajectory_arrays=None):
+    """
+    :param camera_object_trajectory_arrays: CameraObjectTrajectoryArrays (optional). If provided, the camera
+        centers are computed vectorized from the arrays.
+    """
+
+    animation_transformation_file_path = os.path.join(
+        path_to_ground_truth_folder, output_animation_transformation_txt_file_name)
+    camera_trajectory_ply_file_path = os.path.join(
+        path_to_ground_truth_folder, output_camera_trajectory_ply_file_name)
+    camera_trajectory_nvm_file_path = os.path.join(
+        path_to_ground_truth_folder, output_camera_trajectory_nvm_file_name)
+
+    # In Blender the stereo camera uses by default the position
+    # of the monocular camera as left camera
+    # To visualize both cameras in the 3D view
+    #   * Enable "Views" for the current Renderlayer
+    #   * Then an entry "Stereoscopy" appears in the toolbar of the "3D View"
+    #   * Then click on "Cameras" under "Stereoscopy"
+    # See also:
+    # https://docs.blender.org/manual/de/dev/render/workflows/multiview/usage.html#viewport-stereo-3d
+    TrajectoryFileHandler.write_camera_and_object_trajectory_file(
+        path_to_trajectory_file=animation_transformation_file_path,
+        camera_object_trajectory=camera_object_trajectory,
+        camera_to_world_transformation_name=virtual_camera_name,
+        object_to_world_transformation_name=car_body_name)
+
+    if camera_object_trajectory_arrays is None:
+        camera_object_trajectory_arrays = camera_object_trajectory
+    write_camera_centers_as_ply(
+        camera_object_trajectory_arrays,
+        camera_trajectory_ply_file_path)
+
+    write_cameras_as_nvm(
+        camera_object_trajectory,
+        camera_trajectory_nvm_file_path)
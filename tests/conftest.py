@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The repository is the BlenderUtility package (modules import each other with "from BlenderUtility.X import ..."),
+# i.e. the directory containing the repository must be on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
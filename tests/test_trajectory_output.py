@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+# These tests do not require blender, but the Utility package (python utility library)
+pytest.importorskip('Utility')
+
+from BlenderUtility.Camera_Object_Trajectory_Arrays import CameraObjectTrajectoryArrays
+from BlenderUtility.PLY_Binary_Functions import read_binary_ply_coords_and_colors
+from BlenderUtility.Trajectory_Output_Functions import get_camera_centers_as_array
+from BlenderUtility.Trajectory_Output_Functions import write_camera_centers_as_ply
+from BlenderUtility.Trajectory_Output_Functions import write_point_array_as_ply
+from Utility.File_Handler.PLY_File_Handler import PLYFileHandler
+
+
+def _create_rotation_mats(num_frames, random_state):
+    # QR decomposition of random matrices, the sign correction ensures det(R) = 1
+    rotation_mats = []
+    for _ in range(num_frames):
+        q, r = np.linalg.qr(random_state.normal(size=(3, 3)))
+        q = q * np.sign(np.diag(r))
+        if np.linalg.det(q) < 0:
+            q[:, 0] = -q[:, 0]
+        rotation_mats.append(q)
+    return np.array(rotation_mats)
+
+
+def _create_trajectory_arrays(render_stereo_camera, num_frames=10, seed=0):
+    random_state = np.random.RandomState(seed)
+    cam_to_world_mats = np.tile(np.identity(4), (num_frames, 1, 1))
+    cam_to_world_mats[:, :3, :3] = _create_rotation_mats(num_frames, random_state)
+    cam_to_world_mats[:, :3, 3] = random_state.uniform(-100, 100, size=(num_frames, 3))
+    calibration_mats = np.tile(np.array([[1000.0, 0, 960], [0, 1000.0, 540], [0, 0, 1]]), (num_frames, 1, 1))
+    object_mats = np.tile(np.identity(4), (num_frames, 1, 1))
+    return CameraObjectTrajectoryArrays(
+        np.arange(1, num_frames + 1),
+        cam_to_world_mats,
+        calibration_mats,
+        object_mats,
+        render_stereo_camera=render_stereo_camera,
+        stereo_camera_baseline=0.5 if render_stereo_camera else None)
+
+
+def _read_text_ply(ply_ifp):
+    points, _ = PLYFileHandler.parse_ply_file(ply_ifp)
+    coords = np.array([point.coord for point in points], dtype=np.float64).reshape(-1, 3)
+    colors = np.array([point.color for point in points]).reshape(-1, 3)
+    return coords, colors
+
+
+@pytest.mark.parametrize('render_stereo_camera', [False, True])
+def test_camera_centers_binary_and_text_ply_round_trip(tmpdir, render_stereo_camera):
+    trajectory_arrays = _create_trajectory_arrays(render_stereo_camera)
+    expected_coords = trajectory_arrays.get_camera_centers()
+    binary_ply_ifp = str(tmpdir.join('binary.ply'))
+    text_ply_ifp = str(tmpdir.join('text.ply'))
+
+    write_camera_centers_as_ply(trajectory_arrays, binary_ply_ifp, plain_text_output=False, color=(0, 255, 0))
+    write_camera_centers_as_ply(trajectory_arrays, text_ply_ifp, plain_text_output=True, color=(0, 255, 0))
+
+    binary_coords, binary_colors = read_binary_ply_coords_and_colors(binary_ply_ifp)
+    text_coords, text_colors = _read_text_ply(text_ply_ifp)
+    assert len(expected_coords) == (2 if render_stereo_camera else 1) * len(trajectory_arrays)
+    # The binary output uses float32
+    np.testing.assert_allclose(binary_coords, expected_coords, atol=1e-4)
+    np.testing.assert_allclose(text_coords, expected_coords, atol=1e-4)
+    np.testing.assert_allclose(binary_coords, text_coords, atol=1e-4)
+    np.testing.assert_array_equal(binary_colors, text_colors)
+    np.testing.assert_array_equal(binary_colors, np.tile([0, 255, 0], (len(expected_coords), 1)))
+
+
+def test_point_array_binary_and_text_ply_round_trip(tmpdir):
+    random_state = np.random.RandomState(0)
+    coords = random_state.uniform(-100, 100, size=(1000, 3)).astype(np.float32)
+    colors = random_state.randint(0, 256, size=(1000, 3)).astype(np.uint8)
+    binary_ply_ifp = str(tmpdir.join('binary.ply'))
+    text_ply_ifp = str(tmpdir.join('text.ply'))
+
+    write_point_array_as_ply(coords, colors, binary_ply_ifp, plain_text_output=False)
+    write_point_array_as_ply(coords, colors, text_ply_ifp, plain_text_output=True)
+
+    binary_coords, binary_colors = read_binary_ply_coords_and_colors(binary_ply_ifp)
+    text_coords, text_colors = _read_text_ply(text_ply_ifp)
+    np.testing.assert_array_equal(binary_coords, coords)
+    np.testing.assert_allclose(text_coords, coords, atol=1e-4)
+    np.testing.assert_array_equal(binary_colors, colors)
+    np.testing.assert_array_equal(text_colors, colors)
+
+
+@pytest.mark.parametrize('render_stereo_camera', [False, True])
+def test_vectorized_camera_centers_match_camera_objects(render_stereo_camera):
+    # For stereo cameras, this compares the vectorized right camera centers (c + baseline * R[:, 0]) with the
+    # right camera of StereoCamera
+    trajectory_arrays = _create_trajectory_arrays(render_stereo_camera)
+    camera_object_trajectory = trajectory_arrays.to_camera_object_trajectory()
+
+    np.testing.assert_allclose(
+        get_camera_centers_as_array(trajectory_arrays),
+        get_camera_centers_as_array(camera_object_trajectory),
+        atol=1e-9)
+    np.testing.assert_allclose(
+        trajectory_arrays.get_camera_centers(expand_stereo_cameras=False),
+        trajectory_arrays.cam_to_world_mats[:, :3, 3])